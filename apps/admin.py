@@ -1,7 +1,14 @@
+import hashlib
+
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.cache import cache
 
 from apps.models import Category, Product, ProductImage, CustomUser
 from apps.models.products import Cart, Wishlist
+from apps.pagination import EstimatedCountPaginator
+
+AUTOCOMPLETE_CACHE_PREFIX = 'admin:autocomplete'
 
 
 class BasePermission(admin.ModelAdmin):
@@ -19,6 +26,46 @@ class BasePermission(admin.ModelAdmin):
         return request.user.is_superuser or request.user.is_staff
 
 
+class DeferringChangeList(ChangeList):
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        return queryset.defer(*self.model_admin.list_defer) if self.model_admin.list_defer else queryset
+
+
+class LargeTableAdmin(BasePermission):
+    """
+    Changelists that stay fast on tables with millions of rows: no exact count of the whole table,
+    planner estimates instead of exact counts for large results, ``list_defer`` columns (long text
+    the list doesn't show) left out of the rows, and autocomplete matches cached for a short while.
+    """
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    list_defer = ()
+    autocomplete_cache_size = 200
+    autocomplete_cache_timeout = 60
+
+    def get_changelist(self, request, **kwargs):
+        return DeferringChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        match = request.resolver_match
+        if not search_term or match is None or match.url_name != 'autocomplete':
+            return super().get_search_results(request, queryset, search_term)
+        # Autocomplete fires a search per keystroke; keep the first matches' ids (the widget pages
+        # through them 20 at a time) per target field and term.
+        source = [request.GET.get(param, '') for param in ('app_label', 'model_name', 'field_name')]
+        digest = hashlib.md5(repr((self.opts.label, source, search_term)).encode()).hexdigest()
+        key = f'{AUTOCOMPLETE_CACHE_PREFIX}:{digest}'
+        pks = cache.get(key)
+        if pks is None:
+            results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+            if may_have_duplicates:
+                results = results.distinct()
+            pks = list(results.values_list('pk', flat=True)[:self.autocomplete_cache_size])
+            cache.set(key, pks, self.autocomplete_cache_timeout)
+        return queryset.filter(pk__in=pks), False
+
+
 class PhotosStackedInline(admin.StackedInline):
     model = ProductImage
     extra = 1
@@ -27,18 +74,21 @@ class PhotosStackedInline(admin.StackedInline):
 
 
 @admin.register(Product)
-class ProductAdmin(BasePermission):
-    list_display = ['id', 'name', 'price', 'description']
+class ProductAdmin(LargeTableAdmin):
+    list_display = ['id', 'name', 'price', 'description_preview']
     ordering = ['id']
     list_display_links = ['name']
-    search_fields = ['name']
+    # Prefix matches use the UPPER(name) pattern index (apps.search.prefix_search_indexes).
+    search_fields = ['^name']
+    list_defer = ('description', 'search_document')
     autocomplete_fields = ['category']
     inlines = [PhotosStackedInline, ]
 
 
 @admin.register(Category)
-class CategoryModelAdmin(BasePermission):
+class CategoryModelAdmin(LargeTableAdmin):
     list_display = ['id', 'name']
+    ordering = ['id']
     search_fields = ['name']
 
 
@@ -48,20 +98,26 @@ class ProductImageModelAdmin(BasePermission):
 
 
 @admin.register(Cart)
-class CartModelAdmin(BasePermission):
+class CartModelAdmin(LargeTableAdmin):
     list_display = ['user', 'product']
+    list_select_related = ('user', 'product')
+    list_defer = ('product__description', 'product__search_document')
+    autocomplete_fields = ('user', 'product')
 
 
 @admin.register(Wishlist)
-class CartModelAdmin(BasePermission):
+class WishlistModelAdmin(LargeTableAdmin):
     list_display = ['user', 'product']
+    list_select_related = ('user', 'product')
+    list_defer = ('product__description', 'product__search_document')
+    autocomplete_fields = ('user', 'product')
 
 
 @admin.register(CustomUser)
-class CustomUserAdmin(BasePermission):
+class CustomUserAdmin(LargeTableAdmin):
     list_display = ('email', 'phone_number', 'is_staff', 'is_active',)
     list_filter = ('is_staff', 'is_active',)
-    search_fields = ('email', 'phone_number',)
+    search_fields = ('^email', '^phone_number', '^username',)
     ordering = ('email',)
 
     fieldsets = (
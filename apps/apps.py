@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class AppsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps'
+
+    def ready(self):
+        from apps import signals, telemetry  # noqa: F401
+        from apps.instrumentation import install_query_instrumentation, is_enabled
+
+        if is_enabled():
+            connection_created.connect(install_query_instrumentation)
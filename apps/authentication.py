@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+USER_FIELDS = ('id', 'username', 'email', 'phone_number', 'first_name', 'last_name', 'is_active', 'is_staff',
+               'is_superuser')
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+class LocalUserCache:
+    """Per-process LRU in front of Redis. Other processes can't evict from it, so entries also expire after ``ttl``."""
+
+    def __init__(self, size, ttl):
+        self.size, self.ttl = size, ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, record):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, record)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == user_id]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_users = LocalUserCache(
+    size=getattr(settings, 'AUTH_USER_LOCAL_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'AUTH_USER_LOCAL_CACHE_TTL', 5),
+)
+
+
+def load_user_record(user_id):
+    """Slim, cacheable view of a user: the fields requests need plus a version derived from the password hash."""
+    row = get_user_model()._default_manager.filter(pk=user_id).values(*USER_FIELDS, 'password').first()
+    if row is None:
+        return None
+    row['token_version'] = get_md5_hash_password(row.pop('password'))
+    return row
+
+
+def invalidate_user(user_id):
+    def invalidate():
+        local_users.discard(user_id)
+        cache.delete(user_cache_key(user_id))
+
+    transaction.on_commit(invalidate)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` that rebuilds ``request.user`` from a per-process LRU, then Redis,
+    and only then the database. Entries are keyed by user id and the token's password-hash
+    claim, dropped on ``CustomUser`` writes (``apps.signals``), and carry the same active and
+    revoked-token checks as the stock class - so the hot authenticated path runs no user query.
+
+    The returned user is built with ``from_db`` from the cached fields only; anything else is
+    deferred, and ``save()`` writes back just the loaded fields.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        local_key = (user_id, validated_token.get(api_settings.REVOKE_TOKEN_CLAIM))
+        record = local_users.get(local_key)
+        if record is None:
+            record = cache.get(user_cache_key(user_id))
+            if record is None:
+                record = load_user_record(user_id)
+                if record is None:
+                    raise AuthenticationFailed(_("User not found"), code="user_not_found")
+                cache.set(user_cache_key(user_id), record, getattr(settings, 'AUTH_USER_CACHE_TTL', 300))
+            local_users.set(local_key, record)
+
+        if not record['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN and local_key[1] != record['token_version']:
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        model = get_user_model()
+        # from_db expects values in concrete field order.
+        fields = [field.attname for field in model._meta.concrete_fields if field.attname in USER_FIELDS]
+        return model.from_db(router.db_for_read(model), fields, [record[field] for field in fields])
@@ -0,0 +1,30 @@
+import time
+
+from django.db.backends.postgresql import base
+
+from apps.dbpool import connection_stats
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    The PostgreSQL backend, plus the connection counters of :mod:`apps.dbpool`: time to get a
+    connection (a pool checkout with ``OPTIONS['pool']``, a connect otherwise) and connections held.
+    """
+
+    def get_new_connection(self, conn_params):
+        started = time.perf_counter()
+        try:
+            connection = super().get_new_connection(conn_params)
+        except Exception:
+            connection_stats.record_error(self.alias)
+            raise
+        connection_stats.record_acquire(self.alias, time.perf_counter() - started)
+        return connection
+
+    def _close(self):
+        held = self.connection is not None
+        try:
+            return super()._close()
+        finally:
+            if held:
+                connection_stats.record_release(self.alias)
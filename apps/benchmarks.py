@@ -0,0 +1,251 @@
+import itertools
+import json
+import math
+import re
+import statistics
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.factories import delete_catalog, seed_catalog
+
+# Routes the suite deliberately leaves out, with the reason recorded in the results.
+SKIPPED_ROUTES = {
+    'token_obtain_pair': 'rest_framework.authtoken is not in INSTALLED_APPS, so the route can only fail',
+}
+
+
+@contextmanager
+def seeded_catalog(**sizes):
+    """``seed_catalog(**sizes)`` for the length of a run; the rows are deleted however the run ends."""
+    users = seed_catalog(**sizes)
+    try:
+        yield users
+    finally:
+        delete_catalog(users)
+
+
+class Scenario:
+    """One request shape: ``path(i)`` and ``body(i)`` build the i-th request, so scenarios can cycle through data."""
+
+    def __init__(self, name, route, path, method='GET', body=None, auth=False, expect=200):
+        self.name = name
+        self.route = route
+        self.path = path
+        self.method = method
+        self.body = body or (lambda i: None)
+        self.auth = auth
+        self.expect = expect
+
+
+def build_scenarios(data):
+    """
+    Scenarios for every route in ``apps.urls``; ``data`` holds what the seeded catalog provides:
+    ``slugs``, ``product_ids``, ``category_id``, ``username`` and ``password``.
+    """
+    slugs, product_ids = data['slugs'], data['product_ids']
+    some_products = product_ids[:20]
+
+    def url(name, **kwargs):
+        return reverse(name, kwargs=kwargs or None)
+
+    def detail(name):
+        return lambda i: url(name, slug=slugs[i % len(slugs)])
+
+    def fixed(path):
+        return lambda i: path
+
+    registration = {'username': 'bench-register', 'email': 'bench-register@example.com',
+                    'password': 'bench-password', 'confirm_password': 'bench-password'}
+    credentials = {'email_or_username': data['username'], 'password': data['password']}
+    return [
+        Scenario('categories', 'category-list', fixed(url('category-list') + '?page_size=20')),
+        Scenario('products', 'product-list', fixed(url('product-list') + '?page_size=20')),
+        Scenario('products:deep-page', 'product-list',
+                 fixed(url('product-list') + f'?page_size=20&page={max(len(slugs) // 40, 1)}')),
+        Scenario('products:keyset', 'product-list', fixed(url('product-list') + '?page_size=20&cursor=')),
+        Scenario('products:filtered', 'product-list',
+                 fixed(url('product-list') + f'?category={data["category_id"]}&ordering=-price&page_size=20')),
+        Scenario('products:faceted', 'product-list',
+                 fixed(url('product-list') + '?page_size=20&facets=true&price_min=100&in_stock=true')),
+        Scenario('products:search', 'product-list', fixed(url('product-list') + '?search=product&page_size=20')),
+        Scenario('products:sparse', 'product-list',
+                 fixed(url('product-list') + '?page_size=20&fields=id,name,price,thumbnail')),
+        Scenario('product-detail', 'product-detail-by-slug', detail('product-detail-by-slug')),
+        Scenario('product-detail:sparse', 'product-detail-by-slug',
+                 lambda i: detail('product-detail-by-slug')(i) + '?fields=name,price,thumbnail'),
+        Scenario('products:export', 'product-export', fixed(url('product-export'))),
+        Scenario('users', 'users', fixed(url('users') + '?page_size=20'), auth=True),
+        Scenario('async:categories', 'category-list-async', fixed(url('category-list-async') + '?page_size=20')),
+        Scenario('async:products', 'product-list-async', fixed(url('product-list-async') + '?page_size=20')),
+        Scenario('async:product-detail', 'product-detail-by-slug-async', detail('product-detail-by-slug-async')),
+        Scenario('wishlist', 'wishlist', fixed(url('wishlist') + '?page_size=20'), auth=True),
+        Scenario('wishlist:sparse', 'wishlist', fixed(url('wishlist') + '?page_size=20&fields=id,product_id'),
+                 auth=True),
+        Scenario('wishlist:bulk-add', 'wishlist-bulk', fixed(url('wishlist-bulk')), method='POST', auth=True,
+                 body=lambda i: {'product_ids': some_products, 'action': 'add'}),
+        Scenario('cart', 'cart', fixed(url('cart') + '?page_size=20'), auth=True),
+        Scenario('cart:sparse', 'cart', fixed(url('cart') + '?page_size=20&fields=id,product,quantity'), auth=True),
+        Scenario('cart:bulk-set', 'cart-bulk', fixed(url('cart-bulk')), method='POST', auth=True,
+                 body=lambda i: {'items': [{'product_id': pk, 'quantity': i % 2} for pk in some_products[:5]]}),
+        Scenario('register:repeat', 'register', fixed(url('register')), method='POST', expect=201,
+                 body=lambda i: registration),
+        Scenario('activate:wrong-code', 'activate-user', fixed(url('activate-user')), method='POST', expect=400,
+                 body=lambda i: {'email': registration['email'], 'confirmation_code': '000000'}),
+        Scenario('login', 'login', fixed(url('login')), method='POST', body=lambda i: credentials),
+        Scenario('login:async', 'login-async', fixed(url('login-async')), method='POST', body=lambda i: credentials),
+        Scenario('metrics:anonymous', 'metrics', fixed(url('metrics')), expect=403),
+    ]
+
+
+def uncovered_routes(urlpatterns, scenarios):
+    covered = {scenario.route for scenario in scenarios} | set(SKIPPED_ROUTES)
+    return sorted(pattern.name for pattern in urlpatterns if pattern.name not in covered)
+
+
+class ClientRunner:
+    """Runs requests in-process through Django's test client; can count queries and trace memory."""
+    measures_queries = True
+    measures_memory = True
+    concurrency = 1
+
+    def __init__(self, token):
+        self.client = Client()
+        self.token = token
+        self.requests = itertools.count()
+
+    def request(self, scenario, index):
+        headers = {'REMOTE_ADDR': client_address(next(self.requests))}
+        if scenario.auth:
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {self.token}'
+        body = scenario.body(index)
+        with CaptureQueriesContext(connection) as queries:
+            if scenario.method == 'GET':
+                response = self.client.get(scenario.path(index), **headers)
+            else:
+                response = self.client.generic(scenario.method, scenario.path(index), json.dumps(body),
+                                               content_type='application/json', **headers)
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, len(content), len(queries)
+
+
+class HTTPRunner:
+    """
+    Load generator against a running server (``base_url``) with ``concurrency`` threads. Query
+    counts are read from the ``Server-Timing`` header when the server has instrumentation on.
+    """
+    measures_queries = True
+    measures_memory = False
+
+    def __init__(self, base_url, token, concurrency):
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.concurrency = concurrency
+
+    def request(self, scenario, index):
+        body = scenario.body(index)
+        request = urllib.request.Request(
+            self.base_url + scenario.path(index), method=scenario.method,
+            data=json.dumps(body).encode() if body is not None else None,
+            headers={'Content-Type': 'application/json', 'Accept': 'application/json'},
+        )
+        if scenario.auth:
+            request.add_header('Authorization', f'Bearer {self.token}')
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, len(response.read()), server_timing_queries(response.headers)
+        except urllib.error.HTTPError as exc:
+            return exc.code, len(exc.read()), server_timing_queries(exc.headers)
+
+
+def client_address(index):
+    # A distinct address per request, so per-IP throttles don't turn the run into a 429 benchmark.
+    # Client takes it as REMOTE_ADDR; AsyncClient needs client=(address, 0), ASGI reads the scope.
+    return f'10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}'
+
+
+def server_timing_queries(headers):
+    match = re.search(r'db;[^,]*desc="(\d+) queries', headers.get('Server-Timing', ''))
+    return int(match.group(1)) if match else None
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, max(math.ceil(fraction * len(ordered)) - 1, 0))]
+
+
+def run_scenario(runner, scenario, iterations, warmup, memory_iterations=5):
+    for index in range(warmup):
+        runner.request(scenario, index)
+
+    def timed(index):
+        started = time.perf_counter()
+        status, size, queries = runner.request(scenario, warmup + index)
+        return time.perf_counter() - started, status, size, queries
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=runner.concurrency) as executor:
+        samples = list(executor.map(timed, range(iterations)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(sample[0] * 1000 for sample in samples)
+    queries = [sample[3] for sample in samples if sample[3] is not None]
+    result = {
+        'route': scenario.route,
+        'requests': iterations,
+        'errors': sum(sample[1] != scenario.expect for sample in samples),
+        'statuses': dict(Counter(str(sample[1]) for sample in samples)),
+        'throughput_rps': round(iterations / elapsed, 2),
+        'latency_ms': {
+            'mean': round(statistics.fmean(latencies), 3),
+            'p50': round(percentile(latencies, 0.50), 3),
+            'p95': round(percentile(latencies, 0.95), 3),
+            'p99': round(percentile(latencies, 0.99), 3),
+        },
+        'queries_per_request': round(statistics.fmean(queries), 2) if queries else None,
+        'payload_bytes': round(statistics.fmean(sample[2] for sample in samples)),
+        'peak_memory_bytes': None,
+    }
+    if runner.measures_memory and memory_iterations:
+        # A separate pass: tracing allocations slows requests down too much to share the timed one.
+        tracemalloc.start()
+        try:
+            for index in range(memory_iterations):
+                runner.request(scenario, index)
+            result['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def compare(results, baseline, threshold, min_latency_delta_ms=1.0, min_memory_delta=64 * 1024):
+    """Regressions of ``results`` against ``baseline`` (both ``{scenario: result}``), as readable strings."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for key in ('p50', 'p95'):
+            now, before = current['latency_ms'][key], base['latency_ms'][key]
+            if now > before * (1 + threshold) and now - before > min_latency_delta_ms:
+                regressions.append(f'{name}: {key} latency {before:.1f}ms -> {now:.1f}ms')
+        if current['throughput_rps'] < base['throughput_rps'] * (1 - threshold):
+            regressions.append(f'{name}: throughput {base["throughput_rps"]} -> {current["throughput_rps"]} req/s')
+        if None not in (current['queries_per_request'], base['queries_per_request']) \
+                and current['queries_per_request'] > base['queries_per_request']:
+            regressions.append(f'{name}: queries {base["queries_per_request"]} -> {current["queries_per_request"]}')
+        if None not in (current['peak_memory_bytes'], base['peak_memory_bytes']):
+            now, before = current['peak_memory_bytes'], base['peak_memory_bytes']
+            if now > before * (1 + threshold) and now - before > min_memory_delta:
+                regressions.append(f'{name}: peak memory {before} -> {now} bytes')
+        if current['errors'] > base['errors']:
+            regressions.append(f'{name}: errors {base["errors"]} -> {current["errors"]}')
+    return regressions
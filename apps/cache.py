@@ -0,0 +1,259 @@
+import asyncio
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from apps.instrumentation import phase, record_cache
+from apps.routers import cache_timeout, record_write
+
+VERSION_PREFIX = 'catalog:v'
+RESPONSE_PREFIX = 'catalog:response'
+PRODUCTS_VERSION = f'{VERSION_PREFIX}:products'
+
+
+def product_version_key(product_id):
+    return f'{VERSION_PREFIX}:product:{product_id}'
+
+
+def category_version_key(category_id):
+    return f'{VERSION_PREFIX}:category:{category_id}'
+
+
+def bump_versions(*keys):
+    """Increment version counters; every cached entry that recorded an older value is stale from now on."""
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            if not cache.add(key, 1, None):
+                cache.incr(key)
+    # Responses read from a replica that hasn't applied this write yet are cached only briefly (see apps.routers).
+    record_write()
+
+
+def bump_versions_on_commit(*keys):
+    # Bump after commit, so a reader can't cache pre-commit rows under the new version.
+    transaction.on_commit(lambda: bump_versions(*keys))
+
+
+def get_versions(keys):
+    versions = cache.get_many(keys)
+    return {key: versions.get(key, 0) for key in keys}
+
+
+async def aget_versions(keys):
+    versions = await cache.aget_many(keys)
+    return {key: versions.get(key, 0) for key in keys}
+
+
+def weak_etag(*parts):
+    return f'W/"{hashlib.md5(repr(parts).encode()).hexdigest()}"'
+
+
+def is_conditional(request):
+    return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+
+def not_modified(request, validators):
+    """
+    The 304 for a conditional GET whose copy is still current (or 412 for a failed ``If-Match``),
+    else ``None``. ``validators`` is ``{'etag', 'last_modified'}``, the latter a Unix timestamp or ``None``.
+    """
+    if validators is None:
+        return None
+    response = get_conditional_response(request, validators['etag'], validators['last_modified'])
+    if response is not None:
+        set_validators(request, response, validators)
+    return response
+
+
+def set_validators(request, response, validators):
+    """
+    Add ``ETag``/``Last-Modified`` and ``Cache-Control``: anonymous catalog responses may be kept by
+    shared caches (CDN) for ``CATALOG_CACHE_CONTROL_MAX_AGE``; requests with credentials stay private.
+    """
+    if validators is not None:
+        response['ETag'] = validators['etag']
+        if validators['last_modified'] is not None:
+            response['Last-Modified'] = http_date(validators['last_modified'])
+    if 'HTTP_AUTHORIZATION' in request.META:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, public=True, max_age=getattr(settings, 'CATALOG_CACHE_CONTROL_MAX_AGE', 60))
+    return response
+
+
+class CachedResponseMixin:
+    """
+    Caches successful GET responses under a key built from the view, the scheme and host (bodies
+    hold absolute pagination links), its URL kwargs and the whitelisted ``cache_query_params``.
+    Each entry records the version counters it depends on (``get_cache_dependencies``) and is
+    served only while they are unchanged, so writes invalidate entries by bumping a counter
+    instead of scanning keys.
+
+    On a miss one request rebuilds the entry under a short lock; concurrent misses for the
+    same key wait for it rather than all hitting the database.
+
+    Responses carry a weak ``ETag`` made of the cache key and the version counters (plus
+    ``updated_at`` and ``Last-Modified`` for single objects, see ``get_object_validators``). It is
+    stored with the entry, so ``If-None-Match`` is answered with a 304 on a hit without touching
+    the database, and on a miss before the main query whenever ``get_validators`` can tell.
+    """
+    cache_query_params = ()
+    cache_timeout = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+    cache_lock_timeout = 10
+    cache_lock_wait = 2.0
+    cache_poll_interval = 0.05
+
+    def get(self, request, *args, **kwargs):
+        key = self.get_cache_key(request, kwargs)
+        with phase('cache'):
+            entry = cache.get(key)
+            fresh = self.is_fresh(entry)
+        record_cache('response', fresh)
+        if fresh:
+            return self.cached_response(request, entry, 'HIT')
+
+        dependencies = self.get_cache_dependencies(request)
+        versions = get_versions(dependencies) if dependencies is not None else None
+        validators = self.get_validators(request, key, versions)
+        response = not_modified(request, validators)
+        if response is not None:
+            return response
+
+        lock_key = f'{key}:lock'
+        locked = cache.add(lock_key, 1, self.cache_lock_timeout)
+        if not locked:
+            entry = self.wait_for_entry(key)
+            if entry is not None:
+                return self.cached_response(request, entry, 'HIT')
+        try:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code == 200:
+                if versions is None:
+                    versions = get_versions(self.get_object_cache_dependencies())
+                validators = self.get_object_validators(key, versions)
+                cache.set(key, {'versions': versions, 'validators': validators, 'data': response.data},
+                          cache_timeout(self.cache_timeout))
+                set_validators(request, response, validators)
+            response['X-Cache'] = 'MISS'
+            return response
+        finally:
+            if locked:
+                cache.delete(lock_key)
+
+    def get_cache_key(self, request, kwargs):
+        params = sorted(
+            (name, sorted(request.query_params.getlist(name)))
+            for name in self.cache_query_params if name in request.query_params
+        )
+        raw = repr((request.scheme, request.get_host(), sorted(kwargs.items()), params))
+        return f'{RESPONSE_PREFIX}:{self.__class__.__name__}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+    def get_cache_dependencies(self, request):
+        """Version keys known before the query runs; ``None`` defers to ``get_object_cache_dependencies``."""
+        return [PRODUCTS_VERSION]
+
+    def get_object_cache_dependencies(self):
+        return []
+
+    def get_validators(self, request, key, versions):
+        """Validators of the response before it's built (``None`` when that would take a query)."""
+        if versions is None:
+            return None
+        return {'etag': weak_etag(key, sorted(versions.items())), 'last_modified': None}
+
+    def get_object_validators(self, key, versions):
+        """Validators of a freshly built response; views over one object add its ``updated_at``."""
+        return self.get_validators(self.request, key, versions)
+
+    def is_fresh(self, entry):
+        return entry is not None and get_versions(list(entry['versions'])) == entry['versions']
+
+    def wait_for_entry(self, key):
+        deadline = time.monotonic() + self.cache_lock_wait
+        while time.monotonic() < deadline:
+            time.sleep(self.cache_poll_interval)
+            entry = cache.get(key)
+            if self.is_fresh(entry):
+                return entry
+        return None
+
+    def cached_response(self, request, entry, status):
+        validators = entry.get('validators')
+        return not_modified(request, validators) or set_validators(
+            request, Response(entry['data'], headers={'X-Cache': status}), validators)
+
+
+class AsyncCachedResponseMixin(CachedResponseMixin):
+    """
+    :class:`CachedResponseMixin` for async views returning JSON ``HttpResponse`` objects: the same
+    keys, versions and rebuild lock through the async cache API. Entries hold the rendered body,
+    so a hit is served without serializing again.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        key = self.get_cache_key(request, kwargs)
+        with phase('cache'):
+            entry = await cache.aget(key)
+            fresh = await self.ais_fresh(entry)
+        record_cache('response', fresh)
+        if fresh:
+            return self.cached_response(request, entry, 'HIT')
+
+        dependencies = self.get_cache_dependencies(request)
+        versions = await aget_versions(dependencies) if dependencies is not None else None
+        validators = await self.aget_validators(request, key, versions)
+        response = not_modified(request, validators)
+        if response is not None:
+            return response
+
+        lock_key = f'{key}:lock'
+        locked = await cache.aadd(lock_key, 1, self.cache_lock_timeout)
+        if not locked:
+            entry = await self.await_entry(key)
+            if entry is not None:
+                return self.cached_response(request, entry, 'HIT')
+        try:
+            # Skip CachedResponseMixin.get: the view's own (async) get renders the response.
+            response = await super(CachedResponseMixin, self).get(request, *args, **kwargs)
+            if response.status_code == 200:
+                if versions is None:
+                    versions = await aget_versions(self.get_object_cache_dependencies())
+                validators = self.get_object_validators(key, versions)
+                await cache.aset(key, {'versions': versions, 'validators': validators, 'content': response.content},
+                                 cache_timeout(self.cache_timeout))
+                set_validators(request, response, validators)
+            response['X-Cache'] = 'MISS'
+            return response
+        finally:
+            if locked:
+                await cache.adelete(lock_key)
+
+    async def aget_validators(self, request, key, versions):
+        return self.get_validators(request, key, versions)
+
+    async def ais_fresh(self, entry):
+        return entry is not None and await aget_versions(list(entry['versions'])) == entry['versions']
+
+    async def await_entry(self, key):
+        deadline = time.monotonic() + self.cache_lock_wait
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.cache_poll_interval)
+            entry = await cache.aget(key)
+            if await self.ais_fresh(entry):
+                return entry
+        return None
+
+    def cached_response(self, request, entry, status):
+        validators = entry.get('validators')
+        return not_modified(request, validators) or set_validators(
+            request, HttpResponse(entry['content'], content_type='application/json', headers={'X-Cache': status}),
+            validators)
@@ -0,0 +1,131 @@
+import logging
+import os
+import socket
+import threading
+import time
+from collections import defaultdict
+
+import redis
+from django.conf import settings
+from django.db import connections
+
+from apps.instrumentation import is_enabled
+from apps.utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+POOL_METRICS_PREFIX = 'metrics:db'
+# Exported per process; the rest are counters (acquires, seconds spent acquiring, failed acquires).
+GAUGES = ('apps_db_connections_in_use', 'apps_db_pool_size', 'apps_db_pool_available', 'apps_db_pool_waiting')
+
+
+class ConnectionStats:
+    """
+    Per-process connection counters kept by the ``apps.backends.postgresql`` backend: how many
+    connections are checked out, how many were acquired (pool checkouts, or connects without a
+    pool) and how long that took, per database alias. With a pool, its size, idle connections
+    and waiting requests are added on export.
+
+    With instrumentation on, each process writes a snapshot to Redis at most every
+    ``flush_interval`` seconds from the connection path, so Celery workers report as well as
+    web processes; snapshots of processes that stopped expire.
+    """
+
+    def __init__(self, role, flush_interval):
+        self.role = role
+        self.flush_interval = flush_interval
+        self.in_use = defaultdict(int)
+        self.acquires = defaultdict(int)
+        self.acquire_seconds = defaultdict(float)
+        self.errors = defaultdict(int)
+        self.flushed_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def record_acquire(self, alias, seconds):
+        with self.lock:
+            self.in_use[alias] += 1
+            self.acquires[alias] += 1
+            self.acquire_seconds[alias] += seconds
+        self.maybe_flush()
+
+    def record_release(self, alias):
+        with self.lock:
+            self.in_use[alias] = max(self.in_use[alias] - 1, 0)
+        self.maybe_flush()
+
+    def record_error(self, alias):
+        with self.lock:
+            self.errors[alias] += 1
+        self.maybe_flush()
+
+    def snapshot(self):
+        """``{(metric, alias): value}`` for this process."""
+        with self.lock:
+            samples = {}
+            for alias in {*self.in_use, *self.acquires, *self.errors}:
+                samples['apps_db_connections_in_use', alias] = self.in_use[alias]
+                samples['apps_db_connection_acquires_total', alias] = self.acquires[alias]
+                samples['apps_db_connection_acquire_seconds_total', alias] = self.acquire_seconds[alias]
+                samples['apps_db_connection_errors_total', alias] = self.errors[alias]
+        for alias in connections:
+            stats = pool_stats(alias)
+            if stats is not None:
+                samples['apps_db_pool_size', alias] = stats.get('pool_size', 0)
+                samples['apps_db_pool_available', alias] = stats.get('pool_available', 0)
+                samples['apps_db_pool_waiting', alias] = stats.get('requests_waiting', 0)
+        return samples
+
+    def maybe_flush(self):
+        if time.monotonic() - self.flushed_at < self.flush_interval or not is_enabled():
+            return
+        self.flush()
+
+    def flush(self):
+        self.flushed_at = time.monotonic()
+        # The pid is read here: prefork workers share the parent's module state.
+        key = f'{POOL_METRICS_PREFIX}:{socket.gethostname()}:{os.getpid()}'
+        mapping = {f'{metric}|{alias}': value for (metric, alias), value in self.snapshot().items()}
+        if not mapping:
+            return
+        mapping['role'] = self.role
+        pipe = get_redis_client().pipeline(transaction=False)
+        pipe.hset(key, mapping=mapping)
+        pipe.expire(key, int(self.flush_interval * 3) + 1)
+        try:
+            pipe.execute()
+        except redis.RedisError:
+            logger.warning('Connection metrics dropped: Redis unavailable', exc_info=True)
+
+    def render(self):
+        """Prometheus text exposition of the latest snapshot of every live process."""
+        self.flush()
+        client = get_redis_client()
+        families = defaultdict(list)
+        for key in client.scan_iter(match=f'{POOL_METRICS_PREFIX}:*'):
+            fields = {field.decode(): value.decode() for field, value in client.hgetall(key).items()}
+            role = fields.pop('role', '')
+            process = key.decode()[len(POOL_METRICS_PREFIX) + 1:]
+            for field, value in sorted(fields.items()):
+                metric, alias = field.split('|', 1)
+                labels = f'alias="{alias}",role="{role}",process="{process}"'
+                families[metric].append(f'{metric}{{{labels}}} {float(value):g}')
+
+        lines = []
+        for metric, metric_lines in sorted(families.items()):
+            lines.append(f'# TYPE {metric} {"gauge" if metric in GAUGES else "counter"}')
+            lines.extend(metric_lines)
+        return '\n'.join(lines) + '\n' if lines else ''
+
+
+def pool_stats(alias):
+    """``psycopg_pool`` statistics of ``alias``'s pool, or ``None`` without a pool (or before it's opened)."""
+    connection = connections[alias]
+    if not getattr(connection, '_connection_pools', {}).get(alias):
+        return None
+    return connection.pool.get_stats()
+
+
+connection_stats = ConnectionStats(
+    role=getattr(settings, 'PROCESS_ROLE', 'web'),
+    flush_interval=getattr(settings, 'INSTRUMENTATION_FLUSH_INTERVAL', 5),
+)
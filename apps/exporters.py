@@ -0,0 +1,90 @@
+import csv
+import json
+from collections import defaultdict
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from apps.models import ProductImage
+
+
+class ProductExporter:
+    """
+    Yields the catalog row by row for streaming responses.
+
+    Products are read with a ``values()`` projection through a server-side ``iterator()``;
+    image URLs for each chunk are fetched with one ``IN`` query and joined in, so memory stays
+    at one chunk whatever the catalog size. ``arender()`` is the same for ASGI, which would
+    otherwise read a sync iterator into a list before sending it.
+    """
+    fields = ('id', 'name', 'slug', 'price', 'quantity', 'category__name', 'owner_id', 'created_at', 'updated_at')
+    columns = ('id', 'name', 'slug', 'price', 'quantity', 'category', 'owner_id', 'created_at', 'updated_at',
+               'images')
+    formats = {
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv',
+    }
+
+    def __init__(self, queryset, chunk_size=2000):
+        self.queryset = queryset
+        self.chunk_size = chunk_size
+        self.storage = ProductImage._meta.get_field('image').storage
+
+    def rows(self):
+        rows = self.queryset.values(*self.fields).iterator(chunk_size=self.chunk_size)
+        while chunk := list(islice(rows, self.chunk_size)):
+            yield from self.join_images(chunk)
+
+    async def arows(self):
+        """``rows()`` for ASGI: the products come through ``aiterator()``, the images through a worker thread."""
+        chunk = []
+        async for row in self.queryset.values(*self.fields).aiterator(chunk_size=self.chunk_size):
+            chunk.append(row)
+            if len(chunk) == self.chunk_size:
+                for row in await sync_to_async(self.join_images)(chunk):
+                    yield row
+                chunk = []
+        if chunk:
+            for row in await sync_to_async(self.join_images)(chunk):
+                yield row
+
+    def join_images(self, chunk):
+        images = defaultdict(list)
+        product_images = ProductImage.objects.filter(product_id__in=[row['id'] for row in chunk]).order_by('id')
+        for product_id, name in product_images.values_list('product_id', 'image'):
+            images[product_id].append(self.storage.url(name))
+        for row in chunk:
+            row['category'] = row.pop('category__name')
+            row['images'] = images[row['id']]
+        return chunk
+
+    def render(self, export_format):
+        header, line = self.formatter(export_format)
+        if header:
+            yield header
+        for row in self.rows():
+            yield line(row)
+
+    async def arender(self, export_format):
+        header, line = self.formatter(export_format)
+        if header:
+            yield header
+        async for row in self.arows():
+            yield line(row)
+
+    def formatter(self, export_format):
+        """``(header, line)``: the first line of the file (or ``None``) and a function formatting one row."""
+        if export_format == 'csv':
+            writer = csv.writer(Echo())
+            return writer.writerow(self.columns), lambda row: writer.writerow(
+                [' '.join(row[column]) if column == 'images' else row[column] for column in self.columns])
+        encoder = DjangoJSONEncoder(separators=(',', ':'))
+        return None, lambda row: encoder.encode(row) + '\n'
+
+
+class Echo:
+    """File-like object whose ``write`` hands the formatted line back to the csv writer's caller."""
+
+    def write(self, value):
+        return value
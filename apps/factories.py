@@ -0,0 +1,75 @@
+import random
+
+from django.contrib.auth.hashers import make_password
+
+from apps.models import Category, Product, ProductImage, CustomUser, Cart, Wishlist
+from apps.search import build_description_preview, build_search_document
+
+# Named dataset sizes for benchmarks; any count can still be overridden per run.
+CATALOG_SCALES = {
+    'small': dict(categories=5, products=200, images_per_product=2, users=10, carts_per_user=5, wishlists_per_user=5),
+    'medium': dict(categories=20, products=5_000, images_per_product=3, users=200, carts_per_user=10,
+                   wishlists_per_user=10),
+    'large': dict(categories=50, products=100_000, images_per_product=3, users=5_000, carts_per_user=10,
+                  wishlists_per_user=20),
+}
+
+
+def seed_catalog(categories=5, products=50, images_per_product=2, users=3, carts_per_user=5, wishlists_per_user=5,
+                 seed=0, batch_size=5000):
+    """
+    Insert a reproducible catalog with ``bulk_create`` and return the created users.
+
+    Rows are written in ``batch_size`` chunks, so the same call seeds a smoke-test
+    fixture or a benchmark dataset on SQLite or PostgreSQL.
+    """
+    rnd = random.Random(seed)
+    tag = rnd.randrange(10 ** 8)
+    password = make_password('password')
+
+    category_objs = Category.objects.bulk_create(
+        [Category(name=f'Category {i}', slug=f'category-{tag}-{i}') for i in range(categories)], batch_size=batch_size
+    )
+    user_objs = CustomUser.objects.bulk_create([
+        CustomUser(username=f'user-{tag}-{i}', email=f'user-{tag}-{i}@example.com', password=password,
+                   is_active=True)
+        for i in range(users)
+    ], batch_size=batch_size)
+    product_objs = Product.objects.bulk_create([
+        Product(
+            name=f'Product {i}',
+            slug=f'product-{tag}-{i}',
+            price=rnd.randint(1, 10_000),
+            quantity=rnd.randint(0, 100),
+            category=rnd.choice(category_objs),
+            owner=rnd.choice(user_objs),
+            description=f'<p>Description of <b>product {i}</b></p>',
+            search_document=build_search_document(f'Product {i}', f'<p>Description of <b>product {i}</b></p>'),
+            description_preview=build_description_preview(f'<p>Description of <b>product {i}</b></p>'),
+        )
+        for i in range(products)
+    ], batch_size=batch_size)
+    ProductImage.objects.bulk_create(
+        (ProductImage(product=product, image=f'product/images/seed/{product.slug}-{i}.jpg')
+         for product in product_objs
+         for i in range(images_per_product)),
+        batch_size=batch_size,
+    )
+
+    carts, wishlists = [], []
+    for user in user_objs:
+        for product in rnd.sample(product_objs, min(carts_per_user, len(product_objs))):
+            carts.append(Cart(user=user, product=product))
+        for product in rnd.sample(product_objs, min(wishlists_per_user, len(product_objs))):
+            wishlists.append(Wishlist(user=user, product=product))
+    Cart.objects.bulk_create(carts, batch_size=batch_size)
+    Wishlist.objects.bulk_create(wishlists, batch_size=batch_size)
+
+    return user_objs
+
+
+def delete_catalog(users):
+    """Undo :func:`seed_catalog`: delete the ``users`` it returned, their products and those products' categories."""
+    category_ids = set(Product.objects.filter(owner__in=users).values_list('category_id', flat=True))
+    CustomUser.objects.filter(pk__in=[user.pk for user in users]).delete()
+    Category.objects.filter(pk__in=category_ids).delete()
@@ -0,0 +1,115 @@
+from django.db.models import Count, Q
+from django_filters import rest_framework as filters
+
+from apps.models import Product
+from apps.registry import category_registry
+
+# Lower bounds of the price facet buckets; the last one is open-ended.
+PRICE_BUCKETS = (0, 100, 500, 1000, 5000)
+
+
+class ProductAttributeFilterSet(filters.FilterSet):
+    """Price range and stock filters. They validate without a query, so the async views use them as well."""
+    price_min = filters.NumberFilter(field_name='price', lookup_expr='gte')
+    price_max = filters.NumberFilter(field_name='price', lookup_expr='lte')
+    in_stock = filters.BooleanFilter(method='filter_in_stock')
+
+    class Meta:
+        model = Product
+        fields = ('price_min', 'price_max', 'in_stock')
+
+    def filter_in_stock(self, queryset, name, value):
+        return queryset.filter(stock_condition(value))
+
+
+class ProductFilterSet(ProductAttributeFilterSet):
+    class Meta:
+        model = Product
+        fields = ('category', 'owner', 'price_min', 'price_max', 'in_stock')
+
+
+def stock_condition(in_stock):
+    return Q(quantity__gt=0) if in_stock else Q(quantity=0)
+
+
+def wants_facets(request, param='facets'):
+    return request.query_params.get(param, '').lower() not in ('', '0', 'false')
+
+
+class ProductFacets:
+    """
+    Category, price and stock facet counts for a product listing from one grouped query.
+
+    ``queryset`` has the non-facet filters applied (search, owner). Grouped by category, each row
+    counts the products matching the price and stock filters, the products per price bucket
+    matching the stock filter and the products in and out of stock matching the price filter.
+    Each facet thus ignores its own filter, so it shows what picking another value would give,
+    and the rows of the selected category add up to the listing's total, which spares the
+    paginator its ``COUNT(*)``.
+    """
+
+    def __init__(self, queryset, category_id=None, price_min=None, price_max=None, in_stock=None,
+                 buckets=PRICE_BUCKETS):
+        self.queryset = queryset
+        self.category_id = category_id
+        self.price = Q()
+        if price_min is not None:
+            self.price &= Q(price__gte=price_min)
+        if price_max is not None:
+            self.price &= Q(price__lte=price_max)
+        self.stock = stock_condition(in_stock) if in_stock is not None else Q()
+        self.buckets = list(zip(buckets, [*buckets[1:], None]))
+
+    @classmethod
+    def for_request(cls, request, queryset):
+        """Facets for a listing request whose parameters the list view has already validated."""
+        params = request.query_params
+        owner = params.get('owner')
+        if owner:
+            queryset = queryset.filter(owner_id=owner)
+        attributes = ProductAttributeFilterSet(params, queryset=queryset)
+        attributes.is_valid()
+        cleaned = attributes.form.cleaned_data
+        category = params.get('category')
+        return cls(queryset, category_id=int(category) if category else None, price_min=cleaned.get('price_min'),
+                   price_max=cleaned.get('price_max'), in_stock=cleaned.get('in_stock'))
+
+    def query(self):
+        aggregates = {'matching': Count('id', filter=(self.price & self.stock) or None)}
+        for index, (low, high) in enumerate(self.buckets):
+            bucket = Q(price__gte=low) & (Q(price__lt=high) if high is not None else Q())
+            aggregates[f'price_{index}'] = Count('id', filter=bucket & self.stock)
+        aggregates['in_stock'] = Count('id', filter=self.price & stock_condition(True))
+        aggregates['out_of_stock'] = Count('id', filter=self.price & stock_condition(False))
+        return self.queryset.order_by().values('category_id').annotate(**aggregates)
+
+    def summarize(self, rows):
+        """``(facets, total)`` from the rows of :meth:`query`; category names come from the registry."""
+        categories, prices, stock, total = [], [0] * len(self.buckets), {'true': 0, 'false': 0}, 0
+        for row in rows:
+            if row['matching']:
+                categories.append({'id': row['category_id'], 'name': category_registry.name(row['category_id']),
+                                   'count': row['matching']})
+            if self.category_id is not None and row['category_id'] != self.category_id:
+                continue
+            total += row['matching']
+            for index in range(len(self.buckets)):
+                prices[index] += row[f'price_{index}']
+            stock['true'] += row['in_stock']
+            stock['false'] += row['out_of_stock']
+
+        categories.sort(key=lambda category: (-category['count'], category['name'] or ''))
+        facets = {
+            'category': categories,
+            'price': [{'min': low, 'max': high, 'count': count} for (low, high), count in zip(self.buckets, prices)],
+            'in_stock': stock,
+        }
+        return facets, total
+
+    def compute(self):
+        return self.summarize(self.query())
+
+    async def acompute(self):
+        rows = [row async for row in self.query()]
+        await category_registry.aensure_fresh({row['category_id'] for row in rows})
+        return self.summarize(rows)
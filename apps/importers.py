@@ -0,0 +1,205 @@
+import csv
+import json
+import os
+import time
+from collections import OrderedDict
+from itertools import islice
+
+from django.db import connections, router, transaction, DatabaseError, IntegrityError
+from django.db.models import Q
+
+from apps.cache import bump_versions_on_commit, category_version_key, PRODUCTS_VERSION
+from apps.models import Category, CustomUser, Product
+from apps.registry import COUNTS_VERSION
+from apps.search import build_description_preview, build_search_document, product_index
+
+
+class RowError(ValueError):
+    pass
+
+
+class ImportReport:
+    def __init__(self, max_errors):
+        self.max_errors = max_errors
+        self.rows = 0
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'error': message})
+
+    @property
+    def rate(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'rows': self.rows, 'created': self.created, 'failed': self.failed, 'errors': self.errors,
+            'seconds': round(self.elapsed, 3), 'rows_per_second': round(self.rate, 1),
+        }
+
+
+class ProductImporter:
+    """
+    Streams products from a CSV or JSON Lines file into ``bulk_create`` batches.
+
+    Columns: ``name``, ``price``, ``quantity``, ``category`` (name), ``owner`` (email or username)
+    and ``description``. Only one batch of rows is held in memory; categories come from a dict
+    loaded once (unknown names are created), owners from a bounded LRU filled with one query per
+    batch, and slugs from ``Product.allocate_slugs`` - so a batch costs a few queries however
+    large the file is.
+    """
+    formats = ('csv', 'jsonl')
+    owner_cache_size = 10_000
+
+    def __init__(self, batch_size=1000, max_errors=1000, default_owner=None, progress=None):
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.default_owner = default_owner
+        self.progress = progress
+        self.categories = {}
+        self.owners = OrderedDict()
+
+    def run(self, path, fmt=None):
+        fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt == 'ndjson':
+            fmt = 'jsonl'
+        if fmt not in self.formats:
+            raise ValueError(f'Unsupported format {fmt!r}; expected one of {", ".join(self.formats)}')
+
+        report = ImportReport(self.max_errors)
+        self.categories = dict(Category.objects.values_list('name', 'id'))
+        with open(path, newline='', encoding='utf-8') as file:
+            rows = self.read_csv(file) if fmt == 'csv' else self.read_jsonl(file)
+            while batch := list(islice(rows, self.batch_size)):
+                self.import_batch(batch, report)
+                report.elapsed = time.perf_counter() - report.started
+                if self.progress:
+                    self.progress(report)
+        product_index.invalidate()
+        return report
+
+    @staticmethod
+    def read_csv(file):
+        for line, row in enumerate(csv.DictReader(file), start=2):
+            yield line, row
+
+    @staticmethod
+    def read_jsonl(file):
+        for line, text in enumerate(file, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as exc:
+                yield line, exc
+                continue
+            yield line, row if isinstance(row, dict) else RowError('expected a JSON object')
+
+    def import_batch(self, batch, report):
+        report.rows += len(batch)
+        self.resolve_owners(row for _, row in batch if isinstance(row, dict))
+
+        products = []
+        for line, row in batch:
+            try:
+                if isinstance(row, Exception):
+                    raise RowError(str(row))
+                products.append((line, self.build(row)))
+            except RowError as exc:
+                report.error(line, str(exc))
+        if not products:
+            return
+
+        objs = [product for _, product in products]
+        try:
+            self.insert(objs)
+        except DatabaseError:
+            # One row the database refuses fails the whole batch: insert row by row to report just that one.
+            for line, obj in products:
+                try:
+                    self.insert([obj])
+                except DatabaseError as exc:
+                    report.error(line, f'insert failed: {exc}')
+                else:
+                    report.created += 1
+            return
+        report.created += len(objs)
+
+    def insert(self, objs):
+        for attempt in range(2):
+            Product.allocate_slugs(objs)
+            try:
+                with transaction.atomic():
+                    Product.objects.bulk_create(objs)
+                    bump_versions_on_commit(PRODUCTS_VERSION, COUNTS_VERSION,
+                                            *{category_version_key(obj.category_id) for obj in objs})
+                return
+            except DatabaseError as exc:
+                for obj in objs:
+                    obj.slug, obj.pk = '', None
+                # Most likely a concurrent writer took one of our slugs: re-allocate once.
+                if attempt or not isinstance(exc, IntegrityError):
+                    raise
+
+    def build(self, row):
+        name = str(row.get('name') or '').strip()
+        if not name:
+            raise RowError('name is required')
+        if len(name) > 255:
+            raise RowError('name is longer than 255 characters')
+        price = self.to_int(row.get('price'), 'price')
+        quantity = self.to_int(row.get('quantity') or 0, 'quantity')
+
+        owner_key = str(row.get('owner') or '').strip()
+        owner_id = self.owners.get(owner_key) if owner_key else self.default_owner
+        if owner_id is None:
+            raise RowError(f'unknown owner {owner_key!r}' if owner_key else 'owner is required')
+
+        description = row.get('description') or None
+        return Product(
+            name=name, price=price, quantity=quantity, description=description,
+            category_id=self.category_id(row.get('category')), owner_id=owner_id,
+            search_document=build_search_document(name, description),
+            description_preview=build_description_preview(description),
+        )
+
+    def category_id(self, name):
+        name = str(name or '').strip()
+        if not name:
+            raise RowError('category is required')
+        if name not in self.categories:
+            self.categories[name] = Category.objects.create(name=name).pk
+        return self.categories[name]
+
+    def resolve_owners(self, rows):
+        keys = {str(row.get('owner') or '').strip() for row in rows} - {''}
+        for key in keys & self.owners.keys():
+            self.owners.move_to_end(key)
+        missing = keys - self.owners.keys()
+        # Evict before filling, so every owner of the current batch stays resolvable.
+        while self.owners and len(self.owners) + len(missing) > self.owner_cache_size:
+            self.owners.popitem(last=False)
+        if missing:
+            users = CustomUser.objects.filter(Q(email__in=missing) | Q(username__in=missing))
+            for pk, email, username in users.values_list('pk', 'email', 'username'):
+                for key in {email, username} & missing:
+                    self.owners[key] = pk
+
+    @staticmethod
+    def to_int(value, field):
+        try:
+            value = int(str(value).strip())
+        except (TypeError, ValueError):
+            raise RowError(f'{field} must be an integer')
+        # Out-of-range values would fail the whole batch insert (OverflowError on SQLite, DataError on PostgreSQL).
+        connection = connections[router.db_for_write(Product)]
+        low, high = connection.ops.integer_field_range(Product._meta.get_field(field).get_internal_type())
+        if not low <= value <= high:
+            raise RowError(f'{field} must be between {low} and {high}')
+        return value
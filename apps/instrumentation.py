@@ -0,0 +1,199 @@
+import bisect
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import redis
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from apps.utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = 'metrics:http'
+DURATION_HISTOGRAM = 'apps_http_request_duration_seconds'
+# Upper bounds in seconds of the request duration histogram.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def is_enabled():
+    return getattr(settings, 'INSTRUMENTATION_ENABLED', False)
+
+
+class RequestMetrics:
+    """What one request spent: queries (and exact repeats), cache lookups and time per phase."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.duplicates = 0
+        self.statements = set()
+        self.cache = defaultdict(lambda: [0, 0])
+        self.phases = defaultdict(float)
+
+    def record_query(self, sql, params, duration):
+        self.queries += 1
+        self.phases['db'] += duration
+        statement = (sql, repr(params))
+        if statement in self.statements:
+            self.duplicates += 1
+        else:
+            self.statements.add(statement)
+
+    def server_timing(self, total):
+        entries = [f'total;dur={total * 1000:.1f}']
+        entries.append(f'db;dur={self.phases["db"] * 1000:.1f};'
+                       f'desc="{self.queries} queries, {self.duplicates} duplicate"')
+        for name, duration in self.phases.items():
+            if name != 'db':
+                entries.append(f'{name};dur={duration * 1000:.1f}')
+        for name, (hits, misses) in self.cache.items():
+            entries.append(f'cache-{name};desc="{hits} hit, {misses} miss"')
+        return ', '.join(entries)
+
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+@contextmanager
+def phase(name):
+    """Add the block's duration to phase ``name`` of the current request; a no-op outside instrumented requests."""
+    metrics = current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.phases[name] += time.perf_counter() - started
+
+
+def record_cache(name, hit):
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.cache[name][0 if hit else 1] += 1
+
+
+def instrument_query(execute, sql, params, many, context):
+    """``execute_wrapper`` installed on every connection; only requests under the middleware pay for timing."""
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, params, time.perf_counter() - started)
+
+
+def install_query_instrumentation(sender, connection, **kwargs):
+    """``connection_created`` receiver: contextvars follow the request into ``sync_to_async`` threads."""
+    if instrument_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(instrument_query)
+
+
+class InstrumentedJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with phase('render'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class InstrumentedListSerializer(serializers.ListSerializer):
+    """Set as ``Meta.list_serializer_class`` to time list serialization as the ``serialize`` phase."""
+
+    def to_representation(self, data):
+        with phase('serialize'):
+            return super().to_representation(data)
+
+
+class RouteMetrics:
+    """
+    Per-route aggregates of instrumented requests. Each process accumulates locally and adds its
+    deltas to one Redis hash at most every ``flush_interval`` seconds, so the exported totals
+    cover all workers while a request costs no extra round trip in between.
+    """
+
+    def __init__(self, flush_interval):
+        self.flush_interval = flush_interval
+        self.pending = defaultdict(float)
+        self.flushed_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def observe(self, route, method, status, metrics, duration):
+        labels = f'route="{route}",method="{method}"'
+        bound = bisect.bisect_left(DURATION_BUCKETS, duration)
+        le = str(DURATION_BUCKETS[bound]) if bound < len(DURATION_BUCKETS) else '+Inf'
+        with self.lock:
+            pending = self.pending
+            pending[f'apps_http_requests_total|{labels},status="{status // 100}xx"'] += 1
+            pending[f'apps_http_request_duration_seconds_bucket|{labels},le="{le}"'] += 1
+            pending[f'apps_http_request_duration_seconds_sum|{labels}'] += duration
+            pending[f'apps_http_request_duration_seconds_count|{labels}'] += 1
+            pending[f'apps_db_queries_total|{labels}'] += metrics.queries
+            pending[f'apps_db_duplicate_queries_total|{labels}'] += metrics.duplicates
+            for name, seconds in metrics.phases.items():
+                pending[f'apps_phase_seconds_total|{labels},phase="{name}"'] += seconds
+            for name, (hits, misses) in metrics.cache.items():
+                pending[f'apps_cache_requests_total|{labels},cache="{name}",result="hit"'] += hits
+                pending[f'apps_cache_requests_total|{labels},cache="{name}",result="miss"'] += misses
+            due = time.monotonic() - self.flushed_at >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(float)
+            self.flushed_at = time.monotonic()
+        if not pending:
+            return
+        pipe = get_redis_client().pipeline(transaction=False)
+        for field, value in pending.items():
+            pipe.hincrbyfloat(METRICS_KEY, field, value)
+        try:
+            pipe.execute()
+        except redis.RedisError:
+            logger.warning('Request metrics dropped: Redis unavailable', exc_info=True)
+
+    def render(self):
+        """Prometheus text exposition of the totals, histogram buckets made cumulative."""
+        self.flush()
+        samples = defaultdict(float)
+        for field, value in get_redis_client().hgetall(METRICS_KEY).items():
+            samples[field.decode()] += float(value)
+
+        buckets = defaultdict(dict)
+        families = defaultdict(list)
+        for field in sorted(samples):
+            name, labels = field.split('|', 1)
+            if name.endswith('_bucket'):
+                base, le = labels.rsplit(',le=', 1)
+                buckets[(name, base)][le.strip('"')] = samples[field]
+            else:
+                families[self.family(name)].append(f'{name}{{{labels}}} {samples[field]:g}')
+
+        for (name, base), counts in sorted(buckets.items()):
+            total = 0
+            for bound in [*map(str, DURATION_BUCKETS), '+Inf']:
+                total += counts.get(bound, 0)
+                families[self.family(name)].append(f'{name}{{{base},le="{bound}"}} {total:g}')
+
+        lines = []
+        for family, family_lines in sorted(families.items()):
+            lines.append(f'# TYPE {family} {"histogram" if family == DURATION_HISTOGRAM else "counter"}')
+            lines.extend(family_lines)
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def family(name):
+        if name.startswith(DURATION_HISTOGRAM):
+            return DURATION_HISTOGRAM
+        return name
+
+
+route_metrics = RouteMetrics(flush_interval=getattr(settings, 'INSTRUMENTATION_FLUSH_INTERVAL', 5))
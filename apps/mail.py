@@ -0,0 +1,201 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from smtplib import SMTPException, SMTPServerDisconnected
+
+from celery.signals import worker_process_shutdown
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+
+from apps.utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+CONFIRMATION_SUBJECT = "Registration on kodeks24"
+CONFIRMATION_QUEUE = 'mail:confirmation:queue'
+DRAIN_SCHEDULED = 'mail:confirmation:drain-scheduled'
+# A draining worker holds its batch in a processing list until each message is sent, and renews its
+# lease as it goes; the batch of a worker whose lease lapsed (killed mid-drain) is put back in the queue.
+PROCESSING_PREFIX = 'mail:confirmation:processing'
+LEASE_PREFIX = 'mail:confirmation:lease'
+PROCESSING_LEASE = 120
+
+
+def confirmation_sent_key(email):
+    return f'mail:confirmation:sent:{email.lower()}'
+
+
+class PersistentConnection:
+    """
+    One SMTP connection per process, opened on first use and kept across tasks, so a worker
+    pays the TCP/TLS handshake once instead of once per email. A connection the server has
+    dropped (idle timeout) is reopened once before the send fails.
+    """
+
+    def __init__(self):
+        self.connection = None
+        self.lock = threading.Lock()
+
+    def send(self, message):
+        with self.lock:
+            for attempt in range(2):
+                if self.connection is None:
+                    self.connection = get_connection(fail_silently=False)
+                    self.connection.open()
+                try:
+                    return self.connection.send_messages([message])
+                except SMTPServerDisconnected:
+                    self.close_locked()
+                    if attempt:
+                        raise
+
+    def close(self):
+        with self.lock:
+            self.close_locked()
+
+    def close_locked(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            finally:
+                self.connection = None
+
+
+smtp = PersistentConnection()
+
+
+@worker_process_shutdown.connect
+def close_smtp_connection(**kwargs):
+    smtp.close()
+
+
+def queue_confirmation(email, message, window, schedule=True):
+    """
+    Queue a confirmation email unless one was queued for ``email`` in the last ``window`` seconds,
+    and make sure a drain is scheduled. Returns False for a collapsed duplicate.
+    """
+    if not cache.add(confirmation_sent_key(email), 1, window):
+        return False
+    get_redis_client().rpush(CONFIRMATION_QUEUE, json.dumps({'to': email, 'body': message}))
+    if schedule:
+        schedule_drain()
+    return True
+
+
+def schedule_drain():
+    """Schedule one drain per batch delay, however many messages are queued meanwhile."""
+    from apps.tasks import drain_confirmation_queue
+
+    delay = getattr(settings, 'CONFIRMATION_MAIL_BATCH_DELAY', 1)
+    if cache.add(DRAIN_SCHEDULED, 1, delay + 30):
+        drain_confirmation_queue.apply_async(countdown=delay)
+
+
+def worker_id():
+    # Read per call: prefork workers share the parent's module state.
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def pop_batch(size, worker):
+    """
+    Move up to ``size`` messages from the head of the queue to ``worker``'s processing list, where
+    they stay until :func:`acknowledge` - a worker dying mid-batch doesn't lose them.
+    """
+    pipe = get_redis_client().pipeline(transaction=True)
+    pipe.set(f'{LEASE_PREFIX}:{worker}', 1, ex=PROCESSING_LEASE)
+    for _ in range(size):
+        pipe.lmove(CONFIRMATION_QUEUE, f'{PROCESSING_PREFIX}:{worker}', 'LEFT', 'RIGHT')
+    return [json.loads(item) for item in pipe.execute()[1:] if item is not None]
+
+
+def acknowledge(worker):
+    """Drop the oldest message of ``worker``'s batch once it's sent, and renew the lease."""
+    pipe = get_redis_client().pipeline(transaction=True)
+    pipe.lpop(f'{PROCESSING_PREFIX}:{worker}')
+    pipe.expire(f'{LEASE_PREFIX}:{worker}', PROCESSING_LEASE)
+    pipe.execute()
+
+
+def release(worker):
+    """Put ``worker``'s unsent messages back at the head of the queue, in order; returns how many."""
+    client = get_redis_client()
+    released = 0
+    while client.lmove(f'{PROCESSING_PREFIX}:{worker}', CONFIRMATION_QUEUE, 'RIGHT', 'LEFT') is not None:
+        released += 1
+    client.delete(f'{LEASE_PREFIX}:{worker}')
+    return released
+
+
+def recover_abandoned():
+    """Release the batches of workers whose lease lapsed; returns how many messages went back."""
+    client = get_redis_client()
+    recovered = 0
+    for key in client.scan_iter(match=f'{PROCESSING_PREFIX}:*'):
+        worker = key.decode()[len(PROCESSING_PREFIX) + 1:]
+        if not client.exists(f'{LEASE_PREFIX}:{worker}'):
+            recovered += release(worker)
+    if recovered:
+        logger.warning('Confirmation mail: %s messages of stopped workers requeued', recovered)
+    return recovered
+
+
+def build_message(item):
+    return EmailMessage(subject=CONFIRMATION_SUBJECT, body=item['body'], from_email=settings.EMAIL_HOST_USER,
+                        to=[item['to']])
+
+
+class DrainReport:
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.batches = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self):
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {'sent': self.sent, 'failed': self.failed, 'batches': self.batches,
+                'seconds': round(self.elapsed, 3), 'messages_per_second': round(self.rate, 1)}
+
+
+def drain(batch_size=None, max_batches=None):
+    """
+    Send queued confirmations in batches of ``batch_size`` over the process's SMTP connection.
+
+    Stops when the queue is empty, after ``max_batches``, or at the first SMTP error - the
+    unsent rest of that batch goes back to the head of the queue and the error is re-raised
+    so the caller can retry later. A batch left behind by a worker that was killed goes back
+    once its lease lapses, so a message is sent at least once. Returns a :class:`DrainReport`.
+    """
+    batch_size = batch_size or getattr(settings, 'CONFIRMATION_MAIL_BATCH_SIZE', 50)
+    report = DrainReport()
+    worker = worker_id()
+    recover_abandoned()
+    while max_batches is None or report.batches < max_batches:
+        batch = pop_batch(batch_size, worker)
+        if not batch:
+            break
+        report.batches += 1
+        for index, item in enumerate(batch):
+            try:
+                smtp.send(build_message(item))
+            except SMTPException:
+                report.failed += len(batch) - index
+                release(worker)
+                logger.info('Confirmation mail: %s', report.as_dict())
+                raise
+            acknowledge(worker)
+            report.sent += 1
+    if report.sent:
+        logger.info('Confirmation mail: %s', report.as_dict())
+    return report
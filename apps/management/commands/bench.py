@@ -0,0 +1,115 @@
+import json
+import platform
+from datetime import datetime, timezone
+
+import django
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps import urls
+from apps.benchmarks import (
+    SKIPPED_ROUTES, ClientRunner, HTTPRunner, build_scenarios, compare, run_scenario, seeded_catalog, uncovered_routes,
+)
+from apps.factories import CATALOG_SCALES
+from apps.models import CustomUser, Product
+from apps.registry import category_registry
+
+
+class Command(BaseCommand):
+    help = "Benchmark every route in apps/urls.py on a seeded catalog; with --baseline, fail on regressions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(CATALOG_SCALES), default='small')
+        for name in ('categories', 'products', 'users'):
+            parser.add_argument(f'--{name}', type=int, help=f'Override the number of {name} of the scale.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--scenario', action='append', help='Run only these scenarios (repeatable).')
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before each scenario.')
+        parser.add_argument('--url', help='Base URL of a running server, e.g. http://localhost:8000/api/v1')
+        parser.add_argument('--concurrency', type=int, default=8, help='Threads for --url runs.')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument('--baseline', help='Compare against results from an earlier run.')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Relative slowdown that counts as a regression (default 0.2 = 20%%).')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)
+
+        sizes = dict(CATALOG_SCALES[options['scale']])
+        for name in ('categories', 'products', 'users'):
+            if options[name] is not None:
+                sizes[name] = options[name]
+        with seeded_catalog(seed=options['seed'], **sizes) as users:
+            try:
+                results = self.run(users, Product.objects.filter(owner__in=users), options)
+            finally:
+                CustomUser.objects.filter(username='bench-register').delete()
+
+        report = {
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'scale': options['scale'],
+                'sizes': sizes,
+                'mode': 'http' if options['url'] else 'client',
+                'concurrency': options['concurrency'] if options['url'] else 1,
+                'iterations': options['iterations'],
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'skipped': SKIPPED_ROUTES,
+            },
+            'scenarios': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+        if baseline is not None:
+            regressions = compare(results, baseline['scenarios'], options['threshold'])
+            if regressions:
+                raise CommandError('Regressions against the baseline:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+
+    def run(self, users, products, options):
+        slugs = list(products.values_list('slug', flat=True))
+        scenarios = build_scenarios({
+            'slugs': slugs,
+            'product_ids': list(products.values_list('pk', flat=True)[:100]),
+            'category_id': products.values_list('category_id', flat=True).first(),
+            'username': users[0].username,
+            'password': 'password',
+        })
+        for route in uncovered_routes(urls.urlpatterns, scenarios):
+            self.stderr.write(f'Route {route!r} has no benchmark scenario.')
+        if options['scenario']:
+            scenarios = [scenario for scenario in scenarios if scenario.name in options['scenario']]
+
+        token = str(RefreshToken.for_user(users[0]).access_token)
+        if options['url']:
+            runner = HTTPRunner(options['url'], token, options['concurrency'])
+        else:
+            runner = ClientRunner(token)
+        category_registry.refresh()
+
+        results = {}
+        for scenario in scenarios:
+            if options['cold']:
+                cache.clear()
+            result = run_scenario(runner, scenario, options['iterations'], options['warmup'])
+            results[scenario.name] = result
+            latency = result['latency_ms']
+            self.stdout.write(
+                f'{scenario.name:24} {result["throughput_rps"]:8.1f} req/s  p50 {latency["p50"]:7.1f}ms  '
+                f'p95 {latency["p95"]:7.1f}ms  p99 {latency["p99"]:7.1f}ms  '
+                f'{result["queries_per_request"]} queries  {result["payload_bytes"]} B  '
+                f'{result["errors"]} errors'
+            )
+        return results
@@ -0,0 +1,86 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+
+from apps.benchmarks import client_address, percentile, seeded_catalog
+from apps.models import Product
+
+
+class Command(BaseCommand):
+    help = "Compare catalog reads through the sync views and the async views on the same seeded data."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--warm', action='store_true', help='Keep the response cache between passes.')
+
+    def handle(self, *args, **options):
+        sizes = dict(categories=10, products=options['products'], users=2, carts_per_user=0, wishlists_per_user=0)
+        with seeded_catalog(**sizes) as users:
+            paths = self.get_paths(Product.objects.filter(owner__in=users), options['requests'])
+            for label, run in (('sync  WSGI', self.run_sync), ('async ASGI', self.run_async)):
+                if not options['warm']:
+                    cache.clear()
+                started = time.perf_counter()
+                results = run(paths, options['concurrency'])
+                self.report(label, results, time.perf_counter() - started)
+
+    @staticmethod
+    def get_paths(products, requests):
+        """A mix of list pages, filtered/sorted lists and detail pages, cycled to ``requests`` paths."""
+        slugs = list(products.values_list('slug', flat=True))
+        category = products.values_list('category_id', flat=True).first()
+        pages = max(len(slugs) // 20, 1)
+        category_pages = max(products.filter(category_id=category).count() // 5, 1)
+        paths = []
+        for index in range(requests):
+            kind = index % 4
+            if kind == 0:
+                paths.append(f'/api/v1/{{}}products?page={index // 4 % pages + 1}&page_size=20')
+            elif kind == 1:
+                page = index // 4 % category_pages + 1
+                paths.append(f'/api/v1/{{}}products?category={category}&ordering=-price&page={page}')
+            elif kind == 2:
+                paths.append(f'/api/v1/{{}}products/{slugs[index % len(slugs)]}/')
+            else:
+                paths.append(f'/api/v1/{{}}categories?page_size=10')
+        return paths
+
+    def run_sync(self, paths, concurrency):
+        client = Client()
+
+        def fetch(index):
+            started = time.perf_counter()
+            response = client.get(paths[index].format(''), REMOTE_ADDR=client_address(index))
+            return response.status_code, time.perf_counter() - started
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(fetch, range(len(paths))))
+
+    def run_async(self, paths, concurrency):
+        async def main():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def fetch(index):
+                client = AsyncClient(client=(client_address(index), 0))
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.get(paths[index].format('async/'))
+                    return response.status_code, time.perf_counter() - started
+
+            return await asyncio.gather(*(fetch(index) for index in range(len(paths))))
+
+        return asyncio.run(main())
+
+    def report(self, label, results, elapsed):
+        latencies = sorted(latency * 1000 for _, latency in results)
+        errors = sum(status != 200 for status, _ in results)
+        self.stdout.write(
+            f'{label}: {len(results)} requests in {elapsed:.2f}s, {len(results) / elapsed:.1f} req/s, '
+            f'p50 {percentile(latencies, 0.50):.1f}ms, p99 {percentile(latencies, 0.99):.1f}ms, {errors} errors'
+        )
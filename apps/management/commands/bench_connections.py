@@ -0,0 +1,125 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.benchmarks import percentile, seeded_catalog
+from apps.dbpool import connection_stats
+
+MODES = {
+    # What settings used to give: a new connection for every request.
+    'per-request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'pool': None},
+    'persistent': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True, 'pool': None},
+    'pool': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True, 'pool': {'min_size': 2, 'max_size': 4}},
+}
+
+
+class Command(BaseCommand):
+    help = "Compare request latency with a connection per request, persistent connections and a pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--route', action='append', help='URL names to request (default: cart and wishlist).')
+        parser.add_argument('--mode', action='append', choices=sorted(MODES), help='Modes to run (default: all).')
+
+    def handle(self, *args, **options):
+        connection = connections[DEFAULT_DB_ALIAS]
+        modes = options['mode'] or [mode for mode in MODES if mode != 'pool' or supports_pool(connection)]
+        if 'pool' in modes and not supports_pool(connection):
+            raise CommandError('The pool mode needs PostgreSQL with psycopg 3 and psycopg_pool.')
+
+        urls = [reverse(name) for name in options['route'] or ('cart', 'wishlist')]
+        original = {key: connection.settings_dict.get(key) for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+        original_options = dict(connection.settings_dict['OPTIONS'])
+        results = {}
+        with seeded_catalog(products=50, users=1, carts_per_user=5, wishlists_per_user=5) as users:
+            client = APIClient()
+            client.force_authenticate(users[0])
+            try:
+                for mode in modes:
+                    self.configure(connection, MODES[mode])
+                    results[mode] = self.run(client, urls, options['requests'], options['warmup'])
+            finally:
+                self.configure(connection, {**original, 'pool': original_options.get('pool')})
+
+        baseline = results.get('per-request')
+        for mode, result in results.items():
+            line = (f'{mode:12} mean {result["mean"]:6.2f}ms  p50 {result["p50"]:6.2f}ms  p95 {result["p95"]:6.2f}ms  '
+                    f'{result["connects"]} connections for {result["requests"]} requests')
+            if result['acquire_ms'] is not None:
+                line += f', {result["acquire_ms"]:.3f}ms per acquire'
+            if baseline is not None and mode != 'per-request':
+                line += f'  saves {baseline["mean"] - result["mean"]:.2f}ms per request'
+            self.stdout.write(line)
+
+    @staticmethod
+    def configure(connection, mode):
+        """Apply ``mode`` to the live connection settings; takes effect from the next connect."""
+        connection.close()
+        if getattr(connection, 'pool', None):
+            connection.close_pool()
+        connection.settings_dict['CONN_MAX_AGE'] = mode['CONN_MAX_AGE']
+        connection.settings_dict['CONN_HEALTH_CHECKS'] = mode['CONN_HEALTH_CHECKS']
+        connection.settings_dict['OPTIONS'].pop('pool', None)
+        if mode['pool']:
+            connection.settings_dict['OPTIONS']['pool'] = mode['pool']
+
+    def run(self, client, urls, requests, warmup):
+        connects = 0
+
+        def count(**kwargs):
+            nonlocal connects
+            connects += 1
+
+        for index in range(warmup):
+            self.request(client, urls[index % len(urls)])
+        acquires = connection_stats.acquires[DEFAULT_DB_ALIAS]
+        acquire_seconds = connection_stats.acquire_seconds[DEFAULT_DB_ALIAS]
+        connection_created.connect(count)
+        latencies = []
+        try:
+            for index in range(requests):
+                started = time.perf_counter()
+                self.request(client, urls[index % len(urls)])
+                latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            connection_created.disconnect(count)
+
+        acquired = connection_stats.acquires[DEFAULT_DB_ALIAS] - acquires
+        latencies.sort()
+        return {
+            'requests': requests,
+            'connects': connects,
+            'mean': statistics.fmean(latencies),
+            'p50': percentile(latencies, 0.50),
+            'p95': percentile(latencies, 0.95),
+            # Only the apps.backends.postgresql backend times acquisitions.
+            'acquire_ms': (connection_stats.acquire_seconds[DEFAULT_DB_ALIAS] - acquire_seconds) / acquired * 1000
+            if acquired else None,
+        }
+
+    @staticmethod
+    def request(client, url):
+        # The test client skips the handler's close_old_connections; do it at both ends like a real request.
+        close_old_connections()
+        response = client.get(url)
+        close_old_connections()
+        if response.status_code != 200:
+            raise CommandError(f'GET {url} returned {response.status_code}')
+
+
+def supports_pool(connection):
+    if connection.vendor != 'postgresql':
+        return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        return False
+    return is_psycopg3
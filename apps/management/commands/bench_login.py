@@ -0,0 +1,52 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+
+from apps.benchmarks import client_address
+from apps.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Measure logins/sec of one process for the sync WSGI login and the async pooled login."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent async logins.')
+
+    def handle(self, *args, **options):
+        email, password = 'bench-login@example.com', 'bench-login-password'
+        CustomUser.objects.filter(email=email).delete()
+        CustomUser.objects.create_user(email=email, password=password, username='bench-login', is_active=True)
+        body = {'email_or_username': email, 'password': password}
+        try:
+            client = Client()
+            started = time.perf_counter()
+            statuses = [client.post('/api/v1/login', body, content_type='application/json',
+                                    REMOTE_ADDR=client_address(index)).status_code
+                        for index in range(options['requests'])]
+            self.report('sync  /login', statuses, time.perf_counter() - started)
+
+            started = time.perf_counter()
+            statuses = asyncio.run(self.run_async(body, options['requests'], options['concurrency']))
+            self.report('async /login/async', statuses, time.perf_counter() - started)
+        finally:
+            CustomUser.objects.filter(email=email).delete()
+
+    async def run_async(self, body, requests, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def login(index):
+            # ASGI takes the peer address from the scope, which AsyncClient fills from its defaults.
+            client = AsyncClient(client=(client_address(index), 0))
+            async with semaphore:
+                response = await client.post('/api/v1/login/async', body, content_type='application/json')
+                return response.status_code
+
+        return await asyncio.gather(*(login(index) for index in range(requests)))
+
+    def report(self, label, statuses, elapsed):
+        ok = statuses.count(200)
+        self.stdout.write(f'{label}: {len(statuses)} requests in {elapsed:.2f}s, {ok / elapsed:.1f} logins/s, '
+                          f'{len(statuses) - ok} rejected')
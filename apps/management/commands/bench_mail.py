@@ -0,0 +1,44 @@
+import time
+
+from django.core.cache import cache
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand
+
+from apps import mail
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure confirmation emails/sec through the configured EMAIL_BACKEND: one connection per "
+        "message (the old send_mail path) versus the queued, batched persistent connection. "
+        "Point EMAIL_HOST/EMAIL_PORT at a local stand-in, e.g. `python -m aiosmtpd -n -l localhost:8025`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=500)
+        parser.add_argument('--batch-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        count = options['messages']
+        recipients = [f'bench-mail-{index}@example.com' for index in range(count)]
+
+        started = time.perf_counter()
+        for email in recipients:
+            send_mail(mail.CONFIRMATION_SUBJECT, 'Your code: 123456', None, [email], fail_silently=False)
+        self.report('send_mail per message', count, time.perf_counter() - started)
+
+        cache.delete_many([mail.confirmation_sent_key(email) for email in recipients])
+        # Queue everything first and drain here, instead of in a worker.
+        for email in recipients + recipients:
+            mail.queue_confirmation(email, 'Your code: 123456', window=60, schedule=False)
+        queued = mail.get_redis_client().llen(mail.CONFIRMATION_QUEUE)
+        self.stdout.write(f'queued {queued} of {2 * count} (duplicates collapsed)')
+        try:
+            report = mail.drain(batch_size=options['batch_size'])
+        finally:
+            cache.delete_many([mail.confirmation_sent_key(email) for email in recipients])
+            mail.smtp.close()
+        self.report(f'batched drain ({report.batches} batches)', report.sent, report.elapsed)
+
+    def report(self, label, sent, elapsed):
+        self.stdout.write(f'{label}: {sent} emails in {elapsed:.2f}s, {sent / elapsed:.1f} emails/s')
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from apps.importers import ProductImporter
+from apps.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Stream products from a CSV or JSON Lines file into the catalog in bulk_create batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=ProductImporter.formats, help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--owner', help='Email or username used for rows without an owner column.')
+        parser.add_argument('--max-errors', type=int, default=100, help='Row errors to list in the report.')
+
+    def handle(self, *args, **options):
+        default_owner = None
+        if options['owner']:
+            default_owner = CustomUser.objects.filter(
+                Q(email=options['owner']) | Q(username=options['owner'])
+            ).values_list('pk', flat=True).first()
+            if default_owner is None:
+                raise CommandError(f'Unknown owner {options["owner"]!r}')
+
+        importer = ProductImporter(
+            batch_size=options['batch_size'], max_errors=options['max_errors'], default_owner=default_owner,
+            progress=lambda report: self.stdout.write(
+                f'{report.rows} rows, {report.created} created, {report.failed} failed '
+                f'({report.rate:.0f} rows/s)'
+            ),
+        )
+        try:
+            report = importer.run(options['path'], options['format'])
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc)
+
+        for error in report.errors:
+            self.stderr.write(f'line {error["line"]}: {error["error"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {report.created} of {report.rows} rows in {report.elapsed:.1f}s ({report.rate:.0f} rows/s), '
+            f'{report.failed} failed.'
+        ))
@@ -0,0 +1,67 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction, OperationalError
+
+from apps import stock
+from apps.benchmarks import seeded_catalog
+from apps.models import Product
+
+
+class Command(BaseCommand):
+    help = ("Hammer stock.reserve() on one product from many threads and fail on any oversell. "
+            "Run against PostgreSQL: SQLite serializes writers and reports 'database is locked' instead.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stock', type=int, default=100)
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--attempts', type=int, default=20, help='Reservations attempted per thread.')
+        parser.add_argument('--quantity', type=int, default=1, help='Units per reservation.')
+
+    def handle(self, *args, **options):
+        sizes = dict(categories=1, products=1, images_per_product=0, users=1, carts_per_user=0, wishlists_per_user=0)
+        with seeded_catalog(**sizes) as users:
+            product = Product.objects.filter(owner=users[0]).get()
+            Product.objects.filter(pk=product.pk).update(quantity=options['stock'])
+            reserved, out_of_stock, errors, elapsed = self.run(product, options)
+            remaining = Product.objects.values_list('quantity', flat=True).get(pk=product.pk)
+
+        attempts = options['threads'] * options['attempts']
+        self.stdout.write(f'{attempts} attempts in {elapsed:.2f}s ({attempts / elapsed:.0f}/s): '
+                          f'{len(reserved)} reserved, {len(out_of_stock)} out of stock, {len(errors)} errors, '
+                          f'{remaining} left')
+        if sum(reserved) + remaining != options['stock']:
+            raise CommandError(f'Stock mismatch: reserved {sum(reserved)} + left {remaining} != {options["stock"]}')
+        if errors:
+            raise CommandError(f'{len(errors)} reservations failed, e.g. {errors[0]}')
+        self.stdout.write(self.style.SUCCESS('No oversell.'))
+
+    @staticmethod
+    def run(product, options):
+        reserved, out_of_stock, errors = [], [], []
+        start = threading.Barrier(options['threads'])
+
+        def worker():
+            try:
+                start.wait()
+                for _ in range(options['attempts']):
+                    try:
+                        with transaction.atomic():
+                            stock.reserve(product.pk, options['quantity'])
+                        reserved.append(options['quantity'])
+                    except stock.OutOfStock:
+                        out_of_stock.append(1)
+                    except OperationalError as exc:
+                        errors.append(str(exc))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return reserved, out_of_stock, errors, elapsed
@@ -0,0 +1,17 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from apps import telemetry
+
+
+class Command(BaseCommand):
+    help = "Print the aggregated Celery task telemetry (counts, queue wait and runtime percentiles)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Clear the aggregates after printing them.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(telemetry.task_stats(), indent=2))
+        if options['reset']:
+            telemetry.reset()
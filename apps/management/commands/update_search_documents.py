@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from apps.models import Product
+from apps.search import build_description_preview, build_search_document
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Product.search_document and description_preview from name and description, e.g. after "
+        "enabling full-text search or adding the preview column."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        batch, updated = [], 0
+        fields = ['search_document', 'description_preview']
+        queryset = Product.objects.only('id', 'name', 'description', *fields).order_by('id')
+        for product in queryset.iterator(chunk_size=batch_size):
+            document = build_search_document(product.name, product.description)
+            preview = build_description_preview(product.description)
+            if (document, preview) != (product.search_document, product.description_preview):
+                product.search_document, product.description_preview = document, preview
+                batch.append(product)
+            if len(batch) >= batch_size:
+                updated += Product.objects.bulk_update(batch, fields)
+                batch = []
+        if batch:
+            updated += Product.objects.bulk_update(batch, fields)
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} products.'))
@@ -0,0 +1,108 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.exceptions import MiddlewareNotUsed
+
+from apps import instrumentation, routers
+
+
+class InstrumentationMiddleware:
+    """
+    Measures each request with :mod:`apps.instrumentation`: SQL queries (and exact repeats), cache
+    hits and misses, and time per phase. It adds them as a ``Server-Timing`` header and folds them
+    into the per-route totals served by the metrics endpoint.
+
+    With ``INSTRUMENTATION_ENABLED`` off the middleware removes itself at startup and no query
+    wrapper is installed, so requests pay nothing.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not instrumentation.is_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics = instrumentation.RequestMetrics()
+        token = instrumentation.current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentation.current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = instrumentation.RequestMetrics()
+        token = instrumentation.current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            instrumentation.current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    @staticmethod
+    def finish(request, response, metrics):
+        duration = time.perf_counter() - metrics.started
+        response['Server-Timing'] = metrics.server_timing(duration)
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match else 'unmatched'
+        instrumentation.route_metrics.observe(route, request.method, response.status_code, metrics, duration)
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Scopes :mod:`apps.routers` state to the request. Views opt in to replica reads with
+    ``ReplicaReadMixin``; a request that writes records the user's write time, so that user's
+    reads stay on the primary until the replicas have applied it.
+
+    Without ``REPLICA_DATABASES`` the middleware removes itself at startup.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not routers.replicas.aliases:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state = routers.RoutingState()
+        token = routers.current_routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.current_routing.reset(token)
+        if state.wrote:
+            self.record_write(request)
+        return response
+
+    async def __acall__(self, request):
+        state = routers.RoutingState()
+        token = routers.current_routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.current_routing.reset(token)
+        if state.wrote:
+            # request.user may still be Django's lazy session user, which loads synchronously.
+            await sync_to_async(self.record_write)(request)
+        return response
+
+    @staticmethod
+    def record_write(request):
+        # DRF puts the user it authenticated on the underlying request.
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            routers.record_write(user.pk)
@@ -0,0 +1,120 @@
+from functools import cached_property
+
+from rest_framework.permissions import SAFE_METHODS
+
+from apps import routers
+
+
+class SerializerRelationsMixin:
+    """
+    Loads the relations declared on ``serializer_class.Meta`` up front, so a page
+    of N rows costs a fixed number of queries instead of one per row.
+
+    Serializers declare what their ``to_representation`` walks:
+
+        class Meta:
+            select_related = ('category',)
+            prefetch_related = ('productimage_set',)
+
+    Serializers with :class:`SparseFieldsetMixin` load only what the requested fields
+    need: relations in ``Meta.field_relations`` are joined or prefetched only when their
+    field is in the output, and with ``?fields=`` the columns are trimmed with ``only()``
+    to those the fields read plus the view's ``required_columns``.
+
+    ``query_budget`` is the number of queries one request to the view may run,
+    whatever the page size; ``apps.tests.test_query_budgets`` enforces it.
+    """
+    query_budget = None
+    # Columns the view reads itself (ordering keys, cache dependencies), kept when ``?fields=`` trims the query.
+    required_columns = ()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        if issubclass(serializer_class, SparseFieldsetMixin):
+            select_related, prefetch_related, columns = self.get_serializer().get_query_plan()
+        else:
+            meta = getattr(serializer_class, 'Meta', None)
+            select_related = getattr(meta, 'select_related', ())
+            prefetch_related = getattr(meta, 'prefetch_related', ())
+            columns = None
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        if columns is not None:
+            queryset = queryset.only(*dict.fromkeys([*columns, *self.required_columns]))
+        return queryset
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin for client-chosen output on reads: ``?fields=id,name,price`` returns only
+    those keys, ``?expand=thumbnail`` adds optional ones (``Meta.expandable_fields``) to the
+    default output. Unknown names are ignored; writes always use the full field set.
+
+    Besides the declared fields, ``to_representation`` may add computed keys guarded by
+    ``self.wants(name)``. For the query, ``Meta.field_relations`` maps a key to the
+    ``select_related``/``prefetch_related`` it needs and ``Meta.field_columns`` to the columns it
+    reads beyond its own source.
+    """
+    fields_param = 'fields'
+    expand_param = 'expand'
+
+    @cached_property
+    def requested_fields(self):
+        """``(selected, expanded)``: the ``?fields=`` names (``None`` when absent) and the ``?expand=`` names."""
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return None, set()
+        params = getattr(request, 'query_params', request.GET)
+        selected = params.get(self.fields_param)
+        expanded = {name for name in params.get(self.expand_param, '').split(',') if name}
+        if selected is None:
+            return None, expanded
+        return {name for name in selected.split(',') if name} | expanded, expanded
+
+    def wants(self, name):
+        selected, expanded = self.requested_fields
+        if selected is not None:
+            return name in selected
+        return name in expanded or name not in getattr(self.Meta, 'expandable_fields', ())
+
+    def get_fields(self):
+        return {name: field for name, field in super().get_fields().items() if self.wants(name)}
+
+    def get_query_plan(self):
+        """``(select_related, prefetch_related, only_columns)`` for the output; columns are ``None`` unless trimmed."""
+        meta = self.Meta
+        select_related = list(getattr(meta, 'select_related', ()))
+        prefetch_related = list(getattr(meta, 'prefetch_related', ()))
+        for name, relations in getattr(meta, 'field_relations', {}).items():
+            if self.wants(name):
+                select_related += relations.get('select_related', ())
+                prefetch_related += relations.get('prefetch_related', ())
+
+        columns = None
+        if self.requested_fields[0] is not None:
+            # Sources may name a foreign key by its attname (``product_id``); only() wants the field name.
+            model_fields = {}
+            for field in meta.model._meta.concrete_fields:
+                model_fields[field.name] = model_fields[field.attname] = field.name
+            columns = ['pk']
+            columns += [model_fields[field.source] for field in self.fields.values() if field.source in model_fields]
+            for name, extra in getattr(meta, 'field_columns', {}).items():
+                if self.wants(name):
+                    columns += extra
+        return list(dict.fromkeys(select_related)), list(dict.fromkeys(prefetch_related)), columns
+
+
+class ReplicaReadMixin:
+    """
+    Serves the view's safe-method requests from a read replica (:mod:`apps.routers`) that has
+    caught up with the last catalog write and the user's own last write; otherwise, and for
+    writes, the primary. Routing is decided after authentication, so the user is known.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            routers.read_from_replica(request.user)
@@ -1,4 +1,10 @@
-from django.db.models import Model, DateTimeField, CharField, SlugField
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction, router
+from django.db.models import Model, DateTimeField, CharField, SlugField, Q
+from django.db.models.functions import Length
 from django.utils.text import slugify
 
 
@@ -14,16 +20,94 @@ class SlugBaseModel(Model):
     name = CharField(max_length=255)
     slug = SlugField(max_length=255, unique=True, editable=False)
 
+    slug_retries = 5
+
     class Meta:
         abstract = True
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_name = instance.__dict__.get('name')
+        return instance
+
     def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
-        self.slug = slugify(self.name)
-        while self.__class__.objects.filter(slug=self.slug).exists():
-            self.slug += '1'
-        super().save(force_insert, force_update, using, update_fields)
+        if not self.needs_slug(update_fields):
+            return super().save(force_insert, force_update, using, update_fields)
+
+        using = using or router.db_for_write(self.__class__, instance=self)
+        if update_fields is not None:
+            update_fields = {*update_fields, 'slug'}
+        base = self.slug_base()
+        self.slug = self.next_free_slug(base, using)
+        for attempt in range(self.slug_retries):
+            try:
+                with transaction.atomic(using=using):
+                    super().save(force_insert, force_update, using, update_fields)
+                self._loaded_name = self.name
+                return
+            except IntegrityError:
+                # A concurrent insert took the same suffix; anything else is not ours to retry.
+                taken = self.__class__._default_manager.using(using).filter(slug=self.slug).exclude(pk=self.pk)
+                if attempt == self.slug_retries - 1 or not taken.exists():
+                    raise
+                self.slug = self.next_free_slug(base, using)
+
+    def needs_slug(self, update_fields=None):
+        if not self.slug:
+            return True
+        if update_fields is not None and 'name' not in update_fields:
+            return False
+        return hasattr(self, '_loaded_name') and self.name != self._loaded_name
+
+    def slug_base(self):
+        # Leave room for a "-<n>" suffix within max_length.
+        return (slugify(self.name) or self._meta.model_name)[:240].strip('-')
+
+    @classmethod
+    def slug_pattern(cls, *bases):
+        return re.compile(r'(%s)(-[0-9]+)?' % '|'.join(re.escape(base) for base in bases))
+
+    @classmethod
+    def slugs_like(cls, queryset, bases):
+        """
+        Slugs equal to one of ``bases`` or to ``base-<n>``. The query is a prefix match per base,
+        which can use the slug's pattern index (a regex can't); the suffix is checked here.
+        """
+        pattern = cls.slug_pattern(*bases)
+        prefixes = reduce(or_, (Q(slug__startswith=base) for base in bases))
+        return (slug for slug in queryset.filter(prefixes).values_list('slug', flat=True).iterator()
+                if pattern.fullmatch(slug))
 
+    def next_free_slug(self, base, using=None):
+        """``base``, or ``base-<n+1>`` where n is the highest suffix in use."""
+        queryset = self.__class__._default_manager.using(using)
+        if self.pk is not None:
+            queryset = queryset.exclude(pk=self.pk)
+        # Suffixes carry no leading zeros, so the longest matching slug holds the highest one.
+        highest = next(self.slugs_like(queryset.order_by(Length('slug').desc(), '-slug'), [base]), None)
+        if highest is None:
+            return base
+        suffix = highest[len(base) + 1:]
+        return f'{base}-{int(suffix) + 1 if suffix else 2}'
 
+    @classmethod
+    def allocate_slugs(cls, objs, using=None):
+        """Assign unique slugs to unsaved ``objs`` with a single query, for ``bulk_create`` paths."""
+        objs = [obj for obj in objs if not obj.slug]
+        if not objs:
+            return
+        bases = [(obj, obj.slug_base()) for obj in objs]
+        queryset = cls._default_manager.using(using or router.db_for_write(cls))
+        used = set(cls.slugs_like(queryset, {base for _, base in bases}))
+        counters = {}
+        for obj, base in bases:
+            slug = base
+            while slug in used:
+                counters[base] = counters.get(base, 1) + 1
+                slug = f'{base}-{counters[base]}'
+            used.add(slug)
+            obj.slug = slug
 
 # class BaseModel(TimeBaseModel, SlugBaseModel):
 #     title = CharField(max_length=255)
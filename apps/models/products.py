@@ -1,18 +1,61 @@
 from django.db.models import Model, CharField, IntegerField, ForeignKey, CASCADE, ImageField, PositiveIntegerField, \
-    DateTimeField
+    DateTimeField, TextField, Index
 from django_ckeditor_5.fields import CKEditor5Field
 
 from apps.models import SlugBaseModel, TimeBaseModel
+from apps.search import DESCRIPTION_PREVIEW_LENGTH, build_description_preview, build_search_document, \
+    full_text_search_indexes, prefix_search_indexes
 
 class Category(SlugBaseModel):
     name = CharField(max_length=255)
 
+    class Meta:
+        indexes = [
+            # ?ordering=category__name on the product list walks categories in name order.
+            Index(fields=['name'], name='category_name_idx'),
+        ]
+
+
 class Product(SlugBaseModel, TimeBaseModel):
     price = IntegerField()
-    category = ForeignKey('apps.Category', CASCADE, related_name='products')
+    # The composite indexes below lead with these columns, so the foreign keys need no index of their own.
+    category = ForeignKey('apps.Category', CASCADE, related_name='products', db_index=False)
     quantity = PositiveIntegerField(default=0, db_default=0)
-    owner = ForeignKey('apps.CustomUser', CASCADE)
+    owner = ForeignKey('apps.CustomUser', CASCADE, db_index=False)
     description = CKEditor5Field(null=True, blank=True)
+    search_document = TextField(blank=True, default='', editable=False)
+    # Plain-text start of the description for the admin changelist, so it never loads the HTML.
+    description_preview = CharField(max_length=DESCRIPTION_PREVIEW_LENGTH, blank=True, default='', editable=False)
+
+    class Meta:
+        # One index per list query shape in apps.views: the filter columns first, then the ordering,
+        # then ``id`` as the keyset tie-breaker. ``apps.tests.test_query_plans`` checks they are used.
+        indexes = [
+            Index(fields=['price', 'id'], name='product_price_id_idx'),
+            # Also covers the facet counts (GROUP BY category over price and quantity) as an index-only scan.
+            Index(fields=['category', 'price', 'id'], include=['quantity'], name='product_category_price_idx'),
+            Index(fields=['owner', 'price', 'id'], name='product_owner_price_idx'),
+            Index(fields=['quantity', 'id'], name='product_quantity_id_idx'),
+            # Incremental export: updated_at > since ORDER BY updated_at, id.
+            Index(fields=['updated_at', 'id'], name='product_updated_at_id_idx'),
+            *full_text_search_indexes(),
+            *prefix_search_indexes(product_name_prefix_idx='name'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets cache invalidation bump the category a product is moved out of.
+        instance._loaded_category_id = instance.__dict__.get('category_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.search_document = build_search_document(self.name, self.description)
+        self.description_preview = build_description_preview(self.description)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'name', 'description'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'search_document', 'description_preview'}
+        super().save(*args, **kwargs)
 
 
 class ProductImage(Model):
@@ -23,18 +66,28 @@ class ProductImage(Model):
         return f"Image for {self.product.name}"
 
 class Wishlist(TimeBaseModel):
-    product = ForeignKey("apps.Product", CASCADE)
-    user = ForeignKey("apps.CustomUser", CASCADE)
+    # Covered by the unique (product, user) and the (user, id) indexes.
+    product = ForeignKey("apps.Product", CASCADE, db_index=False)
+    user = ForeignKey("apps.CustomUser", CASCADE, db_index=False)
 
     class Meta:
         unique_together = ('product', 'user')
+        indexes = [
+            # A user's wishlist page: WHERE user_id = ? ORDER BY id.
+            Index(fields=['user', 'id'], name='wishlist_user_id_idx'),
+        ]
 
 
 class Cart(Model):
-    user = ForeignKey('CustomUser', on_delete=CASCADE, related_name='cart')
+    # Covered by the unique (user, product) and the (user, id) indexes.
+    user = ForeignKey('CustomUser', on_delete=CASCADE, related_name='cart', db_index=False)
     product = ForeignKey(Product, on_delete=CASCADE, related_name='cart')
     quantity = PositiveIntegerField(default=1)
     added_on = DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = ('user', 'product')
\ No newline at end of file
+        unique_together = ('user', 'product')
+        indexes = [
+            # A user's cart page: WHERE user_id = ? ORDER BY id.
+            Index(fields=['user', 'id'], name='cart_user_id_idx'),
+        ]
\ No newline at end of file
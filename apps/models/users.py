@@ -2,6 +2,7 @@ from django.contrib.auth.models import AbstractUser
 from django.db.models import CharField, EmailField, ManyToManyField
 
 from apps.models.managers import CustomUserManager
+from apps.search import prefix_search_indexes
 
 
 class CustomUser(AbstractUser):
@@ -13,3 +14,8 @@ class CustomUser(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
     objects = CustomUserManager()
+
+    class Meta(AbstractUser.Meta):
+        # Prefix (``^field``) searches in the user admin.
+        indexes = prefix_search_indexes(user_email_prefix_idx='email', user_phone_prefix_idx='phone_number',
+                                        user_username_prefix_idx='username')
@@ -1,12 +1,292 @@
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import InvalidPage, Paginator as DjangoPaginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Seek-based pagination: each page is ``WHERE (k1, k2, ...) > last_seen ORDER BY k1, k2, ... LIMIT n``,
+    so deep pages cost the same as the first one and no ``COUNT(*)`` is needed.
+
+    Ordering keys come from the queryset (``OrderingFilter`` or the view's default) with the
+    view's ``keyset_ordering`` as fallback; ``id`` is appended as a tie-breaker so the key is unique.
+    The total is only computed on request: ``?count=exact`` or ``?count=estimate`` (planner estimate).
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    page_size = 5
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+    # Set by views that already know the total (e.g. from facet counts); it is returned as is.
+    known_count = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.prepare(queryset, request, view)
+        self.count = self.known_count if self.known_count is not None else self.get_count(queryset, request)
+        return self.set_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.prepare(queryset, request, view)
+        self.count = self.known_count if self.known_count is not None else await self.aget_count(queryset, request)
+        return self.set_page([obj async for obj in page_queryset.aiterator(chunk_size=self.page_size + 1)])
+
+    def prepare(self, queryset, request, view):
+        """Parse the request and return the (unevaluated) query for one page plus a look-ahead row."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(queryset, view)
+
+        self.position, self.reverse = self.decode_cursor(request, queryset)
+        ordering = [self.invert(field) for field in self.ordering] if self.reverse else self.ordering
+        queryset = self.select_key_relations(queryset.order_by(*ordering), ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self.seek_filter(ordering, self.position))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.position is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'links': {
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link()
+            },
+            'count': self.count,
+            'results': data
+        })
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def get_ordering(self, queryset, view):
+        ordering = [field for field in queryset.query.order_by if isinstance(field, str)]
+        if not ordering:
+            ordering = list(getattr(view, 'keyset_ordering', ()))
+        if not {'id', '-id', 'pk', '-pk'} & set(ordering):
+            ordering.append('id')
+        return ordering
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return queryset.count()
+        if mode == 'estimate':
+            return estimate_count(queryset)
+        return None
+
+    async def aget_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return await queryset.acount()
+        if mode == 'estimate':
+            return await sync_to_async(estimate_count)(queryset)
+        return None
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, instance, reverse):
+        values = [self.get_value(instance, field.lstrip('-')) for field in self.ordering]
+        payload = json.dumps({'v': values, 'r': reverse}, cls=DjangoJSONEncoder, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request, queryset):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            values, reverse = payload['v'], bool(payload['r'])
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError(values)
+            # Cursors come from clients: each value must parse as its ordering field's type.
+            values = [self.parse_value(queryset, field.lstrip('-'), value)
+                      for field, value in zip(self.ordering, values)]
+        except (DjangoValidationError, TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    @staticmethod
+    def parse_value(queryset, path, value):
+        """
+        ``value`` as the Python value of the field (or annotation, e.g. search ``relevance``) at
+        ``path``; nulls and lists/objects are refused.
+        """
+        if value is None or isinstance(value, (list, dict)):
+            raise ValueError(value)
+        if path in queryset.query.annotations:
+            field = queryset.query.annotations[path].output_field
+        else:
+            model = queryset.model
+            for name in path.split('__'):
+                field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+                model = field.related_model
+        value = field.to_python(value)
+        field.run_validators(value)
+        return value
+
+    @staticmethod
+    def select_key_relations(queryset, ordering):
+        """Joins the relations ordering keys go through, so encoding a cursor reads no related rows."""
+        paths = [field.lstrip('-') for field in ordering if '__' in field]
+        if not paths:
+            return queryset
+        names, defer = queryset.query.deferred_loading
+        if names and not defer:
+            # Under only() a joined relation must be loaded too.
+            queryset = queryset.only(*names, *paths)
+        return queryset.select_related(*{path.rsplit('__', 1)[0] for path in paths})
+
+    @staticmethod
+    def seek_filter(ordering, position):
+        """``(a, b, c) > (x, y, z)`` spelled as ``a > x OR (a = x AND b > y) OR ...``, per-key direction aware."""
+        clauses = []
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {ordering[i].lstrip('-'): position[i] for i in range(index)}
+            clauses.append(Q(**equal, **{f'{name}__{lookup}': position[index]}))
+        return reduce(or_, clauses)
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def get_value(instance, field):
+        for attr in field.split('__'):
+            instance = getattr(instance, 'pk' if attr == 'pk' else attr)
+        return instance
+
+
+def estimate_count(queryset):
+    """Row estimate from the PostgreSQL planner, or ``None`` where the backend can't provide one."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(DjangoPaginator):
+    """
+    Django paginator for large tables (the admin changelists): past ``exact_count_limit`` rows the
+    count is the planner estimate, so paging doesn't scan the table. Small or unestimated results
+    are counted exactly.
+    """
+    exact_count_limit = 10_000
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, 'query'):
+            estimate = estimate_count(self.object_list)
+            if estimate is not None and estimate >= self.exact_count_limit:
+                return estimate
+        return super().count
 
 
 class CustomPagination(pagination.PageNumberPagination):
+    """
+    Page-number pagination; views that declare ``keyset_ordering`` switch to
+    :class:`KeysetPagination` when the client sends ``?cursor=`` (empty for the first page).
+
+    A view that already knows the total sets ``known_count`` before paginating, which saves the
+    ``COUNT(*)`` query.
+    """
     page_size_query_param = 'page_size'
     page_size = 5
+    keyset_class = KeysetPagination
+    known_count = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(request, view):
+            self.keyset = self.get_keyset()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page):
+        # Called by PageNumberPagination.paginate_queryset in place of the Paginator class.
+        paginator = DjangoPaginator(object_list, per_page)
+        if self.known_count is not None:
+            # Paginator.count is a cached_property: filling it keeps the paginator from counting.
+            paginator.count = self.known_count
+        return paginator
+
+    def get_keyset(self):
+        keyset = self.keyset_class()
+        keyset.known_count = self.known_count
+        return keyset
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views: the count and the page go through the async ORM."""
+        self.keyset = None
+        if self.use_keyset(request, view):
+            self.keyset = self.get_keyset()
+            return await self.keyset.apaginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        paginator = self.django_paginator_class(queryset, page_size)
+        if self.known_count is None:
+            # Paginator.count is a cached_property: filling it here keeps the paginator from counting synchronously.
+            paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [obj async for obj in self.page.object_list.aiterator(chunk_size=page_size)]
+        self.request = request
+        return self.page.object_list
+
+    def use_keyset(self, request, view):
+        return getattr(view, 'keyset_ordering', None) and self.keyset_class.cursor_query_param in request.query_params
 
     def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
         return Response({
             'links': {
                 'next': self.get_next_link(),
@@ -14,4 +294,4 @@ class CustomPagination(pagination.PageNumberPagination):
             },
             'count': self.page.paginator.count,
             'results': data
-        })
\ No newline at end of file
+        })
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+
+from apps.authentication import invalidate_user
+
+
+class PoolSaturated(Exception):
+    pass
+
+
+class PasswordHashPool:
+    """
+    Runs password hashing off the event loop in a fixed number of threads.
+
+    At most ``workers + queue_depth`` jobs are admitted; beyond that ``submit`` fails fast with
+    :class:`PoolSaturated` instead of queueing, so a login burst can't pile up unbounded work.
+    PBKDF2 releases the GIL, so the threads hash in parallel.
+    """
+
+    def __init__(self, workers, queue_depth):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self.slots = threading.BoundedSemaphore(workers + queue_depth)
+
+    def submit(self, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            raise PoolSaturated
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    async def run(self, fn, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_password_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PasswordHashPool(
+                    workers=getattr(settings, 'LOGIN_HASH_WORKERS', None) or os.cpu_count() or 2,
+                    queue_depth=getattr(settings, 'LOGIN_HASH_QUEUE_DEPTH', 64),
+                )
+    return _pool
+
+
+async def averify_password(user, password):
+    """
+    Check ``password`` against ``user`` (or a dummy hash if ``user`` is None) in the hash pool,
+    re-hashing and storing it when the hasher or its iteration count changed since it was set.
+    Raises :class:`PoolSaturated` when the pool is full.
+    """
+    pool = get_password_pool()
+    # verify_password runs a dummy hash for a missing user, so timing doesn't reveal whether it exists.
+    valid, outdated = await pool.run(verify_password, password, user.password if user else '')
+    if valid and outdated:
+        try:
+            user.password = await pool.run(make_password, password)
+        except PoolSaturated:
+            return valid  # The login stands; the hash is upgraded on a quieter attempt.
+        await user.__class__.objects.filter(pk=user.pk).aupdate(password=user.password)
+        await sync_to_async(invalidate_user)(user.pk)
+    return valid
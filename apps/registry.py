@@ -0,0 +1,137 @@
+import hashlib
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count
+
+from apps.cache import VERSION_PREFIX, bump_versions
+from apps.models import Category, Product
+
+REGISTRY_VERSION = f'{VERSION_PREFIX}:category-registry'
+COUNTS_VERSION = f'{VERSION_PREFIX}:category-counts'
+
+
+class CategoryRegistry:
+    """
+    Process-local copy of the category table: ``{id: {'id', 'name', 'slug', 'product_count'}}``.
+
+    Categories are loaded with one query and reloaded only when ``REGISTRY_VERSION`` moves, on
+    category writes. Product counts take a grouped query over the product table, so they have
+    their own ``COUNTS_VERSION`` (product inserts, deletes and category moves) and are recounted
+    at most every ``count_interval`` seconds: a bulk import costs each process one recount per
+    interval, not one per write. The versions are checked at most every ``check_interval``
+    seconds, so a busy process pays one cache read per interval rather than per request. An id
+    it doesn't know yet (a category created by another process within the interval) triggers an
+    immediate reload of the categories.
+
+    ``fingerprint`` is a digest of the loaded rows, for ETags that don't need a query.
+    """
+
+    def __init__(self, check_interval, count_interval):
+        self.check_interval = check_interval
+        self.count_interval = count_interval
+        self.lock = threading.Lock()
+        self.reset()
+
+    def all(self):
+        self.ensure_fresh()
+        return list(self.categories.values())
+
+    def get(self, category_id):
+        self.ensure_fresh()
+        entry = self.categories.get(category_id)
+        if entry is None:
+            self.refresh()
+            entry = self.categories.get(category_id)
+        return entry
+
+    def name(self, category_id):
+        entry = self.get(category_id)
+        return entry['name'] if entry else None
+
+    def ensure_fresh(self):
+        now = time.monotonic()
+        if now - self.checked_at < self.check_interval:
+            return
+        versions = cache.get_many([REGISTRY_VERSION, COUNTS_VERSION])
+        self.checked_at = now
+        self.apply_versions(versions, now)
+
+    async def aensure_fresh(self, category_ids=()):
+        """
+        Async views call this before serializing: it does any reload through the async cache and
+        a worker thread, so the ``get()`` calls that follow are plain dictionary lookups.
+        """
+        now = time.monotonic()
+        if now - self.checked_at >= self.check_interval:
+            versions = await cache.aget_many([REGISTRY_VERSION, COUNTS_VERSION])
+            self.checked_at = now
+            await sync_to_async(self.apply_versions)(versions, now)
+        if not set(category_ids) <= self.categories.keys():
+            await sync_to_async(self.refresh)()
+
+    def apply_versions(self, versions, now):
+        version = versions.get(REGISTRY_VERSION, 0)
+        if version != self.version:
+            self.refresh(version)
+        counts_version = versions.get(COUNTS_VERSION, 0)
+        if counts_version != self.counts_version and now - self.counted_at >= self.count_interval:
+            self.refresh_counts(counts_version)
+
+    # Both loads read the primary: the rows are kept for every later request in this process, which a
+    # lagging replica's copy would outlive (apps.routers.cache_timeout only bounds cache entries).
+
+    def refresh(self, version=None):
+        # Read the version before the rows: a write landing in between then triggers another reload.
+        if version is None:
+            version = cache.get(REGISTRY_VERSION, 0)
+        rows = Category.objects.using(DEFAULT_DB_ALIAS).order_by('id').values('id', 'name', 'slug')
+        with self.lock:
+            self.rows, self.version = {row['id']: row for row in rows}, version
+            self.checked_at = time.monotonic()
+            self.rebuild()
+        if self.counts_version is None:
+            self.refresh_counts()
+
+    def refresh_counts(self, version=None):
+        if version is None:
+            version = cache.get(COUNTS_VERSION, 0)
+        rows = Product.objects.using(DEFAULT_DB_ALIAS).order_by().values('category_id') \
+            .annotate(product_count=Count('id')).values_list('category_id', 'product_count')
+        with self.lock:
+            self.counts, self.counts_version = dict(rows), version
+            self.counted_at = time.monotonic()
+            self.rebuild()
+
+    def rebuild(self):
+        categories = {pk: {**row, 'product_count': self.counts.get(pk, 0)} for pk, row in self.rows.items()}
+        self.fingerprint = hashlib.md5(repr(list(categories.values())).encode()).hexdigest()
+        self.categories = categories
+
+    def expire(self):
+        self.checked_at = float('-inf')
+
+    def reset(self):
+        with self.lock:
+            self.rows, self.categories, self.counts = {}, {}, {}
+            self.version, self.counts_version, self.fingerprint = None, None, None
+            self.checked_at = self.counted_at = float('-inf')
+
+
+category_registry = CategoryRegistry(
+    check_interval=getattr(settings, 'CATEGORY_REGISTRY_CHECK_INTERVAL', 1),
+    count_interval=getattr(settings, 'CATEGORY_COUNT_REFRESH_INTERVAL', 60),
+)
+
+
+def bump_registry_on_commit():
+    def bump():
+        bump_versions(REGISTRY_VERSION)
+        category_registry.expire()
+
+    transaction.on_commit(bump)
+
@@ -0,0 +1,176 @@
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+WRITTEN_AT_PREFIX = 'db:written'
+CATALOG_WRITTEN_AT = f'{WRITTEN_AT_PREFIX}:catalog'
+
+# Seconds the replica is behind: 0 when it has replayed everything it received (an idle primary
+# leaves pg_last_xact_replay_timestamp() behind without any lag), and 0 on a primary.
+REPLICA_LAG_SQL = (
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def user_written_at_key(user_id):
+    return f'{WRITTEN_AT_PREFIX}:user:{user_id}'
+
+
+class RoutingState:
+    """
+    Per-request routing: the database reads go to (``None`` is the primary), whether that replica
+    may not have applied the last catalog write yet, and whether the request wrote.
+    """
+    __slots__ = ('read_database', 'behind_catalog', 'wrote')
+
+    def __init__(self):
+        self.read_database = None
+        self.behind_catalog = False
+        self.wrote = False
+
+
+# Set by ReplicaRoutingMiddleware; outside requests (tasks, commands) everything uses the primary.
+current_routing = ContextVar('current_routing', default=None)
+
+
+def replica_lag(connection):
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(REPLICA_LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+class ReplicaMonitor:
+    """
+    Per-process view of the replicas: for each one, the wall-clock time up to which it has applied
+    the primary's commits (measurement time minus lag), refreshed at most every ``interval`` seconds.
+    A replica more than ``max_lag`` behind, or failing the check, is left out until the next check.
+    """
+
+    def __init__(self, aliases, max_lag, interval):
+        self.aliases = tuple(aliases)
+        self.max_lag = max_lag
+        self.interval = interval
+        self.checks = {}
+        self.lock = threading.Lock()
+
+    @property
+    def horizon(self):
+        """Seconds after which any write is visible on every replica still in use."""
+        return self.max_lag + self.interval
+
+    def applied_until(self, alias):
+        now = time.time()
+        with self.lock:
+            checked = self.checks.get(alias)
+            if checked is not None and now - checked[0] < self.interval:
+                return checked[1]
+            # Claim the check: concurrent requests keep the previous answer meanwhile.
+            self.checks[alias] = (now, checked[1] if checked else None)
+        try:
+            lag = replica_lag(connections[alias])
+        except DatabaseError:
+            logger.warning('Replica %s failed its lag check', alias, exc_info=True)
+            lag = None
+        applied = now - lag if lag is not None and lag <= self.max_lag else None
+        with self.lock:
+            self.checks[alias] = (now, applied)
+        return applied
+
+    def choose(self, written_at=0):
+        """A replica that has applied writes made at ``written_at``, or ``None`` for the primary."""
+        candidates = []
+        for alias in self.aliases:
+            applied = self.applied_until(alias)
+            if applied is not None and applied > written_at:
+                candidates.append(alias)
+        return random.choice(candidates) if candidates else None
+
+    def reset(self):
+        with self.lock:
+            self.checks.clear()
+
+
+replicas = ReplicaMonitor(
+    getattr(settings, 'REPLICA_DATABASES', ()),
+    max_lag=getattr(settings, 'REPLICA_MAX_LAG', 2.0),
+    interval=getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 5.0),
+)
+
+
+def read_from_replica(user=None):
+    """
+    Route the current request's reads to a replica that has applied ``user``'s last write; returns
+    the alias, or ``None`` when reads stay on the primary. Other users' writes may still be missing
+    for up to ``replicas.horizon`` seconds, see :func:`cache_timeout`.
+    """
+    state = current_routing.get()
+    if state is None or state.wrote:
+        return None
+    user_key = user_written_at_key(user.pk) if user is not None and user.is_authenticated else None
+    written = cache.get_many([CATALOG_WRITTEN_AT, user_key] if user_key else [CATALOG_WRITTEN_AT])
+    alias = replicas.choose(written.get(user_key, 0))
+    if alias is not None:
+        state.behind_catalog = written.get(CATALOG_WRITTEN_AT, 0) >= replicas.applied_until(alias)
+    state.read_database = alias
+    return alias
+
+
+def cache_timeout(timeout):
+    """
+    ``timeout`` for caching what the current request read. When its replica may lack the last catalog
+    write, the entry would be stale under the new cache versions, so it only lives until the replica
+    has certainly caught up.
+    """
+    state = current_routing.get()
+    if state is not None and state.read_database is not None and state.behind_catalog:
+        return min(timeout, replicas.horizon)
+    return timeout
+
+
+def record_write(user_id=None):
+    """Note a write by ``user_id`` (or to the catalog when ``None``) for :func:`read_from_replica`."""
+    if not replicas.aliases:
+        return
+    key = CATALOG_WRITTEN_AT if user_id is None else user_written_at_key(user_id)
+    # Past the horizon every replica in use has the write, so the key can go.
+    cache.set(key, time.time(), replicas.horizon)
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes go to the primary; reads go to the replica the request was routed to with
+    :func:`read_from_replica`, and back to the primary once the request has written or inside
+    a transaction on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = current_routing.get()
+        if state is None or state.read_database is None or state.wrote:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return state.read_database
+
+    def db_for_write(self, model, **hints):
+        state = current_routing.get()
+        if state is not None:
+            state.wrote = True
+        # Explicit, or Django would write an instance back to the replica it was read from.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas.aliases}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -0,0 +1,178 @@
+import html
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict, Counter
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Case, When, Value, FloatField, Index, TextField
+from django.db.models.functions import Cast, Upper
+from django.utils.html import strip_tags
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+SEARCH_CONFIG = 'simple'
+SEARCH_INDEX_NAME = 'apps_product_search_gin'
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+DESCRIPTION_PREVIEW_LENGTH = 120
+
+
+def description_text(description):
+    """A CKEditor description as plain text, whitespace collapsed."""
+    return ' '.join(html.unescape(strip_tags(description or '')).split())
+
+
+def build_search_document(name, description):
+    """Plain-text search source for a product: name plus description with CKEditor markup removed."""
+    return ' '.join(f'{name or ""} {description_text(description)}'.split())
+
+
+def build_description_preview(description, length=DESCRIPTION_PREVIEW_LENGTH):
+    """The start of the description as plain text for list pages, cut at a word boundary."""
+    text = description_text(description)
+    if len(text) <= length:
+        return text
+    return text[:length - 1].rsplit(' ', 1)[0] + '…'
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class PostgresSearchBackend:
+    """``to_tsvector`` over ``search_document``, matched by the GIN index from :func:`full_text_search_indexes`."""
+
+    def search(self, queryset, terms):
+        from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank
+
+        vector = SearchVector('search_document', config=SEARCH_CONFIG)
+        query = SearchQuery(terms, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.annotate(search=vector, relevance=SearchRank(vector, query)).filter(search=query)
+
+
+class InvertedIndex:
+    """
+    In-process token -> {product id: term frequency} index for backends without full-text search
+    (SQLite test runs). Built lazily from ``search_document`` and dropped whenever a product changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = None
+        self._vocabulary = None
+        self._documents = 0
+
+    def invalidate(self, **kwargs):
+        with self._lock:
+            self._postings = None
+
+    def build(self, model, using):
+        postings = defaultdict(dict)
+        documents = 0
+        for pk, document in model._default_manager.using(using).values_list('pk', 'search_document').iterator():
+            documents += 1
+            for token, frequency in Counter(tokenize(document)).items():
+                postings[token][pk] = frequency
+        self._postings, self._vocabulary, self._documents = postings, sorted(postings), documents
+
+    def lookup(self, model, using, terms):
+        """Score documents containing every term (as a word prefix) with tf-idf; returns {pk: score}."""
+        with self._lock:
+            if self._postings is None:
+                self.build(model, using)
+            postings, vocabulary, documents = self._postings, self._vocabulary, self._documents
+
+        scores = None
+        for term in tokenize(terms):
+            term_scores = defaultdict(float)
+            for index in range(bisect_left(vocabulary, term), len(vocabulary)):
+                token = vocabulary[index]
+                if not token.startswith(term):
+                    break
+                idf = math.log(1 + documents / len(postings[token]))
+                for pk, frequency in postings[token].items():
+                    term_scores[pk] += frequency * idf
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {pk: score + term_scores[pk] for pk, score in scores.items() if pk in term_scores}
+        return scores or {}
+
+
+class InvertedIndexSearchBackend:
+    def __init__(self, index):
+        self.index = index
+
+    def search(self, queryset, terms):
+        scores = self.index.lookup(queryset.model, queryset.db, terms)
+        if not scores:
+            return queryset.annotate(relevance=Value(0.0, output_field=FloatField())).none()
+        relevance = Case(*(When(pk=pk, then=Value(score)) for pk, score in scores.items()),
+                         default=Value(0.0), output_field=FloatField())
+        return queryset.filter(pk__in=scores).annotate(relevance=relevance)
+
+
+product_index = InvertedIndex()
+
+
+def get_search_backend(using):
+    if connections[using].vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return InvertedIndexSearchBackend(product_index)
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """
+    Full-text ``?search=`` over product name and description. ``?ordering=relevance`` sorts matches
+    by rank; place it after ``OrderingFilter`` so that ordering wins over the view default.
+    """
+    search_param = api_settings.SEARCH_PARAM
+    ordering_param = api_settings.ORDERING_PARAM
+    relevance_ordering = 'relevance'
+
+    def filter_queryset(self, request, queryset, view):
+        terms = request.query_params.get(self.search_param, '').strip()
+        if not terms:
+            return queryset
+
+        queryset = get_search_backend(queryset.db).search(queryset, terms)
+        if request.query_params.get(self.ordering_param) == self.relevance_ordering:
+            queryset = queryset.order_by('-relevance', 'id')
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Full-text search over name and description. Combine with ordering=relevance.',
+            'schema': {'type': 'string'},
+        }]
+
+
+
+# The indexes below are PostgreSQL-only: models declare them (so migrations create them) only when
+# django.contrib.postgres is installed, which root.settings does unless DB_ENGINE=sqlite.
+def full_text_search_indexes():
+    """GIN index over the same ``to_tsvector`` expression :class:`PostgresSearchBackend` filters on."""
+    if 'django.contrib.postgres' not in settings.INSTALLED_APPS:
+        return []
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    return [GinIndex(SearchVector('search_document', config=SEARCH_CONFIG), name=SEARCH_INDEX_NAME)]
+
+
+def prefix_search_indexes(**fields):
+    """
+    One ``UPPER(column::text) text_pattern_ops`` index per ``name=field``: prefix (``^field``) admin
+    searches filter on ``UPPER(column::text) LIKE 'TERM%'``.
+    """
+    if 'django.contrib.postgres' not in settings.INSTALLED_APPS:
+        return []
+    from django.contrib.postgres.indexes import OpClass
+
+    return [Index(OpClass(Upper(Cast(field, TextField())), name='text_pattern_ops'), name=name)
+            for name, field in fields.items()]
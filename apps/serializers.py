@@ -1,13 +1,17 @@
 from rest_framework import serializers
 from rest_framework.fields import CharField
 
+from apps.instrumentation import InstrumentedListSerializer
+from apps.mixins import SparseFieldsetMixin
 from apps.models import Category, Product, CustomUser, Wishlist, Cart, ProductImage
+from apps.registry import category_registry
 
 
 class UserModelSerializer(serializers.ModelSerializer):
     class Meta:
         model = CustomUser
         fields = 'id', 'first_name', 'last_name', 'email', 'phone_number', 'date_joined'
+        list_serializer_class = InstrumentedListSerializer
 
 
 class CategoryModelSerializer(serializers.ModelSerializer):
@@ -15,39 +19,71 @@ class CategoryModelSerializer(serializers.ModelSerializer):
         model = Category
         fields = 'id', 'name', 'slug'
         read_only_fields = 'slug',
+        list_serializer_class = InstrumentedListSerializer
 
 
-class ProductModelSerializer(serializers.ModelSerializer):
+class ProductModelSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Product
-        exclude = 'updated_at', 'created_at', 'description', 'owner',
+        exclude = 'updated_at', 'created_at', 'description', 'owner', 'search_document', 'description_preview',
         read_only_fields = 'slug',
+        list_serializer_class = InstrumentedListSerializer
+        expandable_fields = 'thumbnail', 'owner'
+        field_relations = {
+            'product_image': {'prefetch_related': ('productimage_set',)},
+            'thumbnail': {'prefetch_related': ('productimage_set',)},
+            'owner': {'select_related': ('owner',)},
+        }
+        field_columns = {'owner': ('owner', 'owner__username')}
 
     def to_representation(self, instance: Product):
         repr = super().to_representation(instance)
-        repr['category'] = CategoryModelSerializer(instance.category).data['name']
-        # repr['owner'] = UserModelSerializer(instance.owner).data
-        repr['product_image'] = ProductImageModelSerializer(instance.productimage_set.all(), many=True).data
+        if self.wants('category'):
+            repr['category'] = category_registry.name(instance.category_id)
+        if self.wants('owner'):
+            repr['owner'] = instance.owner.username
+        if self.wants('product_image'):
+            repr['product_image'] = ProductImageModelSerializer(instance.productimage_set.all(), many=True).data
+        if self.wants('thumbnail'):
+            repr['thumbnail'] = thumbnail(instance)
 
         return repr
 
 
-class ProductDetailSerializer(serializers.ModelSerializer):
+class ProductDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     slug = serializers.SlugField(required=True)
     class Meta:
         model = Product
         fields = ('id', 'name', 'slug', 'price', 'quantity', 'description',)
         read_only_fields = ('slug',)
+        expandable_fields = ('thumbnail',)
+        field_relations = {
+            'owner': {'select_related': ('owner',)},
+            'product_image': {'prefetch_related': ('productimage_set',)},
+            'thumbnail': {'prefetch_related': ('productimage_set',)},
+        }
+        field_columns = {'owner': ('owner', 'owner__username'), 'category': ('category',)}
 
     def to_representation(self, instance: Product):
         repr = super().to_representation(instance)
-        repr['category'] = CategoryModelSerializer(instance.category).data['name']
-        repr['owner'] = UserModelSerializer(instance.owner).data['username']
-        repr['product_image'] = ProductImageModelSerializer(instance.productimage_set.all(), many=True).data
+        if self.wants('category'):
+            repr['category'] = category_registry.name(instance.category_id)
+        if self.wants('owner'):
+            repr['owner'] = instance.owner.username
+        if self.wants('product_image'):
+            repr['product_image'] = ProductImageModelSerializer(instance.productimage_set.all(), many=True).data
+        if self.wants('thumbnail'):
+            repr['thumbnail'] = thumbnail(instance)
 
         return repr
 
 
+def thumbnail(product):
+    """URL of the product's first image (from the prefetched images), for list screens that show one."""
+    images = product.productimage_set.all()
+    return ProductImageModelSerializer(images[0]).data['image'] if images else None
+
+
 class ProductImageModelSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductImage
@@ -89,46 +125,89 @@ class ActivateUserModelSerializer(serializers.ModelSerializer):
         fields = ('email', 'confirmation_code')
 
 
-class WishlistModelSerializer(serializers.ModelSerializer):
+class WishlistModelSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product_id = serializers.IntegerField()
 
     class Meta:
         model = Wishlist
         fields = ('id', 'product_id',)
+        list_serializer_class = InstrumentedListSerializer
+        expandable_fields = ('thumbnail',)
+        field_relations = {
+            'product_data': {'select_related': ('product',)},
+            'product_image': {'select_related': ('product',), 'prefetch_related': ('product__productimage_set',)},
+            'thumbnail': {'select_related': ('product',), 'prefetch_related': ('product__productimage_set',)},
+        }
+        field_columns = {
+            'product_data': ('product', 'product__name', 'product__price', 'product__category'),
+            'product_image': ('product',),
+            'thumbnail': ('product',),
+        }
 
     def to_representation(self, instance):
         repr = super().to_representation(instance)
 
-        product = instance.product
-        repr['product_data'] = {
-            'name': product.name,
-            'price': product.price,
-            'category': product.category.name,
-        }
-        repr['product_image'] = ProductImageModelSerializer(product.productimage_set.all(), many=True).data
+        if self.wants('product_data'):
+            repr['product_data'] = {
+                'name': instance.product.name,
+                'price': instance.product.price,
+                'category': category_registry.name(instance.product.category_id),
+            }
+        if self.wants('product_image'):
+            images = instance.product.productimage_set.all()
+            repr['product_image'] = ProductImageModelSerializer(images, many=True).data
+        if self.wants('thumbnail'):
+            repr['thumbnail'] = thumbnail(instance.product)
         return repr
 
 
-class CartModelSerializer(serializers.ModelSerializer):
+class CartModelSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product_id = serializers.IntegerField(write_only=True)
+    quantity = serializers.IntegerField(min_value=0, required=False)
 
     class Meta:
         model = Cart
-        fields = ('id', 'product_id', 'product', 'user')
+        fields = ('id', 'product_id', 'product', 'user', 'quantity')
         read_only_fields = ('product', 'user')
-
-    def validate_product_id(self, product_id):
-        # Ensure the product exists
-        if not Product.objects.filter(id=product_id).exists():
-            raise serializers.ValidationError("The product does not exist.")
-        return product_id
+        list_serializer_class = InstrumentedListSerializer
+        expandable_fields = ('thumbnail',)
+        field_relations = {
+            'product_data': {'select_related': ('product',)},
+            'thumbnail': {'select_related': ('product',), 'prefetch_related': ('product__productimage_set',)},
+        }
+        field_columns = {
+            'product_data': ('product', 'product__name', 'product__price', 'product__category', 'product__quantity'),
+            'thumbnail': ('product',),
+        }
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        representation['product_data'] = {
-            'name': instance.product.name,
-            'price': instance.product.price,
-            'category': instance.product.category.name,
-            'quantity': instance.product.quantity,
-        }
+        if self.wants('product_data'):
+            representation['product_data'] = {
+                'name': instance.product.name,
+                'price': instance.product.price,
+                'category': category_registry.name(instance.product.category_id),
+                'quantity': instance.product.quantity,
+            }
+        if self.wants('thumbnail'):
+            representation['thumbnail'] = thumbnail(instance.product)
         return representation
+
+
+class WishlistBulkSerializer(serializers.Serializer):
+    product_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=100)
+    action = serializers.ChoiceField(choices=('add', 'remove'), default='add')
+
+
+class CartItemSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0)
+
+
+class CartBulkSerializer(serializers.Serializer):
+    items = CartItemSerializer(many=True, allow_empty=False, max_length=100)
+
+    def validate_items(self, items):
+        if len({item['product_id'] for item in items}) != len(items):
+            raise serializers.ValidationError('Each product may appear only once.')
+        return items
@@ -0,0 +1,50 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.authentication import invalidate_user
+from apps.cache import bump_versions_on_commit, product_version_key, category_version_key, PRODUCTS_VERSION
+from apps.models import Product, ProductImage, Category, CustomUser
+from apps.registry import COUNTS_VERSION, bump_registry_on_commit
+from apps.search import product_index
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_search_index(sender, **kwargs):
+    product_index.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Product)
+def bump_product_versions(sender, instance, **kwargs):
+    keys = {PRODUCTS_VERSION, product_version_key(instance.pk), category_version_key(instance.category_id)}
+    loaded_category_id = getattr(instance, '_loaded_category_id', None)
+    if loaded_category_id is not None:
+        keys.add(category_version_key(loaded_category_id))
+    bump_versions_on_commit(*keys)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def bump_category_counts_for_product(sender, instance, created=True, **kwargs):
+    # Product counts only change when a product appears, disappears (post_delete sends no
+    # ``created``) or changes category.
+    if created or getattr(instance, '_loaded_category_id', None) != instance.category_id:
+        bump_versions_on_commit(COUNTS_VERSION)
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def bump_product_image_versions(sender, instance, **kwargs):
+    category_id = Product.objects.filter(pk=instance.product_id).values_list('category_id', flat=True).first()
+    keys = [PRODUCTS_VERSION, product_version_key(instance.product_id)]
+    if category_id is not None:
+        keys.append(category_version_key(category_id))
+    bump_versions_on_commit(*keys)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def bump_category_versions(sender, instance, **kwargs):
+    bump_versions_on_commit(PRODUCTS_VERSION, category_version_key(instance.pk))
+    bump_registry_on_commit()
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
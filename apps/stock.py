@@ -0,0 +1,95 @@
+from django.db import connections, router
+from django.utils import timezone
+
+from apps.cache import bump_versions_on_commit, product_version_key, category_version_key, PRODUCTS_VERSION
+from apps.models import Product
+
+
+class StockError(Exception):
+    pass
+
+
+class ProductNotFound(StockError):
+    pass
+
+
+class OutOfStock(StockError):
+    pass
+
+
+def reserve(product_id, quantity=1):
+    """
+    Take ``quantity`` units of a product in one conditional UPDATE
+    (``SET quantity = quantity - n WHERE quantity >= n``). The row lock is held only for that
+    statement, so concurrent reservations serialize on the row and can never oversell.
+    """
+    if quantity < 1:
+        raise ValueError('quantity must be positive')
+    if _adjust(product_id, -quantity) is None:
+        if not Product.objects.filter(pk=product_id).exists():
+            raise ProductNotFound(product_id)
+        raise OutOfStock(product_id)
+
+
+def release(product_id, quantity=1):
+    """Return ``quantity`` units, e.g. when a cart line is removed. Missing products are ignored."""
+    if quantity > 0:
+        _adjust(product_id, quantity)
+
+
+def _adjust(product_id, delta):
+    """Apply ``delta`` to the stock of one product; returns its category id, or ``None`` if nothing was updated."""
+    using = router.db_for_write(Product)
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    table, quantity = qn(Product._meta.db_table), qn('quantity')
+    sql = (
+        f"UPDATE {table} SET {quantity} = {quantity} + %s, {qn('updated_at')} = %s "
+        f"WHERE {qn('id')} = %s AND {quantity} >= %s RETURNING {qn('category_id')}"
+    )
+    # Plain ORM .update() can't report the category, which cache invalidation needs; RETURNING saves a SELECT.
+    with connection.cursor() as cursor:
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        cursor.execute(sql, [delta, now, product_id, max(-delta, 0)])
+        row = cursor.fetchone()
+    if row is None:
+        return None
+
+    bump_versions_on_commit(PRODUCTS_VERSION, product_version_key(product_id), category_version_key(row[0]))
+    return row[0]
+
+
+def adjust_many(deltas):
+    """
+    Apply ``{product_id: delta}`` stock changes for several products at once.
+
+    The affected rows are locked in one ``SELECT ... FOR UPDATE`` (in primary-key order, so
+    concurrent batches can't deadlock) and written back with one ``bulk_update``. Must run
+    inside a transaction. Returns ``{product_id: 'ok' | 'not_found' | 'out_of_stock'}``;
+    failed items leave stock untouched.
+    """
+    products = Product.objects.select_for_update().filter(pk__in=deltas).order_by('pk') \
+        .only('id', 'quantity', 'category_id', 'updated_at')
+    products = {product.pk: product for product in products}
+
+    results, changed, now = {}, [], timezone.now()
+    for product_id, delta in deltas.items():
+        product = products.get(product_id)
+        if product is None:
+            results[product_id] = 'not_found'
+        elif product.quantity + delta < 0:
+            results[product_id] = 'out_of_stock'
+        else:
+            results[product_id] = 'ok'
+            if delta:
+                product.quantity += delta
+                product.updated_at = now
+                changed.append(product)
+
+    if changed:
+        Product.objects.bulk_update(changed, ['quantity', 'updated_at'])
+        keys = {PRODUCTS_VERSION}
+        for product in changed:
+            keys.update((product_version_key(product.pk), category_version_key(product.category_id)))
+        bump_versions_on_commit(*keys)
+    return results
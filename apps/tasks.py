@@ -1,20 +1,57 @@
+import logging
+from datetime import timedelta
+
 from celery import shared_task
-from django.core.mail import send_mail
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
 from smtplib import SMTPException
-from root import settings
+
+from apps import mail
+
+logger = logging.getLogger(__name__)
+
 
 @shared_task(bind=True, max_retries=5)
 def send_confirmation_code(self, target_email, message):
-    mail_subject = "Registration on kodeks24"
+    """Send one confirmation right away; registration queues them for ``drain_confirmation_queue`` instead."""
     try:
-        send_mail(
-            subject=mail_subject,
-            message=message,
-            from_email=settings.EMAIL_HOST_USER,
-            recipient_list=[target_email],
-            fail_silently=False,
-        )
+        mail.smtp.send(mail.build_message({'to': target_email, 'body': message}))
         return "Done"
     except SMTPException as exc:
         # Retry with exponential backoff
         raise self.retry(exc=exc, countdown=10 * (2 ** self.request.retries))
+
+
+@shared_task(bind=True, max_retries=5)
+def drain_confirmation_queue(self):
+    # Clear the flag first: messages queued while this drain runs schedule the next one.
+    cache.delete(mail.DRAIN_SCHEDULED)
+    try:
+        report = mail.drain()
+    except SMTPException as exc:
+        # The unsent messages are back in the queue; one retry sends them all.
+        raise self.retry(exc=exc, countdown=10 * (2 ** self.request.retries))
+    return report.as_dict()
+
+
+@shared_task(ignore_result=False)
+def import_products(path, fmt=None, batch_size=1000, default_owner=None):
+    from apps.importers import ProductImporter
+
+    report = ProductImporter(batch_size=batch_size, default_owner=default_owner).run(path, fmt)
+    return report.as_dict()
+
+
+@shared_task
+def prune_task_results(days=None, batch_size=5000):
+    """Delete ``django_celery_results`` rows older than ``TASK_RESULT_RETENTION_DAYS``, in small batches."""
+    from django_celery_results.models import GroupResult, TaskResult
+
+    cutoff = timezone.now() - timedelta(days=days or settings.TASK_RESULT_RETENTION_DAYS)
+    deleted = 0
+    for model in (TaskResult, GroupResult):
+        while ids := list(model.objects.filter(date_done__lt=cutoff).values_list('pk', flat=True)[:batch_size]):
+            deleted += model.objects.filter(pk__in=ids).delete()[0]
+    logger.info('Pruned %s task results older than %s', deleted, cutoff)
+    return deleted
@@ -0,0 +1,116 @@
+import bisect
+import logging
+import threading
+import time
+
+import redis
+from celery.signals import before_task_publish, task_postrun, task_prerun
+
+from apps.utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+TASKS_KEY = 'celery:telemetry:tasks'
+# Upper bounds in milliseconds; anything slower lands in 'inf'.
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+def task_key(name):
+    return f'celery:telemetry:{name}'
+
+
+def bucket(ms):
+    index = bisect.bisect_left(BUCKETS, ms)
+    return str(BUCKETS[index]) if index < len(BUCKETS) else 'inf'
+
+
+def record(name, counters=(), durations=()):
+    """
+    Fold one task event into its aggregate hash: ``counters`` are field names to increment,
+    ``durations`` are ``(metric, seconds)`` pairs added to that metric's histogram.
+    One pipelined round trip; telemetry never fails a task.
+    """
+    pipe = get_redis_client().pipeline(transaction=False)
+    key = task_key(name)
+    pipe.sadd(TASKS_KEY, name)
+    for field in counters:
+        pipe.hincrby(key, field, 1)
+    for metric, seconds in durations:
+        ms = seconds * 1000
+        pipe.hincrby(key, f'{metric}:{bucket(ms)}', 1)
+        pipe.hincrby(key, f'{metric}:count', 1)
+        pipe.hincrbyfloat(key, f'{metric}:sum', ms)
+    try:
+        pipe.execute()
+    except redis.RedisError:
+        logger.warning('Task telemetry for %s dropped: Redis unavailable', name, exc_info=True)
+
+
+_started = {}
+_started_lock = threading.Lock()
+
+
+@before_task_publish.connect
+def stamp_published(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault('published_at', time.time())
+
+
+@task_prerun.connect
+def task_started(task_id=None, task=None, **kwargs):
+    with _started_lock:
+        _started[task_id] = time.perf_counter()
+    published = getattr(task.request, 'published_at', None)
+    if published and not task.request.is_eager:
+        record(task.name, durations=[('wait', max(time.time() - published, 0))])
+
+
+@task_postrun.connect
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    with _started_lock:
+        started = _started.pop(task_id, None)
+    durations = [('runtime', time.perf_counter() - started)] if started is not None else []
+    # One counter per final state of the run: success, failure or retry.
+    record(task.name, counters=[(state or 'unknown').lower()], durations=durations)
+
+
+def percentile(histogram, count, fraction):
+    """Upper bucket bound (ms) below which ``fraction`` of the observations fall."""
+    seen = 0
+    for bound in [*map(str, BUCKETS), 'inf']:
+        seen += histogram.get(bound, 0)
+        if count and seen >= fraction * count:
+            return float(bound)
+    return None
+
+
+def task_stats():
+    """``{task name: {counters..., wait/runtime: {count, mean_ms, p50_ms, p95_ms, p99_ms}}}``."""
+    client = get_redis_client()
+    names = sorted(name.decode() for name in client.smembers(TASKS_KEY))
+    pipe = client.pipeline(transaction=False)
+    for name in names:
+        pipe.hgetall(task_key(name))
+
+    stats = {}
+    for name, raw in zip(names, pipe.execute()):
+        fields = {key.decode(): float(value) for key, value in raw.items()}
+        entry = {key: int(value) for key, value in fields.items() if ':' not in key}
+        for metric in ('wait', 'runtime'):
+            count = int(fields.get(f'{metric}:count', 0))
+            if not count:
+                continue
+            histogram = {key.split(':', 1)[1]: value for key, value in fields.items() if key.startswith(f'{metric}:')}
+            entry[metric] = {
+                'count': count,
+                'mean_ms': round(fields[f'{metric}:sum'] / count, 1),
+                **{f'p{int(q * 100)}_ms': percentile(histogram, count, q) for q in (0.5, 0.95, 0.99)},
+            }
+        stats[name] = entry
+    return stats
+
+
+def reset():
+    client = get_redis_client()
+    names = [name.decode() for name in client.smembers(TASKS_KEY)]
+    client.delete(TASKS_KEY, *[task_key(name) for name in names])
@@ -0,0 +1,50 @@
+from unittest import mock
+
+import fakeredis
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from apps.authentication import local_users
+from apps.registry import category_registry
+from apps.routers import replicas
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'apps-tests'}}
+# Modules that imported apps.utils.get_redis_client and use Redis directly.
+REDIS_CLIENT_MODULES = ('apps.dbpool', 'apps.instrumentation', 'apps.mail', 'apps.telemetry', 'apps.throttling')
+
+
+class IsolatedStateMixin:
+    """
+    An empty in-memory cache, a fresh fakeredis server (Lua enabled, for the throttle script) in
+    place of Redis, and the per-process registries reset, so tests need no Redis and don't leak.
+
+    Reads stay on the primary unless a test sets ``use_replicas`` (and lists the replica in ``databases``).
+    """
+    use_replicas = False
+
+    def setUp(self):
+        super().setUp()
+        if not self.use_replicas:
+            patcher = mock.patch.object(replicas, 'aliases', ())
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.redis = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+        for module in REDIS_CLIENT_MODULES:
+            patcher = mock.patch(f'{module}.get_redis_client', return_value=self.redis)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        cache.clear()
+        local_users.clear()
+        category_registry.reset()
+        replicas.reset()
+        self.addCleanup(category_registry.reset)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class APITestCase(IsolatedStateMixin, TestCase):
+    pass
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class APITransactionTestCase(IsolatedStateMixin, TransactionTestCase):
+    pass
@@ -0,0 +1,90 @@
+from unittest import mock, skipUnless
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.factories import seed_catalog
+from apps.models import Category, CustomUser, Product
+from apps.models.products import Cart
+from apps.pagination import EstimatedCountPaginator, estimate_count
+from apps.tests.base import APITestCase
+
+
+class LargeTableAdminTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_catalog(categories=2, products=6, images_per_product=0, users=2, carts_per_user=3,
+                                 wishlists_per_user=0)
+        cls.admin = CustomUser.objects.create(email='admin@example.com', username='admin', is_active=True,
+                                              is_staff=True, is_superuser=True, password=make_password('admin'))
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def changelist(self, model, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(f'admin:apps_{model}_changelist'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl'], [query['sql'] for query in queries]
+
+    def test_large_results_use_the_estimate(self):
+        limit = EstimatedCountPaginator.exact_count_limit
+        with mock.patch('apps.pagination.estimate_count', return_value=limit) as estimate:
+            cl, queries = self.changelist('product')
+        estimate.assert_called_once()
+        self.assertEqual(cl.result_count, limit)
+        # Neither the filtered nor the whole table is counted.
+        self.assertIsNone(cl.full_result_count)
+        self.assertFalse([sql for sql in queries if 'COUNT(' in sql and 'apps_product' in sql])
+
+    def test_small_or_unestimated_results_are_counted_exactly(self):
+        for estimate in (EstimatedCountPaginator.exact_count_limit - 1, None):
+            with self.subTest(estimate=estimate), mock.patch('apps.pagination.estimate_count', return_value=estimate):
+                cl, queries = self.changelist('product')
+                self.assertEqual(cl.result_count, Product.objects.count())
+                self.assertEqual(len([sql for sql in queries if 'COUNT(' in sql and 'apps_product' in sql]), 1)
+
+    def test_rows_leave_out_the_deferred_columns(self):
+        _, queries = self.changelist('product')
+        rows = [sql for sql in queries if sql.startswith('SELECT "apps_product"."id"')]
+        self.assertEqual(len(rows), 1)
+        self.assertIn('"apps_product"."description_preview"', rows[0])
+        self.assertNotIn('"apps_product"."description",', rows[0])
+        self.assertNotIn('"apps_product"."search_document"', rows[0])
+
+    def test_related_rows_are_joined_once(self):
+        _, queries = self.changelist('cart')
+        user = self.users[0]
+        Cart.objects.bulk_create([Cart(user=user, product=product, quantity=1)
+                                  for product in Product.objects.exclude(cart__user=user)])
+        _, more_queries = self.changelist('cart')
+        self.assertEqual(len(more_queries), len(queries))
+        rows = [sql for sql in more_queries if sql.startswith('SELECT "apps_cart"."id"')]
+        self.assertEqual(len(rows), 1)
+        self.assertIn('"apps_customuser"', rows[0])
+        self.assertNotIn('"apps_product"."description",', rows[0])
+
+    def test_autocomplete_matches_are_cached(self):
+        params = {'term': Category.objects.first().name[:3], 'app_label': 'apps', 'model_name': 'product',
+                  'field_name': 'category'}
+        url = reverse('admin:autocomplete')
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['results'])
+        with CaptureQueriesContext(connection) as second:
+            self.assertEqual(self.client.get(url, params).json(), response.json())
+        self.assertLess(len(second), len(first))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Only PostgreSQL has a planner estimate to read.')
+class EstimateCountTests(APITestCase):
+    def test_estimate_comes_from_the_plan(self):
+        seed_catalog(categories=1, products=20, images_per_product=0, users=1, carts_per_user=0, wishlists_per_user=0)
+        with CaptureQueriesContext(connection) as queries:
+            estimate = estimate_count(Product.objects.filter(price__gt=0))
+        self.assertIsInstance(estimate, int)
+        self.assertTrue(queries[0]['sql'].startswith('EXPLAIN (FORMAT JSON) SELECT'))
@@ -0,0 +1,70 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.factories import seed_catalog
+from apps.models import CustomUser
+from apps.tests.base import APITestCase
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_catalog(categories=1, products=2, images_per_product=0, users=1, carts_per_user=1,
+                                wishlists_per_user=0)[0]
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def get(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('cart'))
+        user_queries = [query['sql'] for query in queries if 'apps_customuser' in query['sql']]
+        return response, user_queries
+
+    def write(self, func):
+        with self.captureOnCommitCallbacks(execute=True):
+            func()
+
+    def test_warm_cache_runs_no_user_query(self):
+        response, user_queries = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(user_queries), 1)
+        for _ in range(2):
+            response, user_queries = self.get()
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(user_queries, [])
+            self.assertEqual(len(response.data['results']), 1)
+
+    def test_saving_the_user_reloads_it(self):
+        self.get()
+        self.user.first_name = 'Renamed'
+        self.write(self.user.save)
+        response, user_queries = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(user_queries), 1)
+
+    def test_deactivated_user_is_rejected(self):
+        self.get()
+        self.user.is_active = False
+        self.write(lambda: self.user.save(update_fields=['is_active']))
+        self.assertEqual(self.get()[0].status_code, 401)
+
+    def test_password_change_revokes_older_tokens(self):
+        self.get()
+        self.user.set_password('a new password')
+        self.write(self.user.save)
+        self.assertEqual(self.get()[0].status_code, 401)
+
+        user = CustomUser.objects.get(pk=self.user.pk)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        self.assertEqual(self.get()[0].status_code, 200)
+
+    def test_deleted_user_is_rejected(self):
+        self.get()
+        self.write(CustomUser.objects.get(pk=self.user.pk).delete)
+        self.assertEqual(self.get()[0].status_code, 401)
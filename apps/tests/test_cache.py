@@ -0,0 +1,106 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.cache import CachedResponseMixin
+from apps.factories import seed_catalog
+from apps.models import Product
+from apps.tests.base import APITestCase
+
+
+class CachedResponseTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(products=6, users=1, carts_per_user=0, wishlists_per_user=0)
+
+    def get(self, route, **extra):
+        return APIClient().get(reverse(route), {'page_size': 2}, **extra)
+
+    def test_repeated_request_is_a_hit(self):
+        for route in ('product-list', 'product-list-async'):
+            with self.subTest(route):
+                self.assertEqual(self.get(route)['X-Cache'], 'MISS')
+                self.assertEqual(self.get(route)['X-Cache'], 'HIT')
+
+    def test_entries_live_as_long_as_the_read_allows(self):
+        # apps.routers shortens entries read from a replica behind the catalog; 0 keeps them out.
+        with mock.patch('apps.cache.cache_timeout', return_value=0) as cache_timeout:
+            for route in ('product-list', 'product-list-async'):
+                with self.subTest(route):
+                    self.assertEqual(self.get(route)['X-Cache'], 'MISS')
+                    self.assertEqual(self.get(route)['X-Cache'], 'MISS')
+        cache_timeout.assert_called_with(CachedResponseMixin.cache_timeout)
+
+    def test_entries_are_per_scheme_and_host(self):
+        for route in ('product-list', 'product-list-async'):
+            with self.subTest(route):
+                self.assertEqual(self.get(route, HTTP_HOST='internal:8000')['X-Cache'], 'MISS')
+                response = self.get(route, HTTP_HOST='shop.example.com', secure=True)
+                self.assertEqual(response['X-Cache'], 'MISS')
+                self.assertTrue(response.json()['links']['next'].startswith('https://shop.example.com/'))
+                response = self.get(route, HTTP_HOST='shop.example.com')
+                self.assertEqual(response['X-Cache'], 'MISS')
+                self.assertTrue(response.json()['links']['next'].startswith('http://shop.example.com/'))
+
+
+class ConditionalGetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_catalog(categories=2, products=4, users=1, carts_per_user=0, wishlists_per_user=0)[0]
+        cls.product = Product.objects.order_by('id').first()
+
+    def get(self, route, etag=None, **extra):
+        kwargs = {'slug': self.product.slug} if route.startswith('product-detail') else {}
+        if etag is not None:
+            extra['HTTP_IF_NONE_MATCH'] = etag
+        return APIClient().get(reverse(route, kwargs=kwargs), **extra)
+
+    def test_current_etag_is_a_304_on_a_hit_and_on_a_miss(self):
+        for route in ('product-list', 'product-list-async'):
+            with self.subTest(route):
+                response = self.get(route)
+                etag = response['ETag']
+                self.assertTrue(etag.startswith('W/"'))
+                self.assertIn('public', response['Cache-Control'])
+                with self.assertNumQueries(0):
+                    self.assertEqual(self.get(route, etag).status_code, 304)
+                # List validators come from the version counters alone.
+                cache.clear()
+                with self.assertNumQueries(0):
+                    response = self.get(route, etag)
+                self.assertEqual((response.status_code, response['ETag']), (304, etag))
+
+    def test_detail_is_validated_by_etag_and_last_modified(self):
+        for route in ('product-detail-by-slug', 'product-detail-by-slug-async'):
+            with self.subTest(route):
+                response = self.get(route)
+                etag, last_modified = response['ETag'], response['Last-Modified']
+                with self.assertNumQueries(0):
+                    self.assertEqual(self.get(route, etag).status_code, 304)
+                cache.clear()
+                # One query for the row's versions, not the whole product.
+                with self.assertNumQueries(1):
+                    self.assertEqual(self.get(route, etag).status_code, 304)
+                self.assertEqual(self.get(route, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_a_write_changes_the_etag(self):
+        for route in ('product-list', 'product-detail-by-slug', 'product-list-async', 'product-detail-by-slug-async'):
+            with self.subTest(route):
+                etag = self.get(route)['ETag']
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.product.quantity += 1
+                    self.product.save()
+                response = self.get(route, etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_requests_with_credentials_stay_private(self):
+        token = AccessToken.for_user(self.user)
+        for route in ('product-list', 'product-detail-by-slug'):
+            with self.subTest(route):
+                response = self.get(route, HTTP_AUTHORIZATION=f'Bearer {token}')
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('private', response['Cache-Control'])
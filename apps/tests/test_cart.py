@@ -0,0 +1,215 @@
+import threading
+from unittest import mock, skipUnless
+
+from django.db import DatabaseError, connection, transaction
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps import stock
+from apps.factories import seed_catalog
+from apps.models import Cart, Product
+from apps.tests.base import APITestCase, APITransactionTestCase
+from apps.views import CartBulkAPIView, CartListCreateAPIView
+
+
+class CartCreateTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_catalog(categories=1, products=1, images_per_product=0, users=1, carts_per_user=0,
+                                wishlists_per_user=0)[0]
+        cls.product = Product.objects.get()
+        Product.objects.filter(pk=cls.product.pk).update(quantity=5)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, **data):
+        return self.client.post(reverse('cart'), {'product_id': self.product.pk, **data}, format='json')
+
+    def stock_left(self):
+        return Product.objects.values_list('quantity', flat=True).get(pk=self.product.pk)
+
+    def test_add_reserves_stock(self):
+        response = self.post(quantity=2)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Cart.objects.get(user=self.user).quantity, 2)
+        self.assertEqual(self.stock_left(), 3)
+
+    def test_add_without_quantity_takes_one_unit(self):
+        self.assertEqual(self.post().status_code, 201)
+        self.assertEqual(self.stock_left(), 4)
+
+    def test_zero_quantity_for_a_product_not_in_the_cart_changes_nothing(self):
+        response = self.post(quantity=0)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Cart.objects.exists())
+        self.assertEqual(self.stock_left(), 5)
+
+    def test_changing_the_quantity_moves_the_difference(self):
+        self.post(quantity=3)
+        response = self.post(quantity=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Cart.objects.get(user=self.user).quantity, 1)
+        self.assertEqual(self.stock_left(), 4)
+
+    def test_posting_again_without_quantity_removes_the_line(self):
+        self.post(quantity=2)
+        response = self.post()
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Cart.objects.exists())
+        self.assertEqual(self.stock_left(), 5)
+
+    def test_more_than_the_stock_is_rejected(self):
+        response = self.post(quantity=6)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Cart.objects.exists())
+        self.assertEqual(self.stock_left(), 5)
+
+    def test_concurrent_first_add_is_retried_as_an_update(self):
+        # The other request's line, inserted between our lookup (which saw none) and our insert.
+        line = Cart.objects.create(user=self.user, product=self.product, quantity=1)
+        Product.objects.filter(pk=self.product.pk).update(quantity=4)
+        with mock.patch.object(CartListCreateAPIView, 'get_line', side_effect=[None, line]):
+            response = self.post(quantity=3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Cart.objects.get(user=self.user).quantity, 3)
+        self.assertEqual(self.stock_left(), 2)
+
+
+
+class CartBulkTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_catalog(categories=1, products=4, images_per_product=0, users=1, carts_per_user=0,
+                                wishlists_per_user=0)[0]
+        cls.products = list(Product.objects.order_by('id').values_list('pk', flat=True))
+        Product.objects.update(quantity=5)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, items):
+        response = self.client.post(reverse('cart-bulk'), {
+            'items': [{'product_id': pk, 'quantity': quantity} for pk, quantity in items.items()],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        return {item['product_id']: (item['status'], item['quantity']) for item in response.data['results']}
+
+    def cart(self):
+        return dict(Cart.objects.filter(user=self.user).values_list('product_id', 'quantity'))
+
+    def stock_left(self):
+        return dict(Product.objects.values_list('pk', 'quantity'))
+
+    def test_adds_updates_and_removes_in_one_request(self):
+        first, second, third, fourth = self.products
+        Cart.objects.create(user=self.user, product_id=second, quantity=2)
+        Cart.objects.create(user=self.user, product_id=third, quantity=1)
+        Cart.objects.create(user=self.user, product_id=fourth, quantity=1)
+        results = self.post({first: 3, second: 4, third: 0, fourth: 1})
+        self.assertEqual(results, {first: ('added', 3), second: ('updated', 4), third: ('removed', 0),
+                                   fourth: ('unchanged', 1)})
+        self.assertEqual(self.cart(), {first: 3, second: 4, fourth: 1})
+        self.assertEqual(self.stock_left(), {first: 2, second: 3, third: 6, fourth: 5})
+
+    def test_failed_items_leave_the_rest_applied(self):
+        first, second = self.products[:2]
+        results = self.post({first: 6, second: 2, 10 ** 6: 1})
+        self.assertEqual(results, {first: ('out_of_stock', 0), second: ('added', 2), 10 ** 6: ('not_found', 0)})
+        self.assertEqual(self.cart(), {second: 2})
+        self.assertEqual(self.stock_left()[first], 5)
+
+    def test_concurrent_first_add_is_retried_as_an_update(self):
+        first, second = self.products[:2]
+        # The other request's line, inserted between our lookup (which saw none) and our insert.
+        line = Cart.objects.create(user=self.user, product_id=first, quantity=1)
+        Product.objects.filter(pk=first).update(quantity=4)
+        with mock.patch.object(CartBulkAPIView, 'get_lines', side_effect=[{}, {first: line}]):
+            results = self.post({first: 3, second: 1})
+        self.assertEqual(results, {first: ('updated', 3), second: ('added', 1)})
+        self.assertEqual(self.cart(), {first: 3, second: 1})
+        self.assertEqual(self.stock_left()[first], 2)
+        self.assertEqual(self.stock_left()[second], 4)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'SQLite serializes writers and reports "database is locked" instead.')
+class StockStressTests(APITransactionTestCase):
+    threads = 16
+
+    def setUp(self):
+        super().setUp()
+        self.user = seed_catalog(categories=1, products=1, images_per_product=0, users=1, carts_per_user=0,
+                                 wishlists_per_user=0)[0]
+        self.product = Product.objects.get()
+
+    def run_concurrently(self, target):
+        start, errors = threading.Barrier(self.threads), []
+
+        def worker():
+            try:
+                start.wait()
+                target()
+            except Exception as exc:  # reported by the test, not lost in the thread
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_concurrent_reservations_never_oversell(self):
+        Product.objects.filter(pk=self.product.pk).update(quantity=50)
+        reserved = []
+
+        def reserve():
+            for _ in range(10):
+                try:
+                    with transaction.atomic():
+                        stock.reserve(self.product.pk)
+                    reserved.append(1)
+                except stock.OutOfStock:
+                    pass
+
+        self.run_concurrently(reserve)
+        self.assertEqual(len(reserved), 50)
+        self.assertEqual(Product.objects.values_list('quantity', flat=True).get(pk=self.product.pk), 0)
+
+    def test_concurrent_first_adds_leave_one_line(self):
+        Product.objects.filter(pk=self.product.pk).update(quantity=100)
+        statuses = []
+
+        def add():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            response = client.post(reverse('cart'), {'product_id': self.product.pk, 'quantity': 2}, format='json')
+            statuses.append(response.status_code)
+            if response.status_code >= 500:
+                raise DatabaseError(response.status_code)
+
+        self.run_concurrently(add)
+        self.assertEqual(sorted(set(statuses)), [200, 201])
+        self.assertEqual(Cart.objects.get(user=self.user).quantity, 2)
+        self.assertEqual(Product.objects.values_list('quantity', flat=True).get(pk=self.product.pk), 98)
+
+    def test_concurrent_bulk_first_adds_leave_one_line(self):
+        Product.objects.filter(pk=self.product.pk).update(quantity=100)
+
+        def add():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            response = client.post(reverse('cart-bulk'), {'items': [{'product_id': self.product.pk, 'quantity': 2}]},
+                                   format='json')
+            if response.status_code != 200:
+                raise DatabaseError(response.status_code)
+
+        self.run_concurrently(add)
+        self.assertEqual(Cart.objects.get(user=self.user).quantity, 2)
+        self.assertEqual(Product.objects.values_list('quantity', flat=True).get(pk=self.product.pk), 98)
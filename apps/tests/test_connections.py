@@ -0,0 +1,125 @@
+import asyncio
+import os
+import runpy
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.db.backends.postgresql import base as postgresql
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from apps.dbpool import ConnectionStats, connection_stats
+from apps.factories import seed_catalog
+from apps.tests.base import APITestCase, APITransactionTestCase
+
+
+def load_settings(**env):
+    """``root.settings`` evaluated against the PostgreSQL configuration and ``env``."""
+    environ = {key: value for key, value in os.environ.items() if key not in ('DB_ENGINE', 'DB_POOL')}
+    with mock.patch.dict(os.environ, {**environ, **env}, clear=True):
+        return runpy.run_path(str(Path(settings.BASE_DIR, 'root', 'settings.py')))
+
+
+async def asgi_get(path):
+    """Serve one GET through Django's ASGI handler, which closes the request's connections like a server does."""
+    request, disconnected, messages = [{'type': 'http.request', 'body': b''}], asyncio.Event(), []
+
+    async def receive():
+        if request:
+            return request.pop()
+        await disconnected.wait()
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'', 'headers': [],
+             'server': ('testserver', 80), 'client': ('127.0.0.1', 0)}
+    await ASGIHandler()(scope, receive, send)
+    return messages[0]['status']
+
+
+class ConnectionSettingsTests(SimpleTestCase):
+    def test_persistent_connections_only_under_wsgi(self):
+        self.assertEqual(load_settings()['DATABASES']['default']['CONN_MAX_AGE'], 60)
+        self.assertEqual(load_settings(SERVER_INTERFACE='asgi')['DATABASES']['default']['CONN_MAX_AGE'], 0)
+        self.assertEqual(load_settings(SERVER_INTERFACE='asgi', DB_CONN_MAX_AGE='30')
+                         ['DATABASES']['default']['CONN_MAX_AGE'], 30)
+
+    def test_pool_is_sized_by_process_role(self):
+        for role, sizes in (('web', (2, 10)), ('celery', (1, 2))):
+            with self.subTest(role):
+                env = {'DB_POOL': '1', 'PROCESS_ROLE': role, 'SERVER_INTERFACE': 'asgi'}
+                database = load_settings(**env)['DATABASES']['default']
+                pool = database['OPTIONS']['pool']
+                self.assertEqual((database['CONN_MAX_AGE'], pool['min_size'], pool['max_size']), (0, *sizes))
+
+
+class ConnectionStatsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.stats = ConnectionStats(role='web', flush_interval=60)
+        patcher = mock.patch('apps.backends.postgresql.base.connection_stats', self.stats)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # A wrapper of the metrics backend that never reaches a server.
+        handler = ConnectionHandler({'default': {'ENGINE': 'django.db.backends.dummy'},
+                                     'pg': {'ENGINE': 'apps.backends.postgresql', 'NAME': 'unused'}})
+        self.wrapper = handler['pg']
+
+    def test_backend_counts_acquires_releases_and_errors(self):
+        with mock.patch.object(postgresql.DatabaseWrapper, 'get_new_connection', return_value=mock.Mock()):
+            self.wrapper.connection = self.wrapper.get_new_connection({})
+        with mock.patch.object(postgresql.DatabaseWrapper, 'get_new_connection', side_effect=OSError), \
+                self.assertRaises(OSError):
+            self.wrapper.get_new_connection({})
+        samples = self.stats.snapshot()
+        self.assertEqual(samples['apps_db_connections_in_use', 'pg'], 1)
+        self.assertEqual(samples['apps_db_connection_acquires_total', 'pg'], 1)
+        self.assertEqual(samples['apps_db_connection_errors_total', 'pg'], 1)
+
+        with mock.patch.object(postgresql.DatabaseWrapper, '_close'):
+            self.wrapper._close()
+            self.wrapper.connection = None
+            # Closing without a connection releases nothing.
+            self.wrapper._close()
+        self.assertEqual(self.stats.snapshot()['apps_db_connections_in_use', 'pg'], 0)
+
+    def test_render_exports_every_live_process(self):
+        self.stats.record_acquire('pg', 0.002)
+        self.assertEqual(self.redis.keys('metrics:db:*'), [])
+        body = self.stats.render()
+        self.assertIn('# TYPE apps_db_connections_in_use gauge', body)
+        self.assertIn('# TYPE apps_db_connection_acquires_total counter', body)
+        self.assertRegex(body, r'apps_db_connections_in_use\{alias="pg",role="web",process="[^"]+:\d+"\} 1\n')
+        self.assertEqual(self.redis.ttl(self.redis.keys('metrics:db:*')[0]), 181)
+
+    @override_settings(INSTRUMENTATION_ENABLED=True)
+    def test_snapshots_are_written_every_flush_interval(self):
+        self.stats.flush_interval = 0
+        self.stats.record_acquire('pg', 0.002)
+        self.assertEqual(len(self.redis.keys('metrics:db:*')), 1)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Only the PostgreSQL backend keeps connection metrics.')
+class AsyncConnectionTests(APITransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        seed_catalog(categories=1, products=3, images_per_product=0, users=1, carts_per_user=0, wishlists_per_user=0)
+
+    async def test_async_requests_release_their_connections(self):
+        before = connection_stats.snapshot()
+        # What settings give under ASGI without a pool; the request threads' connections share settings_dict.
+        with mock.patch.dict(connection.settings_dict, {'CONN_MAX_AGE': 0}):
+            for _ in range(3):
+                await cache.aclear()
+                self.assertEqual(await asgi_get(reverse('product-list-async')), 200)
+        after = connection_stats.snapshot()
+        key = ('apps_db_connection_acquires_total', DEFAULT_DB_ALIAS)
+        self.assertEqual(after[key] - before.get(key, 0), 3)
+        key = ('apps_db_connections_in_use', DEFAULT_DB_ALIAS)
+        self.assertEqual(after[key], before[key])
@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+import warnings
+from datetime import timedelta
+from unittest import mock
+
+from django.test import AsyncClient
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.exporters import ProductExporter
+from apps.factories import seed_catalog
+from apps.models import Product
+from apps.tests.base import APITestCase
+from apps.views import ProductExportAPIView
+
+
+class ProductExportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(products=6, users=1, carts_per_user=0, wishlists_per_user=0)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def export(self, **params):
+        response = self.client.get(reverse('product-export'), params)
+        self.assertEqual(response.status_code, 200)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        return rows, response['X-Export-Watermark']
+
+    def test_full_export(self):
+        rows, watermark = self.export()
+        self.assertEqual(sorted(row['id'] for row in rows), sorted(Product.objects.values_list('id', flat=True)))
+        self.assertTrue(watermark)
+
+    def test_incremental_export_repeats_the_margin_before_the_watermark(self):
+        now = timezone.now()
+        late, recent = Product.objects.order_by('id')[:2]
+        Product.objects.exclude(pk__in=[late.pk, recent.pk]).update(updated_at=now - timedelta(hours=1))
+        # ``late`` was stamped just before the watermark but (say) committed after the previous export.
+        Product.objects.filter(pk=late.pk).update(updated_at=now - ProductExportAPIView.watermark_margin / 2)
+        Product.objects.filter(pk=recent.pk).update(updated_at=now)
+
+        rows, _ = self.export(updated_after=now.isoformat())
+        self.assertEqual(sorted(row['id'] for row in rows), sorted([late.pk, recent.pk]))
+
+    async def aexport(self, **params):
+        # Django buffers a sync iterator under ASGI with a warning; make that fail the test.
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            response = await AsyncClient().get(reverse('product-export'), params)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_async)
+            return b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+    @mock.patch.object(ProductExportAPIView, 'chunk_size', 4)
+    async def test_asgi_export_streams_an_async_iterator(self):
+        rows = [json.loads(line) for line in (await self.aexport()).splitlines()]
+        expected = [row async for row in Product.objects.order_by('updated_at', 'id').values('id', 'category__name')]
+        self.assertEqual([(row['id'], row['category']) for row in rows],
+                         [(row['id'], row['category__name']) for row in expected])
+        self.assertTrue(all(len(row['images']) == 2 for row in rows))
+
+    async def test_asgi_csv_export(self):
+        rows = list(csv.reader(io.StringIO(await self.aexport(export_format='csv'))))
+        self.assertEqual(tuple(rows[0]), ProductExporter.columns)
+        self.assertEqual(len(rows), 7)
+
+    def test_invalid_updated_after_is_a_bad_request(self):
+        for value in ('yesterday', '2024-13-01T00:00:00', '2024-02-30T00:00:00'):
+            with self.subTest(value):
+                response = self.client.get(reverse('product-export'), {'updated_after': value})
+                self.assertEqual(response.status_code, 400)
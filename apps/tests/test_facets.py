@@ -0,0 +1,37 @@
+from unittest import mock
+
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.factories import seed_catalog
+from apps.models import Product
+from apps.tests.base import APITestCase
+from apps.views import AsyncProductListAPIView, ProductListCreateAPIView
+
+
+class ProductFacetTests(APITestCase):
+    routes = {'product-list': ProductListCreateAPIView, 'product-list-async': AsyncProductListAPIView}
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(products=40, users=2, carts_per_user=0, wishlists_per_user=0)
+        Product.objects.filter(pk__in=Product.objects.order_by('id').values('pk')[:10]).update(quantity=0)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def test_facets_add_up_to_the_listing(self):
+        for route in self.routes:
+            with self.subTest(route):
+                data = self.client.get(reverse(route), {'facets': 'true', 'count': 'exact'}).json()
+                self.assertEqual(data['count'], 40)
+                self.assertEqual(sum(category['count'] for category in data['facets']['category']), 40)
+                self.assertEqual(data['facets']['in_stock'], {'true': 30, 'false': 10})
+
+    def test_facets_count_only_the_views_queryset(self):
+        for route, view in self.routes.items():
+            with self.subTest(route), mock.patch.object(view, 'queryset', Product.objects.filter(quantity__gt=0)):
+                data = self.client.get(reverse(route), {'facets': 'true'}).json()
+                self.assertEqual(data['count'], 30)
+                self.assertEqual(data['facets']['in_stock'], {'true': 30, 'false': 0})
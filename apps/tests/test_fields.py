@@ -0,0 +1,70 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.factories import seed_catalog
+from apps.models import Product
+from apps.registry import category_registry
+from apps.tests.base import APITestCase
+
+
+class SparseFieldsetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(categories=2, products=4, images_per_product=2, users=2, carts_per_user=0, wishlists_per_user=0)
+        cls.slug = Product.objects.values_list('slug', flat=True).first()
+
+    def setUp(self):
+        super().setUp()
+        category_registry.refresh()
+
+    def get(self, route, params, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().get(reverse(route, kwargs=kwargs), params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        rows = data['results'] if 'results' in data else [data]
+        product_sql = [query['sql'] for query in queries if query['sql'].startswith('SELECT "apps_product"."id"')]
+        self.assertEqual(len(product_sql), 1)
+        return rows, product_sql[0], [query['sql'] for query in queries]
+
+    def test_fields_trim_the_output_and_the_columns(self):
+        for route in ('product-list', 'product-list-async'):
+            with self.subTest(route):
+                rows, sql, queries = self.get(route, {'fields': 'id,name,unknown'})
+                self.assertEqual({tuple(row) for row in rows}, {('id', 'name')})
+                self.assertIn('"apps_product"."name"', sql)
+                # The view's own columns stay: ordering, cache dependencies.
+                self.assertIn('"apps_product"."category_id"', sql)
+                self.assertNotIn('"apps_product"."description"', sql)
+                self.assertNotIn('"apps_product"."slug"', sql)
+                self.assertFalse([query for query in queries if 'apps_productimage' in query])
+
+    def test_default_output_loads_every_column_but_no_expandable_relation(self):
+        rows, sql, queries = self.get('product-list', {})
+        self.assertNotIn('thumbnail', rows[0])
+        self.assertNotIn('owner', rows[0])
+        self.assertIn('"apps_product"."slug"', sql)
+        self.assertNotIn('apps_customuser', sql)
+        self.assertTrue([query for query in queries if 'apps_productimage' in query])
+
+    def test_expand_adds_fields_and_their_relations(self):
+        rows, sql, _ = self.get('product-list', {'expand': 'owner,thumbnail'})
+        self.assertTrue({'id', 'slug', 'owner', 'thumbnail'} <= set(rows[0]))
+        self.assertIn('apps_customuser', sql)
+
+        rows, sql, queries = self.get('product-list', {'fields': 'id,owner'})
+        self.assertEqual(set(rows[0]), {'id', 'owner'})
+        self.assertIn('"apps_customuser"."username"', sql)
+        self.assertNotIn('"apps_customuser"."email"', sql)
+        self.assertFalse([query for query in queries if 'apps_productimage' in query])
+
+    def test_detail_fields(self):
+        for route in ('product-detail-by-slug', 'product-detail-by-slug-async'):
+            with self.subTest(route):
+                rows, sql, _ = self.get(route, {'fields': 'name,price'}, slug=self.slug)
+                self.assertEqual(set(rows[0]), {'name', 'price'})
+                self.assertNotIn('"apps_product"."description"', sql)
+                # Kept for the cache dependencies and Last-Modified.
+                self.assertIn('"apps_product"."updated_at"', sql)
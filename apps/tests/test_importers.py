@@ -0,0 +1,56 @@
+import csv
+import os
+import tempfile
+
+from apps.importers import ProductImporter
+from apps.models import CustomUser, Product
+from apps.tests.base import APITestCase
+
+
+class UncheckedImporter(ProductImporter):
+    """Skips the range check, so a bad value reaches the database's own constraint."""
+    to_int = staticmethod(lambda value, field: int(value))
+
+
+class ProductImporterTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create(username='owner', email='owner@example.com')
+
+    def write_csv(self, rows):
+        file = tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', encoding='utf-8', delete=False)
+        self.addCleanup(os.remove, file.name)
+        with file:
+            writer = csv.DictWriter(file, ['name', 'price', 'quantity', 'category', 'owner', 'description'])
+            writer.writeheader()
+            for name, price, quantity in rows:
+                writer.writerow({'name': name, 'price': price, 'quantity': quantity, 'category': 'Tools',
+                                 'owner': 'owner@example.com', 'description': f'<p>{name}</p>'})
+        return file.name
+
+    def run_import(self, rows, importer_class=ProductImporter):
+        return importer_class(batch_size=10).run(self.write_csv(rows))
+
+    def test_good_file(self):
+        report = self.run_import([('Hammer', 100, 3), ('Hammer', 120, 0), ('Saw', 250, 1)])
+        self.assertEqual((report.rows, report.created, report.failed), (3, 3, 0))
+        products = Product.objects.order_by('id')
+        self.assertEqual([p.slug for p in products], ['hammer', 'hammer-2', 'saw'])
+        self.assertEqual({p.category.name for p in products}, {'Tools'})
+        self.assertEqual({p.owner_id for p in products}, {self.owner.pk})
+        self.assertEqual(products[0].search_document, 'Hammer Hammer')
+
+    def test_out_of_range_rows_are_reported(self):
+        report = self.run_import([('Hammer', 100, 3), ('Gold', 10 ** 20, 1), ('Saw', 250, -1)])
+        self.assertEqual((report.created, report.failed), (1, 2))
+        self.assertEqual([error['line'] for error in report.errors], [3, 4])
+        self.assertIn('price must be between', report.errors[0]['error'])
+        self.assertIn('quantity must be between 0 and', report.errors[1]['error'])
+        self.assertEqual(list(Product.objects.values_list('name', flat=True)), ['Hammer'])
+
+    def test_constraint_violation_fails_only_its_row(self):
+        report = self.run_import([('Hammer', 100, 3), ('Broken', 100, -1), ('Saw', 250, 1)], UncheckedImporter)
+        self.assertEqual((report.created, report.failed), (2, 1))
+        self.assertEqual(report.errors[0]['line'], 3)
+        self.assertTrue(report.errors[0]['error'].startswith('insert failed:'))
+        self.assertEqual(sorted(Product.objects.values_list('name', flat=True)), ['Hammer', 'Saw'])
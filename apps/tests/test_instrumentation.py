@@ -0,0 +1,88 @@
+import re
+from collections import defaultdict
+from unittest import mock
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.test import AsyncClient, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from apps.factories import seed_catalog
+from apps.instrumentation import RequestMetrics, instrument_query, route_metrics
+from apps.middleware import InstrumentationMiddleware
+from apps.tests.base import APITestCase
+
+
+def timing_entries(response):
+    """``Server-Timing`` as ``{name: params}``."""
+    return dict(re.findall(r'([\w-]+);((?:[^,"]|"[^"]*")*)', response['Server-Timing']))
+
+
+class RequestMetricsTests(SimpleTestCase):
+    def test_exact_repeats_count_as_duplicates(self):
+        metrics = RequestMetrics()
+        metrics.record_query('SELECT %s', (1,), 0.001)
+        metrics.record_query('SELECT %s', (1,), 0.001)
+        metrics.record_query('SELECT %s', (2,), 0.001)
+        self.assertEqual((metrics.queries, metrics.duplicates), (3, 1))
+        self.assertIn('db;dur=3.0;desc="3 queries, 1 duplicate"', metrics.server_timing(0.01))
+
+    @override_settings(INSTRUMENTATION_ENABLED=False)
+    def test_disabled_middleware_removes_itself(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            InstrumentationMiddleware(lambda request: None)
+
+
+@override_settings(INSTRUMENTATION_ENABLED=True, METRICS_TOKEN='secret')
+class InstrumentationMiddlewareTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(categories=2, products=3, images_per_product=1, users=1, carts_per_user=0, wishlists_per_user=0)
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(route_metrics, 'pending', defaultdict(float))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # The connection of the test run predates the setting, so connection_created never fired.
+        wrapper = connection.execute_wrapper(instrument_query)
+        wrapper.__enter__()
+        self.addCleanup(wrapper.__exit__, None, None, None)
+
+    def test_server_timing_reports_queries_phases_and_cache(self):
+        response = self.client.get(reverse('product-list'))
+        self.assertEqual(response.status_code, 200)
+        entries = timing_entries(response)
+        self.assertTrue({'total', 'db', 'serialize', 'render', 'cache'} <= set(entries))
+        queries = int(re.search(r'"(\d+) queries', entries['db']).group(1))
+        self.assertGreater(queries, 0)
+        self.assertEqual(entries['cache-response'], 'desc="0 hit, 1 miss"')
+
+        entries = timing_entries(self.client.get(reverse('product-list')))
+        self.assertEqual(entries['cache-response'], 'desc="1 hit, 0 miss"')
+        self.assertIn('"0 queries', entries['db'])
+
+    async def test_async_views_are_measured(self):
+        response = await AsyncClient().get(reverse('product-list-async'))
+        self.assertEqual(response.status_code, 200)
+        entries = timing_entries(response)
+        self.assertEqual(entries['cache-response'], 'desc="0 hit, 1 miss"')
+        self.assertNotIn('"0 queries', entries['db'])
+
+    def test_metrics_endpoint_exports_route_totals(self):
+        for _ in range(2):
+            self.client.get(reverse('product-list'))
+        self.client.get(reverse('product-detail-by-slug', kwargs={'slug': 'missing'}))
+
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.client.get(reverse('metrics'), headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        products = 'route="api/v1/products",method="GET"'
+        self.assertIn(f'apps_http_requests_total{{{products},status="2xx"}} 2', body)
+        detail = 'route="api/v1/products/<slug:slug>/",method="GET"'
+        self.assertIn(f'apps_http_requests_total{{{detail},status="4xx"}} 1', body)
+        self.assertIn(f'apps_cache_requests_total{{{products},cache="response",result="hit"}} 1', body)
+        self.assertIn(f'apps_http_request_duration_seconds_count{{{products}}} 2', body)
+        self.assertIn(f'apps_http_request_duration_seconds_bucket{{{products},le="+Inf"}} 2', body)
+        self.assertIn('# TYPE apps_http_request_duration_seconds histogram', body)
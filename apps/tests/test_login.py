@@ -0,0 +1,75 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+from django.test import AsyncClient, SimpleTestCase
+from django.urls import reverse
+
+from apps.models import CustomUser
+from apps.passwords import PasswordHashPool, PoolSaturated
+from apps.tests.base import APITestCase
+
+PASSWORD = 'correct horse'
+
+
+class PasswordHashPoolTests(SimpleTestCase):
+    def test_submissions_past_workers_and_queue_fail_fast(self):
+        pool = PasswordHashPool(workers=1, queue_depth=1)
+        release = threading.Event()
+        running = [pool.submit(release.wait), pool.submit(release.wait)]
+        with self.assertRaises(PoolSaturated):
+            pool.submit(release.wait)
+        release.set()
+        for future in running:
+            future.result(timeout=5)
+        # Finished jobs give their slots back.
+        self.assertEqual(pool.submit(lambda: 'done').result(timeout=5), 'done')
+
+
+class AsyncLoginTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(email='login@example.com', password=make_password(PASSWORD),
+                                             username='login', is_active=True)
+
+    async def login(self, password=PASSWORD):
+        return await AsyncClient().post(reverse('login-async'), {
+            'email_or_username': 'login', 'password': password}, content_type='application/json')
+
+    async def test_valid_credentials_get_tokens(self):
+        response = await self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()), {'access', 'refresh'})
+
+    async def test_wrong_password_and_unknown_user_are_rejected(self):
+        self.assertEqual((await self.login('wrong')).status_code, 401)
+        response = await AsyncClient().post(reverse('login-async'), {
+            'email_or_username': 'nobody', 'password': PASSWORD}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_inactive_user_is_forbidden(self):
+        await CustomUser.objects.filter(pk=self.user.pk).aupdate(is_active=False)
+        self.assertEqual((await self.login()).status_code, 403)
+
+    async def test_saturated_pool_is_a_503(self):
+        pool = PasswordHashPool(workers=1, queue_depth=0)
+        release = threading.Event()
+        busy = pool.submit(release.wait)
+        try:
+            with mock.patch('apps.passwords.get_password_pool', return_value=pool):
+                response = await self.login()
+        finally:
+            release.set()
+            busy.result(timeout=5)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+    async def test_outdated_hash_is_upgraded(self):
+        hasher = PBKDF2PasswordHasher()
+        outdated = hasher.encode(PASSWORD, hasher.salt(), iterations=1000)
+        await CustomUser.objects.filter(pk=self.user.pk).aupdate(password=outdated)
+        self.assertEqual((await self.login()).status_code, 200)
+        user = await CustomUser.objects.aget(pk=self.user.pk)
+        self.assertNotEqual(user.password, outdated)
+        self.assertEqual(hasher.decode(user.password)['iterations'], hasher.iterations)
+        self.assertTrue(check_password(PASSWORD, user.password))
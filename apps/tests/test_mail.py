@@ -0,0 +1,88 @@
+import json
+from smtplib import SMTPException
+from unittest import mock
+
+from django.core import mail as outbox
+from django.test import override_settings
+
+from apps import mail
+from apps.tests.base import APITestCase
+
+
+# The locmem backend stands in for the SMTP server: sent messages land in django.core.mail.outbox.
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class ConfirmationQueueTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(mail.smtp.close)
+
+    def queue(self, count):
+        recipients = [f'user-{index}@example.com' for index in range(count)]
+        for email in recipients:
+            mail.queue_confirmation(email, f'Your code for {email}', window=60, schedule=False)
+        return recipients
+
+    def sent_to(self):
+        return [message.to[0] for message in outbox.outbox]
+
+    def assertQueueEmpty(self):
+        self.assertEqual(self.redis.llen(mail.CONFIRMATION_QUEUE), 0)
+        self.assertEqual(list(self.redis.scan_iter(match=f'{mail.PROCESSING_PREFIX}:*')), [])
+
+    def test_drain_sends_everything_in_batches(self):
+        recipients = self.queue(7)
+        report = mail.drain(batch_size=3)
+        self.assertEqual((report.sent, report.batches), (7, 3))
+        self.assertEqual(self.sent_to(), recipients)
+        self.assertQueueEmpty()
+
+    def test_duplicates_within_the_window_are_collapsed(self):
+        self.queue(2)
+        self.assertFalse(mail.queue_confirmation('user-0@example.com', 'again', window=60, schedule=False))
+        self.assertEqual(self.redis.llen(mail.CONFIRMATION_QUEUE), 2)
+
+    def test_one_drain_is_scheduled_per_batch_delay(self):
+        with mock.patch('apps.tasks.drain_confirmation_queue.apply_async') as apply_async:
+            for index in range(3):
+                mail.queue_confirmation(f'user-{index}@example.com', 'code', window=60)
+        apply_async.assert_called_once()
+
+    def fail_on_second_message(self, error):
+        send, calls = mail.smtp.send, []
+
+        def fake_send(message):
+            calls.append(message)
+            if len(calls) == 2:
+                raise error
+            return send(message)
+
+        return mock.patch.object(mail.smtp, 'send', side_effect=fake_send)
+
+    def test_smtp_error_puts_the_unsent_rest_back_in_order(self):
+        recipients = self.queue(5)
+        with self.fail_on_second_message(SMTPException('451')), self.assertRaises(SMTPException):
+            mail.drain(batch_size=3)
+        queued = [json.loads(item)['to'] for item in self.redis.lrange(mail.CONFIRMATION_QUEUE, 0, -1)]
+        self.assertEqual(queued, recipients[1:])
+        self.assertEqual(self.redis.keys(f'{mail.PROCESSING_PREFIX}:*'), [])
+
+        mail.drain(batch_size=3)
+        self.assertEqual(self.sent_to(), recipients)
+        self.assertQueueEmpty()
+
+    def test_batch_of_a_killed_worker_is_sent_once_its_lease_lapses(self):
+        recipients = self.queue(5)
+        # SystemExit stands in for the worker process being killed mid-batch.
+        with mock.patch('apps.mail.worker_id', return_value='host:1'), self.fail_on_second_message(SystemExit), \
+                self.assertRaises(SystemExit):
+            mail.drain(batch_size=3)
+        # Still leased: another worker leaves the batch alone.
+        with mock.patch('apps.mail.worker_id', return_value='host:2'):
+            mail.drain(batch_size=3)
+        self.assertEqual(self.sent_to(), [recipients[0], *recipients[3:]])
+
+        self.redis.delete(f'{mail.LEASE_PREFIX}:host:1')
+        with mock.patch('apps.mail.worker_id', return_value='host:2'), self.assertLogs('apps.mail', 'WARNING'):
+            mail.drain(batch_size=3)
+        self.assertEqual(sorted(self.sent_to()), sorted(recipients))
+        self.assertQueueEmpty()
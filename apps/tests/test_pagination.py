@@ -0,0 +1,85 @@
+import base64
+import json
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.factories import seed_catalog
+from apps.models import Product
+from apps.registry import category_registry
+from apps.tests.base import APITestCase
+
+
+def make_cursor(values, reverse=False):
+    return base64.urlsafe_b64encode(json.dumps({'v': values, 'r': reverse}).encode()).decode()
+
+
+class KeysetPaginationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(products=12, users=1, carts_per_user=0, wishlists_per_user=0)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def test_following_next_links_visits_every_product_once(self):
+        url, seen = reverse('product-list'), []
+        params = {'cursor': '', 'page_size': 5}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            seen += [item['id'] for item in response.data['results']]
+            url, params = response.data['links']['next'], None
+        expected = list(Product.objects.order_by('price', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def follow(self, params):
+        category_registry.all()
+        url, pages = reverse('product-list'), []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            pages.append(([item['id'] for item in response.data['results']], len(queries)))
+            url, params = response.data['links']['next'], None
+        return pages
+
+    def test_following_next_links_of_a_relevance_ordered_search(self):
+        pages = self.follow({'search': 'product', 'ordering': 'relevance', 'cursor': '', 'page_size': 5})
+        seen = [pk for ids, _ in pages for pk in ids]
+        self.assertEqual(sorted(seen), list(Product.objects.order_by('id').values_list('id', flat=True)))
+        self.assertEqual(len(pages), 3)
+
+    def test_related_ordering_key_costs_the_same_on_every_page(self):
+        for fields in (None, 'id,name'):
+            with self.subTest(fields=fields):
+                params = {'ordering': 'category__name', 'cursor': '', 'page_size': 5}
+                if fields:
+                    params['fields'] = fields
+                pages = self.follow(params)
+                self.assertEqual(len({pk for ids, _ in pages for pk in ids}), 12)
+                self.assertEqual(len({count for _, count in pages}), 1, pages)
+
+    def test_cursor_on_a_related_ordering_key(self):
+        response = self.client.get(reverse('product-list'), {'ordering': 'category__name', 'page_size': 3,
+                                                             'cursor': make_cursor(['Category 0', 0])})
+        self.assertEqual(response.status_code, 200)
+
+    def test_malformed_cursors_are_not_found(self):
+        cursors = {
+            'not base64': '%%%',
+            'not an object': make_cursor(None)[:-2],
+            'wrong length': make_cursor([1]),
+            'wrong type': make_cursor(['abc', 'x']),
+            'object value': make_cursor([{'a': 1}, 1]),
+            'list value': make_cursor([[1], 1]),
+            'nulls': make_cursor([None, None]),
+            'out of range': make_cursor([1, 10 ** 30]),
+        }
+        for label, cursor in cursors.items():
+            with self.subTest(label):
+                response = self.client.get(reverse('product-list'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
@@ -0,0 +1,50 @@
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps import urls
+from apps.factories import seed_catalog
+from apps.models import Product
+from apps.registry import category_registry
+from apps.tests.base import APITestCase
+from apps.utils import query_budget
+
+
+def budgeted_views():
+    """``(url name, view class, budget)`` for every API view that declares a ``query_budget``."""
+    for pattern in urls.urlpatterns:
+        # DRF views expose the class as ``cls``, plain Django (async) views as ``view_class``.
+        view_class = getattr(pattern.callback, 'cls', None) or getattr(pattern.callback, 'view_class', None)
+        budget = getattr(view_class, 'query_budget', None)
+        if budget is not None:
+            yield pattern, view_class, budget
+
+
+class QueryBudgetTests(APITestCase):
+    """Every view with a ``query_budget`` stays within it, whatever the page size."""
+    page_sizes = (1, 5, 50)
+
+    @classmethod
+    def setUpTestData(cls):
+        size = max(cls.page_sizes)
+        cls.users = seed_catalog(products=size * 2, carts_per_user=size, wishlists_per_user=size)
+        cls.slug = Product.objects.values_list('slug', flat=True).first()
+
+    def test_views_stay_within_their_budget(self):
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        # Budgets are per request in a warmed-up process; the registry load is a one-off per process.
+        category_registry.refresh()
+
+        views = list(budgeted_views())
+        self.assertTrue(views)
+        for pattern, view_class, budget in views:
+            kwargs = {'slug': self.slug} if 'slug' in pattern.pattern.converters else {}
+            url = reverse(pattern.name, kwargs=kwargs)
+            variants = [{}] if kwargs else [{'page_size': size} for size in self.page_sizes]
+            if getattr(view_class, 'keyset_ordering', None):
+                variants += [{'page_size': size, 'cursor': ''} for size in self.page_sizes]
+            for params in variants:
+                with self.subTest(url=url, **params):
+                    with query_budget(budget, label=f'GET {url} {params or ""}'.strip()):
+                        response = client.get(url, params)
+                    self.assertEqual(response.status_code, 200)
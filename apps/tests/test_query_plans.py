@@ -0,0 +1,164 @@
+import json
+from functools import reduce
+from operator import or_
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.models import Q
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.factories import CATALOG_SCALES, seed_catalog
+from apps.models import CustomUser, Product
+from apps.registry import category_registry
+from apps.search import SEARCH_INDEX_NAME, PostgresSearchBackend
+from apps.tests.base import APITestCase
+
+# Nodes that mean the planner found no index for the access path or the ordering.
+SEQUENTIAL_SCAN = 'Seq Scan'
+SORT_NODES = ('Sort', 'Incremental Sort')
+
+
+class PlanCase:
+    """A request to one of the hot list views; ``sort_ok`` where the ordering can't come from an index."""
+
+    def __init__(self, label, route, params=None, kwargs=None, sort_ok=False):
+        self.label = label
+        self.route = route
+        self.params = params or {}
+        self.kwargs = kwargs
+        self.sort_ok = sort_ok
+
+
+def build_cases(data):
+    category, owner, slug = data['category_id'], data['owner_id'], data['slug']
+    return [
+        PlanCase('products', 'product-list', {'page_size': 20}),
+        PlanCase('products:deep-page', 'product-list', {'page_size': 20, 'page': 5}),
+        PlanCase('products:keyset', 'product-list', {'page_size': 20, 'cursor': ''}),
+        PlanCase('products:-price', 'product-list', {'page_size': 20, 'ordering': '-price'}),
+        PlanCase('products:quantity', 'product-list', {'page_size': 20, 'ordering': 'quantity'}),
+        PlanCase('products:category-name', 'product-list', {'page_size': 20, 'ordering': 'category__name'}),
+        PlanCase('products:category', 'product-list', {'page_size': 20, 'category': category}),
+        PlanCase('products:category:-price', 'product-list',
+                 {'page_size': 20, 'category': category, 'ordering': '-price'}),
+        PlanCase('products:owner', 'product-list', {'page_size': 20, 'owner': owner}),
+        PlanCase('products:price-range', 'product-list', {'page_size': 20, 'price_min': 100, 'price_max': 500}),
+        PlanCase('products:faceted', 'product-list', {'page_size': 20, 'facets': 'true', 'category': category}),
+        # Matches come from the GIN index in arbitrary order, so ordering them by price needs a sort.
+        PlanCase('products:search', 'product-list', {'page_size': 20, 'search': 'product'}, sort_ok=True),
+        PlanCase('product-detail', 'product-detail-by-slug', kwargs={'slug': slug}),
+        PlanCase('products:export', 'product-export'),
+        PlanCase('wishlist', 'wishlist', {'page_size': 20}),
+        PlanCase('cart', 'cart', {'page_size': 20}),
+        PlanCase('users', 'users', {'page_size': 20}),
+    ]
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from plan_nodes(child)
+
+
+def plan_problems(plan, sort_ok=False):
+    """Sequential scans and (unless ``sort_ok``) sorts in an ``EXPLAIN (FORMAT JSON)`` plan."""
+    problems = []
+    for node in plan_nodes(plan):
+        if node['Node Type'] == SEQUENTIAL_SCAN:
+            problems.append(f'sequential scan on {node["Relation Name"]}')
+        elif node['Node Type'] in SORT_NODES and not sort_ok:
+            problems.append(f'{node["Node Type"].lower()} on {", ".join(node.get("Sort Key", ()))}')
+    return problems
+
+
+class PlanProblemsTests(SimpleTestCase):
+    plan = {'Node Type': 'Limit', 'Plans': [
+        {'Node Type': 'Sort', 'Sort Key': ['apps_product.price'], 'Plans': [
+            {'Node Type': 'Seq Scan', 'Relation Name': 'apps_product'},
+        ]},
+    ]}
+
+    def test_reports_sequential_scans_and_sorts(self):
+        self.assertEqual(plan_problems(self.plan), ['sort on apps_product.price', 'sequential scan on apps_product'])
+
+    def test_sorts_may_be_allowed(self):
+        self.assertEqual(plan_problems(self.plan, sort_ok=True), ['sequential scan on apps_product'])
+
+    def test_index_scans_pass(self):
+        plan = {'Node Type': 'Limit', 'Plans': [{'Node Type': 'Index Scan', 'Relation Name': 'apps_product'}]}
+        self.assertEqual(plan_problems(plan), [])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'The plans of other backends say nothing about PostgreSQL.')
+# Cached responses would hide the queries, so every request goes to the database.
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class QueryPlanTests(APITestCase):
+    """
+    Requests the hot list views and EXPLAINs every SELECT they run. Sequential scans and sorts are
+    priced out (enable_seqscan/enable_sort off), so any that remain mean no index fits the query.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_catalog(**CATALOG_SCALES['small'])
+        cls.product = Product.objects.values('slug', 'category_id', 'owner_id').first()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE apps_category, apps_product, apps_productimage, apps_wishlist, apps_cart, '
+                           'apps_customuser')
+
+    def test_list_queries_are_served_by_indexes(self):
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        category_registry.refresh()
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_sort = off')
+
+        for case in build_cases(self.product):
+            with self.subTest(case.label):
+                for sql, plan in self.explain_requests(client, case):
+                    problems = plan_problems(plan, case.sort_ok)
+                    self.assertFalse(problems, f'{"; ".join(problems)}\n    {sql}')
+
+    def test_search_queries_use_the_declared_indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        cases = [
+            (PostgresSearchBackend().search(Product.objects.all(), 'product'), SEARCH_INDEX_NAME),
+            (Product.objects.filter(name__istartswith='product 1'), 'product_name_prefix_idx'),
+            (CustomUser.objects.filter(email__istartswith='user-'), 'user_email_prefix_idx'),
+            (CustomUser.objects.filter(phone_number__istartswith='+99'), 'user_phone_prefix_idx'),
+            (CustomUser.objects.filter(username__istartswith='user-'), 'user_username_prefix_idx'),
+        ]
+        for queryset, index in cases:
+            with self.subTest(index):
+                self.assertIn(index, queryset.explain())
+
+    def test_slug_lookups_use_the_slug_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        slugs = Product.objects.order_by('id').values_list('slug', flat=True)[:3]
+        queryset = Product.objects.filter(reduce(or_, (Q(slug__startswith=slug) for slug in slugs)))
+        self.assertNotIn(SEQUENTIAL_SCAN, queryset.explain())
+
+    def explain_requests(self, client, case):
+        url = reverse(case.route, kwargs=case.kwargs)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, case.params)
+            if response.streaming:
+                # The export streams: its queries run while the body is read.
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+
+        selects = [query['sql'] for query in context.captured_queries if query['sql'].lstrip().startswith('SELECT')]
+        self.assertTrue(selects)
+        for sql in selects:
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            yield sql, plan[0]['Plan']
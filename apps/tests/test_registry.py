@@ -0,0 +1,56 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.factories import seed_catalog
+from apps.models import Category, Product
+from apps.registry import category_registry
+from apps.tests.base import APITestCase
+
+
+class CategoryRegistryTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(categories=3, products=12, users=1, carts_per_user=0, wishlists_per_user=0)
+
+    def setUp(self):
+        super().setUp()
+        self.categories = category_registry.all()
+        self.category_id = self.categories[0]['id']
+
+    def write(self, func):
+        with self.captureOnCommitCallbacks(execute=True):
+            func()
+        category_registry.expire()
+
+    def load(self):
+        with CaptureQueriesContext(connection) as queries:
+            entry = category_registry.get(self.category_id)
+        return entry, len(queries)
+
+    def add_product(self):
+        product = Product.objects.filter(category_id=self.category_id).first()
+        product.pk, product.slug = None, f'{product.slug}-copy'
+        product.save()
+
+    def test_product_insert_waits_for_the_count_interval(self):
+        before = category_registry.get(self.category_id)['product_count']
+        self.write(self.add_product)
+        self.assertEqual(self.load(), ({**self.categories[0], 'product_count': before}, 0))
+
+        category_registry.counted_at = float('-inf')
+        category_registry.expire()
+        entry, queries = self.load()
+        self.assertEqual(entry['product_count'], before + 1)
+        # Only the grouped count ran: the categories themselves weren't reloaded.
+        self.assertEqual(queries, 1)
+
+    def test_category_rename_reloads_without_recounting(self):
+        fingerprint = category_registry.fingerprint
+        category = Category.objects.get(pk=self.category_id)
+        category.name = 'Renamed'
+        self.write(category.save)
+        entry, queries = self.load()
+        self.assertEqual(entry['name'], 'Renamed')
+        self.assertEqual(entry['product_count'], self.categories[0]['product_count'])
+        self.assertEqual(queries, 1)
+        self.assertNotEqual(category_registry.fingerprint, fingerprint)
@@ -0,0 +1,78 @@
+from contextlib import ExitStack
+from unittest import skipUnless
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.factories import seed_catalog
+from apps.models import Product
+from apps.registry import category_registry
+from apps.routers import replicas
+from apps.tests.base import APITransactionTestCase
+
+
+# The stand-in replica mirrors the test database (TEST['MIRROR']), so only where queries go is checked.
+@skipUnless(settings.REPLICA_DATABASES, 'Set DB_REPLICA_NAME to add a stand-in replica (replica_1).')
+class ReplicaRoutingTests(APITransactionTestCase):
+    databases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+    use_replicas = True
+
+    def setUp(self):
+        super().setUp()
+        self.users = seed_catalog(products=20, users=2, carts_per_user=0, wishlists_per_user=0)
+        self.product_id = Product.objects.values_list('pk', flat=True).first()
+        self.writer, self.reader = APIClient(), APIClient()
+        self.writer.force_authenticate(self.users[0])
+        self.reader.force_authenticate(self.users[1])
+        # A warmed-up process: the registry's one-off load (on the primary) is done.
+        category_registry.refresh()
+
+    def request(self, client, method, url, data):
+        with ExitStack() as stack:
+            captured = {alias: stack.enter_context(CaptureQueriesContext(connections[alias]))
+                        for alias in (DEFAULT_DB_ALIAS, *replicas.aliases)}
+            if method == 'GET':
+                response = client.get(url, data)
+            else:
+                response = client.post(url, data, format='json')
+        self.assertLess(response.status_code, 400)
+        counts = {alias: len(context) for alias, context in captured.items()}
+        return counts[DEFAULT_DB_ALIAS], sum(counts[alias] for alias in replicas.aliases)
+
+    def assertOnReplica(self, queries):
+        primary, replica = queries
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def assertOnPrimary(self, queries):
+        self.assertEqual(queries[1], 0)
+
+    # Distinct page sizes give distinct cache keys, so every listing is built from the database.
+    def test_anonymous_catalog_reads_use_a_replica(self):
+        self.assertOnReplica(self.request(APIClient(), 'GET', reverse('product-list'), {'page_size': 1}))
+
+    def test_writes_and_the_writers_next_reads_use_the_primary(self):
+        # Replica lag is measured once per interval; this measurement predates the write.
+        self.assertOnReplica(self.request(self.reader, 'GET', reverse('product-list'), {'page_size': 1}))
+        self.assertOnPrimary(self.request(self.writer, 'POST', reverse('cart'),
+                                          {'product_id': self.product_id, 'quantity': 1}))
+        self.assertOnPrimary(self.request(self.writer, 'GET', reverse('product-list'), {'page_size': 2}))
+        # Another user doesn't need to see that write straight away.
+        self.assertOnReplica(self.request(self.reader, 'GET', reverse('product-list'), {'page_size': 3}))
+
+    def test_lagging_replicas_are_skipped(self):
+        max_lag = replicas.max_lag
+        replicas.max_lag = -1.0
+        self.addCleanup(setattr, replicas, 'max_lag', max_lag)
+        self.assertOnPrimary(self.request(self.reader, 'GET', reverse('product-list'), {'page_size': 4}))
+
+    def test_category_registry_loads_from_the_primary(self):
+        # The category list reloads the registry while its reads are routed to a replica.
+        category_registry.reset()
+        primary, replica = self.request(APIClient(), 'GET', reverse('category-list'), {'page_size': 5})
+        # One query for the categories, one for their product counts.
+        self.assertEqual((primary, replica), (2, 0))
+        self.assertTrue(category_registry.categories)
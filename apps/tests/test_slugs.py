@@ -0,0 +1,63 @@
+from unittest import mock
+
+from django.db import IntegrityError
+
+from apps.models import Category
+from apps.tests.base import APITestCase
+
+
+class SlugAllocationTests(APITestCase):
+    def create(self, name):
+        return Category.objects.create(name=name).slug
+
+    def test_duplicates_get_the_next_suffix(self):
+        self.assertEqual([self.create('Hand Tools') for _ in range(3)], ['hand-tools', 'hand-tools-2', 'hand-tools-3'])
+
+    def test_the_highest_suffix_wins_and_similar_slugs_are_ignored(self):
+        for slug in ('tools', 'tools-9', 'tools-10', 'tools-box', 'tools-box-20', 'toolset', 'tools-'):
+            Category.objects.bulk_create([Category(name=slug, slug=slug)])
+        self.assertEqual(self.create('Tools'), 'tools-11')
+        self.assertEqual(self.create('Tools box'), 'tools-box-21')
+        self.assertEqual(self.create('Tool'), 'tool')
+
+    def test_renaming_reallocates_and_keeps_its_own_slug_out(self):
+        category = Category.objects.create(name='Saws')
+        self.create('Drills')
+        category.name = 'Drills'
+        category.save()
+        self.assertEqual(category.slug, 'drills-2')
+        category.save()
+        self.assertEqual(Category.objects.get(pk=category.pk).slug, 'drills-2')
+
+    def test_batch_allocation_takes_one_query(self):
+        self.create('Saws')
+        self.create('Saws')
+        objs = [Category(name=name) for name in ('Saws', 'Drills', 'Saws', 'Drills', 'Saws box')]
+        with self.assertNumQueries(1):
+            Category.allocate_slugs(objs)
+        self.assertEqual([obj.slug for obj in objs], ['saws-3', 'drills', 'saws-4', 'drills-2', 'saws-box'])
+
+    def test_batch_allocation_keeps_assigned_slugs(self):
+        objs = [Category(name='Saws', slug='custom'), Category(name='Saws')]
+        Category.allocate_slugs(objs)
+        self.assertEqual([obj.slug for obj in objs], ['custom', 'saws'])
+
+    def test_a_slug_taken_concurrently_is_retried(self):
+        self.create('Saws')
+        real, calls = Category.next_free_slug, []
+
+        def stale_then_real(instance, base, using=None):
+            # The first lookup ran before another insert took 'saws'.
+            calls.append(base)
+            return base if len(calls) == 1 else real(instance, base, using)
+
+        with mock.patch.object(Category, 'next_free_slug', autospec=True, side_effect=stale_then_real):
+            category = Category.objects.create(name='Saws')
+        self.assertEqual((category.slug, len(calls)), ('saws-2', 2))
+
+    def test_retries_are_bounded(self):
+        self.create('Saws')
+        with mock.patch.object(Category, 'next_free_slug', return_value='saws') as next_free_slug, \
+                self.assertRaises(IntegrityError):
+            Category.objects.create(name='Saws')
+        self.assertEqual(next_free_slug.call_count, Category.slug_retries)
@@ -0,0 +1,63 @@
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+import redis
+from django.utils import timezone
+from django_celery_results.models import TaskResult
+
+from apps import telemetry
+from apps.tasks import prune_task_results
+from apps.tests.base import APITestCase
+
+
+class TaskTelemetryTests(APITestCase):
+    def run_task(self, task_id, wait, runtime, state='SUCCESS'):
+        task = SimpleNamespace(name='apps.tasks.example', request=SimpleNamespace(published_at=1000.0, is_eager=False))
+        with mock.patch('apps.telemetry.time.time', return_value=1000.0 + wait), \
+                mock.patch('apps.telemetry.time.perf_counter', side_effect=[50.0, 50.0 + runtime]):
+            telemetry.task_started(task_id=task_id, task=task)
+            telemetry.task_finished(task_id=task_id, task=task, state=state)
+
+    def test_runs_fold_into_one_histogram_per_task(self):
+        for index in range(9):
+            self.run_task(f'ok-{index}', wait=0.002, runtime=0.02)
+        self.run_task('slow', wait=0.2, runtime=3, state='FAILURE')
+
+        stats = telemetry.task_stats()['apps.tasks.example']
+        self.assertEqual((stats['success'], stats['failure']), (9, 1))
+        self.assertEqual(stats['runtime']['count'], 10)
+        self.assertAlmostEqual(stats['runtime']['mean_ms'], (9 * 20 + 3000) / 10, places=1)
+        self.assertEqual((stats['runtime']['p50_ms'], stats['runtime']['p99_ms']), (25.0, 5000.0))
+        self.assertEqual((stats['wait']['p50_ms'], stats['wait']['p99_ms']), (5.0, 250.0))
+        # One hash per task, whatever the number of runs.
+        self.assertEqual(len(self.redis.keys('celery:telemetry:*')), 2)
+
+    def test_publish_stamps_the_headers(self):
+        headers = {}
+        telemetry.stamp_published(headers=headers)
+        self.assertIn('published_at', headers)
+
+    def test_redis_errors_never_fail_the_task(self):
+        with mock.patch.object(self.redis, 'pipeline') as pipeline, \
+                self.assertLogs('apps.telemetry', 'WARNING'):
+            pipeline.return_value.execute.side_effect = redis.ConnectionError
+            self.run_task('lost', wait=0, runtime=0.01)
+
+    def test_reset(self):
+        self.run_task('one', wait=0, runtime=0.01)
+        telemetry.reset()
+        self.assertEqual(telemetry.task_stats(), {})
+
+
+class PruneTaskResultsTests(APITestCase):
+    def test_deletes_only_rows_past_retention(self):
+        TaskResult.objects.bulk_create([TaskResult(task_id=f'task-{index}', status='SUCCESS') for index in range(5)])
+        old = TaskResult.objects.order_by('id').values_list('pk', flat=True)[:3]
+        TaskResult.objects.filter(pk__in=list(old)).update(date_done=timezone.now() - timedelta(days=10))
+
+        result = prune_task_results.apply(kwargs={'days': 7, 'batch_size': 2})
+        self.assertEqual(result.get(), 3)
+        self.assertEqual(TaskResult.objects.count(), 2)
+        # The run itself is recorded through the Celery signals.
+        self.assertEqual(telemetry.task_stats()['apps.tasks.prune_task_results']['success'], 1)
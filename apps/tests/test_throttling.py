@@ -0,0 +1,90 @@
+from unittest import mock
+
+import redis
+from django.test import AsyncClient, RequestFactory
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.tests.base import APITestCase
+from apps.throttling import IPSlidingWindowThrottle, SlidingWindowRateThrottle
+
+# Start of a minute window, so tests can place requests at a known point of the window.
+WINDOW_START = 1_700_000_040.0
+
+
+class ThreePerMinute(IPSlidingWindowThrottle):
+    scope = 'test'
+    rate = '3/min'
+
+
+class SlidingWindowTests(APITestCase):
+    def allow(self, at):
+        throttle = ThreePerMinute()
+        throttle.timer = lambda: at
+        return throttle.allow_request(RequestFactory().get('/'), None), throttle
+
+    def test_denies_past_the_limit_and_says_how_long_to_wait(self):
+        for _ in range(3):
+            self.assertTrue(self.allow(WINDOW_START + 10)[0])
+        allowed, throttle = self.allow(WINDOW_START + 10)
+        self.assertFalse(allowed)
+        # The current window alone is full: it has to become the previous one and decay.
+        self.assertAlmostEqual(throttle.wait(), 50, places=3)
+
+    def test_previous_window_counts_by_its_remaining_overlap(self):
+        for _ in range(3):
+            self.allow(WINDOW_START + 50)
+        # Halfway through the next window, the 3 earlier requests weigh 1.5: one more fits.
+        self.assertTrue(self.allow(WINDOW_START + 90)[0])
+        allowed, throttle = self.allow(WINDOW_START + 90)
+        self.assertFalse(allowed)
+        self.assertGreater(throttle.wait(), 0)
+        # Two windows on, the early requests no longer count.
+        self.assertTrue(self.allow(WINDOW_START + 125)[0])
+
+    def test_counters_expire_after_two_windows(self):
+        _, throttle = self.allow(WINDOW_START)
+        keys = self.redis.keys('*')
+        self.assertEqual(len(keys), 1)
+        self.assertTrue(0 < self.redis.ttl(keys[0]) <= 2 * throttle.duration)
+
+    def test_requests_are_let_through_when_redis_fails(self):
+        with mock.patch.object(self.redis, 'evalsha', side_effect=redis.ConnectionError), \
+                self.assertLogs('apps.throttling', 'WARNING'):
+            for _ in range(5):
+                self.assertTrue(self.allow(WINDOW_START)[0])
+
+
+@mock.patch.object(SlidingWindowRateThrottle, 'timer', return_value=WINDOW_START + 1)
+class ScopeLimitTests(APITestCase):
+    def test_auth_scope_allows_10_requests_a_minute(self, timer):
+        client = APIClient()
+        for _ in range(10):
+            response = client.post(reverse('login'), {'email_or_username': 'nobody', 'password': 'x'})
+            self.assertNotEqual(response.status_code, 429)
+        response = client.post(reverse('login'), {'email_or_username': 'nobody', 'password': 'x'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn(response['Retry-After'], ('59', '60'))  # ceil() of ~59s
+
+    async def test_auth_scope_applies_to_the_async_login(self, timer):
+        client = AsyncClient()
+        body = {'email_or_username': 'nobody', 'password': 'x'}
+        for _ in range(10):
+            response = await client.post(reverse('login-async'), body, content_type='application/json')
+            self.assertEqual(response.status_code, 401)
+        response = await client.post(reverse('login-async'), body, content_type='application/json')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn(response['Retry-After'], ('59', '60'))
+        # Another address has its own allowance.
+        response = await AsyncClient(client=('10.0.0.2', 0)).post(reverse('login-async'), body,
+                                                                  content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_catalog_scope_allows_600_requests_a_minute(self, timer):
+        window = int(WINDOW_START // 60)
+        self.redis.set(f'{{throttle_catalog_127.0.0.1}}:{window}', 599)
+        client = APIClient()
+        self.assertEqual(client.get(reverse('category-list')).status_code, 200)
+        response = client.get(reverse('category-list'))
+        self.assertEqual(response.status_code, 429)
+        self.assertIn(response['Retry-After'], ('59', '60'))  # ceil() of ~59s
@@ -0,0 +1,56 @@
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.factories import seed_catalog
+from apps.models import Product, Wishlist
+from apps.tests.base import APITestCase
+
+
+class WishlistBulkTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_catalog(categories=1, products=3, images_per_product=0, users=1, carts_per_user=0,
+                                wishlists_per_user=0)[0]
+        cls.products = list(Product.objects.order_by('id').values_list('pk', flat=True))
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, product_ids, **data):
+        response = self.client.post(reverse('wishlist-bulk'), {'product_ids': product_ids, **data}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return [(item['product_id'], item['status']) for item in response.data['results']]
+
+    def wishlist(self):
+        return set(Wishlist.objects.filter(user=self.user).values_list('product_id', flat=True))
+
+    def test_add(self):
+        first, second = self.products[:2]
+        Wishlist.objects.create(user=self.user, product_id=first)
+        results = self.post([first, second, second, 10 ** 6])
+        self.assertEqual(results, [(first, 'already_present'), (second, 'added'), (10 ** 6, 'not_found')])
+        self.assertEqual(self.wishlist(), {first, second})
+
+    def test_remove(self):
+        first, second, third = self.products
+        Wishlist.objects.create(user=self.user, product_id=first)
+        Wishlist.objects.create(user=self.user, product_id=third)
+        results = self.post([first, second], action='remove')
+        self.assertEqual(results, [(first, 'removed'), (second, 'not_present')])
+        self.assertEqual(self.wishlist(), {third})
+
+    def test_other_users_lists_are_untouched(self):
+        other = seed_catalog(categories=0, products=0, images_per_product=0, users=1, carts_per_user=0,
+                             wishlists_per_user=0, seed=1)[0]
+        Wishlist.objects.create(user=other, product_id=self.products[0])
+        self.assertEqual(self.post([self.products[0]]), [(self.products[0], 'added')])
+        self.post([self.products[0]], action='remove')
+        self.assertTrue(Wishlist.objects.filter(user=other).exists())
+
+    def test_invalid_payloads_are_rejected(self):
+        for data in ({'product_ids': []}, {'product_ids': [1], 'action': 'toggle'}, {}):
+            with self.subTest(data):
+                response = self.client.post(reverse('wishlist-bulk'), data, format='json')
+                self.assertEqual(response.status_code, 400)
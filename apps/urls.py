@@ -1,4 +1,5 @@
 from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework.authtoken.views import obtain_auth_token
 
 from apps.views import (
@@ -6,22 +7,33 @@ from apps.views import (
     ProductListCreateAPIView,
     RegisterCreateAPIView,
     UserListAPIView, WishlistCreateAPIView, CartListCreateAPIView, LoginCreateAPIView, ActivateUserAPIView,
-    ProductRetrieveAPIView,
+    ProductRetrieveAPIView, WishlistBulkAPIView, CartBulkAPIView, ProductExportAPIView, AsyncLoginView,
+    AsyncCategoryListAPIView, AsyncProductListAPIView, AsyncProductRetrieveAPIView, MetricsView,
 )
 
 urlpatterns = [
     path('categories', CategoryListCreateAPIView.as_view(), name='category-list'),
     path('products', ProductListCreateAPIView.as_view(), name='product-list'),
+    path('products/export', ProductExportAPIView.as_view(), name='product-export'),
     path('products/<slug:slug>/', ProductRetrieveAPIView.as_view(), name='product-detail-by-slug'),
     path('users', UserListAPIView.as_view(), name='users'),
 
+    path('async/categories', AsyncCategoryListAPIView.as_view(), name='category-list-async'),
+    path('async/products', AsyncProductListAPIView.as_view(), name='product-list-async'),
+    path('async/products/<slug:slug>/', AsyncProductRetrieveAPIView.as_view(), name='product-detail-by-slug-async'),
+
     path('wishlist', WishlistCreateAPIView.as_view(), name='wishlist'),
+    path('wishlist/bulk', WishlistBulkAPIView.as_view(), name='wishlist-bulk'),
     path('cart', CartListCreateAPIView.as_view(), name='cart'),
+    path('cart/bulk', CartBulkAPIView.as_view(), name='cart-bulk'),
 
     path('register', RegisterCreateAPIView.as_view(), name='register'),
     path('login', LoginCreateAPIView.as_view(), name='login'),
+    path('login/async', csrf_exempt(AsyncLoginView.as_view()), name='login-async'),
     path('activate-user', ActivateUserAPIView.as_view(), name='activate-user'),
 
     path('token', obtain_auth_token, name='token_obtain_pair'),
+
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
 
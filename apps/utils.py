@@ -0,0 +1,28 @@
+from contextlib import contextmanager
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(limit, using=DEFAULT_DB_ALIAS, label=''):
+    """Fail if the wrapped block runs more than ``limit`` queries on ``using``."""
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+
+    if len(context) > limit:
+        queries = '\n'.join(f'  {query["sql"]}' for query in context.captured_queries)
+        raise QueryBudgetExceeded(f'{label or "block"} ran {len(context)} queries, budget is {limit}:\n{queries}')
+
+
+@lru_cache(maxsize=None)
+def get_redis_client(url=None):
+    """Shared redis-py client (and connection pool) for features that need more than the Django cache API."""
+    return redis.Redis.from_url(url or settings.REDIS_URL)
@@ -1,58 +1,176 @@
+import json
+import math
 import random
+from datetime import timedelta
 
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
 from django.core.cache import cache
-from django.db import transaction
-from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Max
+from django.http import HttpResponse, StreamingHttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.dateparse import parse_datetime
+from django.views import View
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema
 from rest_framework import status
-from rest_framework.exceptions import ValidationError
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework.filters import OrderingFilter
 from rest_framework.generics import ListCreateAPIView, RetrieveAPIView
 from rest_framework.permissions import AllowAny
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from apps import stock
+from apps.cache import AsyncCachedResponseMixin, CachedResponseMixin, PRODUCTS_VERSION, category_version_key, \
+    product_version_key, get_versions, aget_versions, is_conditional, not_modified, set_validators, weak_etag
+from apps.dbpool import connection_stats
+from apps.exporters import ProductExporter
+from apps.filters import ProductAttributeFilterSet, ProductFacets, ProductFilterSet, wants_facets
+from apps.instrumentation import phase, route_metrics
+from apps.mail import queue_confirmation
+from apps.mixins import ReplicaReadMixin, SerializerRelationsMixin
 from apps.models import CustomUser, Category, Product, Wishlist, Cart
 from apps.pagination import CustomPagination
+from apps.passwords import averify_password, PoolSaturated
+from apps.registry import category_registry
+from apps.search import ProductSearchFilter
 from apps.serializers import UserModelSerializer, CategoryModelSerializer, ProductModelSerializer, \
     RegisterUserModelSerializer, WishlistModelSerializer, CartModelSerializer, ActivateUserModelSerializer, \
-    LoginModelSerializer, ProductDetailSerializer
-from apps.tasks import send_confirmation_code
+    LoginModelSerializer, ProductDetailSerializer, WishlistBulkSerializer, CartBulkSerializer
+from apps.throttling import AuthIPThrottle, CatalogIPThrottle, ScopedSlidingWindowThrottle
 
 
 @extend_schema(tags=['product'])
-class CategoryListCreateAPIView(ListCreateAPIView):
+class CategoryListCreateAPIView(ReplicaReadMixin, SerializerRelationsMixin, ListCreateAPIView):
+    """Lists categories with their product counts from the in-process registry, without a query once it's loaded."""
     queryset = Category.objects.all()
     serializer_class = CategoryModelSerializer
     pagination_class = CustomPagination
+    throttle_classes = (ScopedSlidingWindowThrottle,)
+    throttle_scope = 'catalog'
+    query_budget = 1
+
+    def list(self, request, *args, **kwargs):
+        categories = category_registry.all()
+        validators = category_list_validators(request)
+        response = not_modified(request, validators)
+        if response is not None:
+            return response
+        page = self.paginate_queryset(categories)
+        return set_validators(request, self.get_paginated_response(page), validators)
 
 
+def category_list_validators(request):
+    # The registry's fingerprint changes with any name, slug or product count, so no query is needed.
+    params = sorted(request.GET.lists())
+    return {'etag': weak_etag('categories', params, category_registry.fingerprint), 'last_modified': None}
+
 
 @extend_schema(tags=['product'])
-class ProductListCreateAPIView(ListCreateAPIView):
+class ProductListCreateAPIView(ReplicaReadMixin, CachedResponseMixin, SerializerRelationsMixin, ListCreateAPIView):
+    """
+    Product listing with exact ``category``/``owner``, ``price_min``/``price_max`` and ``in_stock``
+    filters, search and ordering. ``?facets=true`` adds category, price and stock counts, computed
+    by one grouped query that also provides the total, so the listing doesn't run ``COUNT(*)``.
+    """
     queryset = Product.objects.all()
     serializer_class = ProductModelSerializer
-    filter_backends = [SearchFilter, OrderingFilter, DjangoFilterBackend]
-    search_fields = ['name', 'description']
+    filter_backends = [OrderingFilter, DjangoFilterBackend, ProductSearchFilter]
     ordering_fields = ['price', 'quantity', 'category__name']
     ordering = ['price']
-    filterset_fields = ['category', 'owner']
+    filterset_class = ProductFilterSet
     permission_classes = (AllowAny,)
     pagination_class = CustomPagination
+    throttle_classes = (ScopedSlidingWindowThrottle,)
+    throttle_scope = 'catalog'
+    keyset_ordering = ('price', 'id')
+    required_columns = ('price', 'quantity', 'category')
+    query_budget = 3
+    cache_query_params = ('search', 'ordering', 'category', 'owner', 'price_min', 'price_max', 'in_stock', 'facets',
+                          'page', 'page_size', 'cursor', 'count', 'fields', 'expand')
+
+    def get_cache_dependencies(self, request):
+        category = request.query_params.get('category', '')
+        # Facets count products of every category.
+        if category.isdigit() and not wants_facets(request):
+            return [category_version_key(category)]
+        return [PRODUCTS_VERSION]
+
+    def list(self, request, *args, **kwargs):
+        if not wants_facets(request):
+            return super().list(request, *args, **kwargs)
+        # Filtering first also validates the parameters the facets read.
+        queryset = self.filter_queryset(self.get_queryset())
+        facets, self.paginator.known_count = self.get_facets(request).compute()
+        page = self.paginate_queryset(queryset)
+        response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        response.data['facets'] = facets
+        return response
+
+    def get_facets(self, request):
+        # The view's queryset, for its scoping; the grouped query needs none of the serializer's relations.
+        queryset = self.get_queryset().select_related(None).prefetch_related(None)
+        return ProductFacets.for_request(request, ProductSearchFilter().filter_queryset(request, queryset, self))
+
 
 @extend_schema(tags=['product'])
-class ProductRetrieveAPIView(RetrieveAPIView):
+class ProductRetrieveAPIView(ReplicaReadMixin, CachedResponseMixin, SerializerRelationsMixin, RetrieveAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductDetailSerializer
     lookup_field = 'slug'
     permission_classes = AllowAny,
+    throttle_classes = (ScopedSlidingWindowThrottle,)
+    throttle_scope = 'catalog'
+    required_columns = ('category', 'updated_at')
+    query_budget = 2
+    cache_query_params = ('fields', 'expand')
+
+    def get_object(self):
+        self.object = super().get_object()
+        return self.object
+
+    def get_cache_dependencies(self, request):
+        return None
+
+    def get_object_cache_dependencies(self):
+        return [product_version_key(self.object.pk), category_version_key(self.object.category_id)]
+
+    def get_validators(self, request, key, versions):
+        # Without a cached entry, the validators cost a query: worth it only to answer a conditional GET.
+        if not is_conditional(request):
+            return None
+        row = self.validator_queryset().first()
+        if row is None:
+            return None
+        pk, category_id, updated_at = row
+        versions = get_versions([product_version_key(pk), category_version_key(category_id)])
+        return product_validators(key, versions, updated_at)
+
+    def get_object_validators(self, key, versions):
+        return product_validators(key, versions, self.object.updated_at)
+
+    def validator_queryset(self):
+        return Product.objects.filter(slug=self.kwargs['slug']).values_list('pk', 'category_id', 'updated_at')
+
+
+def product_validators(key, versions, updated_at):
+    return {'etag': weak_etag(key, sorted(versions.items()), updated_at.isoformat()),
+            'last_modified': int(updated_at.timestamp())}
 
 
 @extend_schema(tags=['auth'])
 class RegisterCreateAPIView(APIView):
+    throttle_classes = (*api_settings.DEFAULT_THROTTLE_CLASSES, ScopedSlidingWindowThrottle)
+    throttle_scope = 'auth'
     serializer_class = RegisterUserModelSerializer
     permission_classes = (AllowAny,)
 
@@ -63,14 +181,15 @@ class RegisterCreateAPIView(APIView):
             email = serializer.validated_data['email']
             username = serializer.validated_data['username']
             password = serializer.validated_data['password']
-            confirmation_code = random.randint(100000, 600000)
-            print(f"Raw password: {password}")
             OTP_EXPIRY_TIME = 120  # 2 minutes
+            # A repeated /register inside the OTP window keeps the pending code, so the mail already sent stays valid.
+            pending = cache.get(email)
+            confirmation_code = pending["confirmation_code"] if pending else random.randint(100000, 600000)
             cache.set(email, {"username": username, "password": password, "confirmation_code": confirmation_code},
                       OTP_EXPIRY_TIME)
 
             message = f"Thanks for registering! Please confirm your account with this code: {confirmation_code}"
-            send_confirmation_code.delay(email, message)
+            queue_confirmation(email, message, OTP_EXPIRY_TIME)
 
             return Response({"message": "Confirmation code sent to your email."}, status=201)
 
@@ -79,6 +198,8 @@ class RegisterCreateAPIView(APIView):
 
 @extend_schema(tags=['auth'])
 class ActivateUserAPIView(APIView):
+    throttle_classes = (*api_settings.DEFAULT_THROTTLE_CLASSES, ScopedSlidingWindowThrottle)
+    throttle_scope = 'auth'
     serializer_class = ActivateUserModelSerializer
     permission_classes = (AllowAny,)
 
@@ -108,6 +229,8 @@ class ActivateUserAPIView(APIView):
 
 @extend_schema(tags=['auth'])
 class LoginCreateAPIView(APIView):
+    throttle_classes = (*api_settings.DEFAULT_THROTTLE_CLASSES, ScopedSlidingWindowThrottle)
+    throttle_scope = 'auth'
     serializer_class = LoginModelSerializer
     permission_classes = (AllowAny,)
 
@@ -119,15 +242,12 @@ class LoginCreateAPIView(APIView):
             Q(email=email_or_username) | Q(username=email_or_username)
         ).first()
 
-        print(f"Stored hash: {user.password}")
-        print(f"Password match: {user.check_password(password)}")
+        if not user or not user.check_password(password):
+            return Response({"error": "Invalid credentials."}, status=401)
 
         if not user.is_active:
             return Response({"error": "Account is not activated."}, status=403)
 
-        if not user or not user.check_password(password):
-            return Response({"error": "Invalid credentials."}, status=401)
-
         refresh = RefreshToken.for_user(user)
         return Response({
             "refresh": str(refresh),
@@ -135,10 +255,285 @@ class LoginCreateAPIView(APIView):
         }, status=200)
 
 
-class UserListAPIView(ListCreateAPIView):
+class AsyncLoginView(View):
+    """
+    ASGI login: the user lookup uses the async ORM and the single password check runs in the
+    bounded hash pool (``apps.passwords``), so the event loop keeps serving other requests
+    during PBKDF2. When the pool is full the request is rejected with 503 right away.
+    """
+    retry_after = 1
+
+    async def post(self, request, *args, **kwargs):
+        throttle = AuthIPThrottle()
+        if not await sync_to_async(throttle.allow_request)(request, self):
+            return JsonResponse({"error": "Too many login attempts, retry later."}, status=429,
+                                headers={'Retry-After': str(math.ceil(throttle.wait()))})
+
+        try:
+            data = json.loads(request.body or b'{}') if request.content_type == 'application/json' else request.POST
+            email_or_username, password = data.get("email_or_username"), data.get("password")
+        except (ValueError, AttributeError):
+            return JsonResponse({"error": "Malformed request body."}, status=400)
+        if not email_or_username or not password:
+            return JsonResponse({"error": "Invalid credentials."}, status=401)
+
+        user = await CustomUser.objects.filter(
+            Q(email=email_or_username) | Q(username=email_or_username)
+        ).only('id', 'password', 'is_active').afirst()
+
+        try:
+            valid = await averify_password(user, password)
+        except PoolSaturated:
+            return JsonResponse({"error": "Too many login attempts in progress, retry shortly."}, status=503,
+                                headers={'Retry-After': str(self.retry_after)})
+
+        if not user or not valid:
+            return JsonResponse({"error": "Invalid credentials."}, status=401)
+
+        if not user.is_active:
+            return JsonResponse({"error": "Account is not activated."}, status=403)
+
+        refresh = RefreshToken.for_user(user)
+        return JsonResponse({
+            "refresh": str(refresh),
+            "access": str(refresh.access_token),
+        }, status=200)
+
+
+class AsyncGenericView(View):
+    """
+    Async counterpart of DRF's ``GenericAPIView`` for anonymous catalog reads under ASGI.
+
+    Handlers query through the async ORM and cache, so a worker serves concurrent reads on one
+    event loop instead of a thread per request. The request is wrapped in a DRF ``Request`` for
+    ``query_params`` (nothing is authenticated), serializers are the sync views' ones, and API
+    errors become JSON responses. Throttling is per client IP in the ``catalog`` scope.
+    """
+    http_method_names = ['get', 'head', 'options']
+    queryset = None
+    serializer_class = None
+    throttle_class = CatalogIPThrottle
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.request = request = Request(request)
+        throttle = self.throttle_class()
+        if not await sync_to_async(throttle.allow_request)(request, self):
+            return JsonResponse({"detail": "Request was throttled."}, status=429,
+                                headers={'Retry-After': str(math.ceil(throttle.wait()))})
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            detail = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+            return JsonResponse(detail, status=exc.status_code, safe=False)
+
+    def get_queryset(self):
+        return self.queryset.all()
+
+    def get_serializer_class(self):
+        return self.serializer_class
+
+    def get_serializer(self, *args, **kwargs):
+        return self.get_serializer_class()(*args, context={'request': self.request, 'view': self}, **kwargs)
+
+    async def aprepare(self, objects):
+        """Load, without blocking the loop, whatever serializing ``objects`` reads beyond their rows."""
+
+
+class AsyncListAPIView(AsyncGenericView):
+    pagination_class = CustomPagination
+
+    async def get(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        paginator = self.pagination_class()
+        extra = await self.aget_extra_data(paginator)
+        page = await paginator.apaginate_queryset(queryset, request, view=self)
+        await self.aprepare(page)
+        data = self.get_serializer(page, many=True).data
+        with phase('render'):
+            return JsonResponse({**paginator.get_paginated_response(data).data, **extra})
+
+    async def afilter_queryset(self, queryset):
+        return queryset
+
+    async def aget_extra_data(self, paginator):
+        """Keys added to the listing next to ``results``; may set ``paginator.known_count``."""
+        return {}
+
+
+class AsyncRetrieveAPIView(AsyncGenericView):
+    lookup_field = 'slug'
+
+    async def get(self, request, *args, **kwargs):
+        self.object = await self.aget_object()
+        await self.aprepare([self.object])
+        data = self.get_serializer(self.object).data
+        with phase('render'):
+            return JsonResponse(data)
+
+    async def aget_object(self):
+        queryset = self.get_queryset()
+        try:
+            return await queryset.aget(**{self.lookup_field: self.kwargs[self.lookup_field]})
+        except queryset.model.DoesNotExist:
+            raise NotFound(f"No {queryset.model._meta.object_name} matches the given query.")
+
+
+class AsyncCategoryListAPIView(AsyncListAPIView):
+    query_budget = CategoryListCreateAPIView.query_budget
+
+    async def get(self, request, *args, **kwargs):
+        await category_registry.aensure_fresh()
+        validators = category_list_validators(request)
+        response = not_modified(request, validators)
+        if response is not None:
+            return response
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(category_registry.all(), request, view=self)
+        return set_validators(request, JsonResponse(paginator.get_paginated_response(page).data), validators)
+
+
+class AsyncProductListAPIView(AsyncCachedResponseMixin, SerializerRelationsMixin, AsyncListAPIView):
+    """
+    Async ``GET /products`` with the same filters, ordering, search, pagination and cache as
+    :class:`ProductListCreateAPIView`. One difference: an unknown ``category``/``owner`` id gives
+    an empty page instead of a 400, since checking it would cost a query.
+    """
+    queryset = Product.objects.all()
+    serializer_class = ProductModelSerializer
+    ordering_fields = ProductListCreateAPIView.ordering_fields
+    ordering = ProductListCreateAPIView.ordering
+    filterset_fields = ('category', 'owner')
+    keyset_ordering = ProductListCreateAPIView.keyset_ordering
+    required_columns = ProductListCreateAPIView.required_columns
+    query_budget = ProductListCreateAPIView.query_budget
+    cache_query_params = ProductListCreateAPIView.cache_query_params
+    get_cache_dependencies = ProductListCreateAPIView.get_cache_dependencies
+
+    async def afilter_queryset(self, queryset):
+        queryset = OrderingFilter().filter_queryset(self.request, queryset, self)
+        for name in self.filterset_fields:
+            value = self.request.query_params.get(name)
+            if not value:
+                continue
+            if not value.isdigit():
+                raise ValidationError({name: [
+                    "Select a valid choice. That choice is not one of the available choices."
+                ]})
+            queryset = queryset.filter(**{f'{name}_id': value})
+        attributes = ProductAttributeFilterSet(self.request.query_params, queryset=queryset)
+        if not attributes.is_valid():
+            raise ValidationError(attributes.errors)
+        queryset = attributes.qs
+        return await self.asearch(queryset)
+
+    async def asearch(self, queryset):
+        if self.request.query_params.get(api_settings.SEARCH_PARAM):
+            # The in-process index backend may load its postings from the database on first use.
+            queryset = await sync_to_async(ProductSearchFilter().filter_queryset)(self.request, queryset, self)
+        return queryset
+
+    async def aget_extra_data(self, paginator):
+        if not wants_facets(self.request):
+            return {}
+        queryset = await self.asearch(self.get_queryset().select_related(None).prefetch_related(None))
+        facets, paginator.known_count = await ProductFacets.for_request(self.request, queryset).acompute()
+        return {'facets': facets}
+
+    async def aprepare(self, objects):
+        await category_registry.aensure_fresh({product.category_id for product in objects})
+
+
+class AsyncProductRetrieveAPIView(AsyncCachedResponseMixin, SerializerRelationsMixin, AsyncRetrieveAPIView):
+    queryset = Product.objects.all()
+    serializer_class = ProductDetailSerializer
+    required_columns = ProductRetrieveAPIView.required_columns
+    query_budget = ProductRetrieveAPIView.query_budget
+    cache_query_params = ProductRetrieveAPIView.cache_query_params
+    get_cache_dependencies = ProductRetrieveAPIView.get_cache_dependencies
+    get_object_cache_dependencies = ProductRetrieveAPIView.get_object_cache_dependencies
+    get_object_validators = ProductRetrieveAPIView.get_object_validators
+    validator_queryset = ProductRetrieveAPIView.validator_queryset
+    aprepare = AsyncProductListAPIView.aprepare
+
+    async def aget_validators(self, request, key, versions):
+        if not is_conditional(request):
+            return None
+        row = await self.validator_queryset().afirst()
+        if row is None:
+            return None
+        pk, category_id, updated_at = row
+        versions = await aget_versions([product_version_key(pk), category_version_key(category_id)])
+        return product_validators(key, versions, updated_at)
+
+
+class MetricsView(View):
+    """
+    Prometheus text export of the per-route request metrics and the database connection metrics;
+    needs ``METRICS_TOKEN`` as a bearer token or staff.
+    """
+
+    def get(self, request, *args, **kwargs):
+        token = settings.METRICS_TOKEN
+        authorized = bool(token) and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+        if not (authorized or request.user.is_staff):
+            return HttpResponse(status=403)
+        body = route_metrics.render() + connection_stats.render()
+        return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@extend_schema(tags=['product'])
+class ProductExportAPIView(APIView):
+    """
+    Streams the whole catalog as NDJSON (default) or CSV: ``?export_format=csv``.
+
+    ``?updated_after=<ISO datetime>`` exports only rows changed since a previous run; pass back the
+    ``X-Export-Watermark`` header of that run for an incremental export. ``updated_at`` is set before
+    commit, so a row committed after the watermark was taken can carry an older timestamp: rows from
+    ``watermark_margin`` before ``updated_after`` are exported again to catch those, and consumers
+    upsert by ``id``. Transactions that stay open longer than the margin can still be missed.
+    """
+    permission_classes = (AllowAny,)
+    chunk_size = 2000
+    watermark_margin = timedelta(minutes=1)
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in ProductExporter.formats:
+            raise ValidationError({"export_format": f"Choose one of: {', '.join(ProductExporter.formats)}."})
+
+        queryset = Product.objects.all()
+        updated_after = request.query_params.get('updated_after')
+        if updated_after:
+            try:
+                since = parse_datetime(updated_after)
+            except ValueError:  # well-formed but impossible, e.g. month 13
+                since = None
+            if since is None:
+                raise ValidationError({"updated_after": "Expected an ISO 8601 datetime."})
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            queryset = queryset.filter(updated_at__gt=since - self.watermark_margin)
+
+        # Pin the export to the rows that existed when it started, so the watermark is exact.
+        watermark = queryset.aggregate(watermark=Max('updated_at'))['watermark']
+        if watermark is not None:
+            queryset = queryset.filter(updated_at__lte=watermark)
+
+        exporter = ProductExporter(queryset.order_by('updated_at', 'id'), chunk_size=self.chunk_size)
+        is_asgi = isinstance(request._request, ASGIRequest)
+        content = exporter.arender(export_format) if is_asgi else exporter.render(export_format)
+        response = StreamingHttpResponse(content, content_type=ProductExporter.formats[export_format])
+        response['X-Export-Watermark'] = watermark.isoformat() if watermark else updated_after or ''
+        response['Content-Disposition'] = f'attachment; filename="products.{export_format}"'
+        return response
+
+
+class UserListAPIView(SerializerRelationsMixin, ListCreateAPIView):
     queryset = CustomUser.objects.order_by('id')
     serializer_class = UserModelSerializer
     pagination_class = CustomPagination
+    keyset_ordering = ('id',)
+    query_budget = 2
 
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
@@ -148,13 +543,16 @@ class UserListAPIView(ListCreateAPIView):
 
 
 @extend_schema(tags=['user'])
-class WishlistCreateAPIView(ListCreateAPIView):
+class WishlistCreateAPIView(SerializerRelationsMixin, ListCreateAPIView):
+    queryset = Wishlist.objects.order_by('id')
     serializer_class = WishlistModelSerializer
     permission_classes = (IsAuthenticated,)
     pagination_class = CustomPagination
+    keyset_ordering = ('id',)
+    query_budget = 3
 
     def get_queryset(self):
-        return Wishlist.objects.filter(user=self.request.user)
+        return super().get_queryset().filter(user=self.request.user)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, context={'request': request})
@@ -176,41 +574,156 @@ class WishlistCreateAPIView(ListCreateAPIView):
         return Response({"message": "Product added to wishlist."}, status=201)
 
 
+@extend_schema(tags=['user'])
+class WishlistBulkAPIView(APIView):
+    serializer_class = WishlistBulkSerializer
+    permission_classes = (IsAuthenticated,)
+
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        serializer = WishlistBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = request.user
+        product_ids = list(dict.fromkeys(serializer.validated_data['product_ids']))
+        action = serializer.validated_data['action']
+
+        existing = set(Product.objects.filter(pk__in=product_ids).values_list('pk', flat=True))
+        present = set(Wishlist.objects.filter(user=user, product_id__in=product_ids)
+                      .values_list('product_id', flat=True))
+
+        if action == 'add':
+            Wishlist.objects.bulk_create(
+                [Wishlist(user=user, product_id=pk) for pk in product_ids if pk in existing and pk not in present],
+                ignore_conflicts=True,
+            )
+            statuses = {True: 'already_present', False: 'added'}
+        else:
+            Wishlist.objects.filter(user=user, product_id__in=present).delete()
+            statuses = {True: 'removed', False: 'not_present'}
+
+        results = [
+            {'product_id': pk, 'status': statuses[pk in present] if pk in existing else 'not_found'}
+            for pk in product_ids
+        ]
+        return Response({'results': results}, status=status.HTTP_200_OK)
 
 
 @extend_schema(tags=['user'])
-class CartListCreateAPIView(ListCreateAPIView):
-    queryset = Cart.objects.all()
+class CartListCreateAPIView(SerializerRelationsMixin, ListCreateAPIView):
+    queryset = Cart.objects.order_by('id')
     serializer_class = CartModelSerializer
     permission_classes = (IsAuthenticated,)
     pagination_class = CustomPagination
+    keyset_ordering = ('id',)
+    query_budget = 2
 
     def get_queryset(self):
-        return Cart.objects.filter(user=self.request.user)
+        return super().get_queryset().filter(user=self.request.user)
 
     @transaction.atomic
     def create(self, request, *args, **kwargs):
-        user = request.user
-        product_id = request.data.get('product_id')
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            with transaction.atomic():
+                return self.set_quantity(serializer)
+        except IntegrityError:
+            # A concurrent first add of the same product inserted its line after our lookup; the
+            # savepoint undid our reservation, and the retry finds (and locks) that line.
+            return self.set_quantity(serializer)
+
+    def get_line(self, user, product_id):
+        return Cart.objects.select_for_update().filter(user=user, product_id=product_id).first()
+
+    def set_quantity(self, serializer):
+        user = self.request.user
+        product_id = serializer.validated_data['product_id']
+        quantity = serializer.validated_data.get('quantity')
 
-        product = Product.objects.filter(id=product_id).first()
-        if not product:
-            raise ValidationError({"error": "The product does not exist."})
+        existing_cart_item = self.get_line(user, product_id)
+        if existing_cart_item and (quantity is None or quantity == 0):
+            existing_cart_item.delete()
+            stock.release(product_id, existing_cart_item.quantity)
+            return Response({"message": "Product removed from cart."}, status=status.HTTP_200_OK)
+        if not existing_cart_item and quantity == 0:
+            return Response({"message": "Product is not in the cart."}, status=status.HTTP_200_OK)
 
-        if product.quantity <= 0:
+        current = existing_cart_item.quantity if existing_cart_item else 0
+        if quantity is None:
+            quantity = 1
+        try:
+            if quantity > current:
+                stock.reserve(product_id, quantity - current)
+            else:
+                stock.release(product_id, current - quantity)
+        except stock.ProductNotFound:
+            raise ValidationError({"error": "The product does not exist."})
+        except stock.OutOfStock:
             raise ValidationError({"error": "This product is out of stock."})
 
-        existing_cart_item = Cart.objects.filter(user=user, product=product).first()
         if existing_cart_item:
-            existing_cart_item.delete()
-            product.quantity += 1
-            product.save()
-            return Response({"message": "Product removed from cart."}, status=status.HTTP_200_OK)
+            existing_cart_item.quantity = quantity
+            existing_cart_item.save(update_fields=['quantity'])
+            return Response(self.get_serializer(existing_cart_item).data, status=status.HTTP_200_OK)
 
-        product.quantity -= 1
-        product.save()
+        serializer.save(user=user, product_id=product_id, quantity=quantity)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        serializer = self.get_serializer(data=request.data)
+
+@extend_schema(tags=['user'])
+class CartBulkAPIView(APIView):
+    serializer_class = CartBulkSerializer
+    permission_classes = (IsAuthenticated,)
+
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        serializer = CartBulkSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save(user=user, product=product)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        wanted = {item['product_id']: item['quantity'] for item in serializer.validated_data['items']}
+        try:
+            with transaction.atomic():
+                results = self.set_quantities(request.user, wanted)
+        except IntegrityError:
+            # As in CartListCreateAPIView.create: a concurrent first add inserted a line we meant to
+            # create; the savepoint undid our stock changes, and the retry locks that line.
+            results = self.set_quantities(request.user, wanted)
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    def get_lines(self, user, product_ids):
+        return {line.product_id: line for line in Cart.objects.select_for_update().filter(
+            user=user, product_id__in=product_ids)}
+
+    def set_quantities(self, user, wanted):
+        lines = self.get_lines(user, wanted)
+        current = {pk: lines[pk].quantity if pk in lines else 0 for pk in wanted}
+        stock_results = stock.adjust_many({pk: current[pk] - quantity for pk, quantity in wanted.items()})
+
+        created, updated, removed, results = [], [], [], []
+        for pk, quantity in wanted.items():
+            outcome = stock_results[pk]
+            if outcome != 'ok':
+                results.append({'product_id': pk, 'status': outcome, 'quantity': current[pk]})
+                continue
+
+            line = lines.get(pk)
+            if quantity == current[pk]:
+                outcome = 'unchanged'
+            elif not quantity:
+                removed.append(line.pk)
+                outcome = 'removed'
+            elif line is None:
+                created.append(Cart(user=user, product_id=pk, quantity=quantity))
+                outcome = 'added'
+            else:
+                line.quantity = quantity
+                updated.append(line)
+                outcome = 'updated'
+            results.append({'product_id': pk, 'status': outcome, 'quantity': quantity})
+
+        if created:
+            Cart.objects.bulk_create(created)
+        if updated:
+            Cart.objects.bulk_update(updated, ['quantity'])
+        if removed:
+            Cart.objects.filter(pk__in=removed).delete()
+        return results
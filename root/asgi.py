@@ -12,5 +12,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'root.settings')
+# Settings turn persistent connections off under ASGI (see CONN_MAX_AGE there).
+os.environ.setdefault('SERVER_INTERFACE', 'asgi')
 
 application = get_asgi_application()
+
+# Start the password hash threads with the worker, not on the first login.
+from apps.passwords import get_password_pool  # noqa: E402
+
+get_password_pool()
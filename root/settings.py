@@ -1,7 +1,9 @@
 import os
+import sys
 from pathlib import Path
 import dotenv
 from celery import Celery
+from celery.schedules import crontab
 from dotenv import load_dotenv
 from datetime import timedelta
 load_dotenv()
@@ -35,11 +37,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -74,16 +78,79 @@ AUTH_USER_MODEL = 'apps.CustomUser'
 #     }
 # }
 
+# root.asgi sets SERVER_INTERFACE=asgi. There each request runs its ORM calls in a fresh thread, so
+# persistent connections aren't reused but pile up (Django's docs say to disable them): without a
+# pool, connections close after every request; DB_POOL=1 is how ASGI workers reuse them.
+SERVER_INTERFACE = os.getenv('SERVER_INTERFACE', 'wsgi')
+# Web and Celery processes size their connection pools separately; Celery is recognised by its command.
+PROCESS_ROLE = os.getenv('PROCESS_ROLE') or ('celery' if os.path.basename(sys.argv[0]).startswith('celery') else 'web')
+DB_POOL_SIZES = {
+    'web': (int(os.getenv('DB_POOL_MIN_SIZE', 2)), int(os.getenv('DB_POOL_MAX_SIZE', 10))),
+    # A prefork worker child runs one task at a time.
+    'celery': (int(os.getenv('DB_CELERY_POOL_MIN_SIZE', 1)), int(os.getenv('DB_CELERY_POOL_MAX_SIZE', 2))),
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
-        'NAME': 'kodeks24_db',
-        'USER': 'postgres',
-        'PASSWORD': 1,
-        'HOST': 'localhost',
-        'PORT': 5432
+        # django.db.backends.postgresql plus connection metrics (apps.dbpool).
+        'ENGINE': 'apps.backends.postgresql',
+        'NAME': os.getenv('DB_NAME', 'kodeks24_db'),
+        'USER': os.getenv('DB_USER', 'postgres'),
+        'PASSWORD': os.getenv('DB_PASSWORD', 1),
+        'HOST': os.getenv('DB_HOST', 'localhost'),
+        'PORT': os.getenv('DB_PORT', 5432),
+        # Reused connections are checked before a request uses them (and pooled ones on checkout).
+        'CONN_HEALTH_CHECKS': True,
     }
 }
+if os.getenv('DB_POOL', '').lower() in ('1', 'true'):
+    # A psycopg 3 pool per process (poetry install -E pool); connections go back to it after each request.
+    pool_min_size, pool_max_size = DB_POOL_SIZES[PROCESS_ROLE]
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {'pool': {
+        'min_size': pool_min_size,
+        'max_size': pool_max_size,
+        # Seconds a request waits for a free connection before failing.
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        'max_idle': 300,
+    }}
+else:
+    # Without a pool, each WSGI thread keeps its connection for this many seconds instead of one per request.
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', 0 if SERVER_INTERFACE == 'asgi' else 60))
+if os.getenv('DB_ENGINE') == 'sqlite':
+    # Local runs and benchmarks without PostgreSQL.
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+    }
+    # The covering indexes' INCLUDE columns are PostgreSQL-only; SQLite builds the indexes without them.
+    SILENCED_SYSTEM_CHECKS = ['models.W040']
+else:
+    # Declares the PostgreSQL-only search indexes in the models' Meta.indexes (apps.search.postgres_indexes).
+    INSTALLED_APPS.append('django.contrib.postgres')
+
+# Read replicas for the catalog views (apps.routers): DB_REPLICA_HOSTS=host[:port],... with the primary's
+# credentials. DB_REPLICA_NAME alone adds one replica on the primary's server - a second local
+# database standing in for a replica in development.
+REPLICA_DATABASES = []
+replica_hosts = [host for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host]
+if os.getenv('DB_REPLICA_NAME') and not replica_hosts:
+    replica_hosts = [f"{DATABASES['default'].get('HOST', '')}:{DATABASES['default'].get('PORT', '')}"]
+for index, replica_host in enumerate(replica_hosts, 1):
+    host, _, port = replica_host.partition(':')
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default'].get('PORT', ''),
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        # Test runs read the primary through the replica alias instead of creating a database for it.
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(f'replica_{index}')
+DATABASE_ROUTERS = ['apps.routers.PrimaryReplicaRouter']
+# Replicas further behind than this (seconds) are skipped; lag is measured per process at most once per interval.
+REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', 2))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_LAG_CHECK_INTERVAL', 5))
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -217,16 +284,22 @@ CKEDITOR_5_CONFIGS = {
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'apps.instrumentation.InstrumentedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'apps.throttling.AnonSlidingWindowThrottle',
+        'apps.throttling.UserSlidingWindowThrottle'
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/day',
-        'user': '1000/day'
+        'user': '1000/day',
+        'auth': '10/min',
+        'catalog': '600/min',
     }
 }
 
@@ -244,6 +317,7 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": False,
     "BLACKLIST_AFTER_ROTATION": False,
     "UPDATE_LAST_LOGIN": False,
+    "CHECK_REVOKE_TOKEN": True,
 
     "ALGORITHM": "HS256",
     "SIGNING_KEY": SECRET_KEY,
@@ -278,6 +352,17 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSlidingSerializer",
 }
 
+# Password hashing for the async login view: worker threads per process and how many
+# more attempts may wait for one before new ones get 503.
+LOGIN_HASH_WORKERS = int(os.getenv('LOGIN_HASH_WORKERS', 0)) or None
+LOGIN_HASH_QUEUE_DEPTH = int(os.getenv('LOGIN_HASH_QUEUE_DEPTH', 64))
+
+# Per-request query/cache/phase measurements (Server-Timing header, /api/v1/metrics). Off means no overhead.
+INSTRUMENTATION_ENABLED = os.getenv('INSTRUMENTATION_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+INSTRUMENTATION_FLUSH_INTERVAL = 5
+# Bearer token for scraping /api/v1/metrics; staff sessions may read it too.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
 #----- email --------
 EMAIL_BACKEND=os.getenv("EMAIL_BACKEND")
 EMAIL_HOST=os.getenv("EMAIL_HOST")
@@ -285,18 +370,47 @@ EMAIL_PORT=os.getenv("EMAIL_PORT")
 EMAIL_USE_TLS=os.getenv("EMAIL_USE_TLS")
 EMAIL_HOST_USER=os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD=os.getenv("EMAIL_HOST_PASSWORD")
+EMAIL_TIMEOUT = 10
+
+# Confirmation emails are queued in Redis and sent in batches of this size over one SMTP
+# connection per worker; a drain runs this many seconds after the first message of a batch.
+CONFIRMATION_MAIL_BATCH_SIZE = int(os.getenv('CONFIRMATION_MAIL_BATCH_SIZE', 50))
+CONFIRMATION_MAIL_BATCH_DELAY = int(os.getenv('CONFIRMATION_MAIL_BATCH_DELAY', 1))
 
 
 
 # CELERY SETTINGS
+REDIS_URL = os.getenv('REDIS_URL', 'redis://127.0.0.1:6374')
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.redis.RedisCache",
-        "LOCATION": os.getenv('REDIS_URL', 'redis://127.0.0.1:6374'),
+        "LOCATION": REDIS_URL,
         "KEY_PREFIX": "django"
     }
 }
+CATALOG_CACHE_TIMEOUT = 60 * 5
+# max-age of anonymous catalog responses in shared caches (CDN); clients revalidate with ETag/Last-Modified.
+CATALOG_CACHE_CONTROL_MAX_AGE = 60
+# Seconds between checks of the category registry version (apps.registry) in each process.
+CATEGORY_REGISTRY_CHECK_INTERVAL = 1
+# Minimum seconds between recounts of the registry's per-category product counts in each process.
+CATEGORY_COUNT_REFRESH_INTERVAL = 60
+AUTH_USER_CACHE_TTL = 60 * 5
+AUTH_USER_LOCAL_CACHE_SIZE = 1024
+AUTH_USER_LOCAL_CACHE_TTL = 5
 
 CELERY_BROKER_URL = 'redis://127.0.0.1:6379/0'
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
-CELERY_RESULT_BACKEND = 'django-db'
+# Results are dropped unless a task opts in with ignore_result=False; those go to Redis and expire.
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://127.0.0.1:6379/1')
+CELERY_RESULT_EXPIRES = int(os.getenv('CELERY_RESULT_EXPIRES', 60 * 60 * 24))
+CELERY_RESULT_COMPRESSION = 'gzip'
+CELERY_BEAT_SCHEDULE = {
+    'prune-task-results': {
+        'task': 'apps.tasks.prune_task_results',
+        'schedule': crontab(hour=3, minute=30),
+    },
+}
+# Rows left in django_celery_results from the old 'django-db' backend are pruned after this many days.
+TASK_RESULT_RETENTION_DAYS = 7